@@ -7,6 +7,7 @@ import os
 import sys
 import shutil
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -14,13 +15,18 @@ from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
 from question_generator import QuestionGenerator
+from question_pool import QuestionPool
 from quiz_video_renderer import QuizVideoRenderer
+from encoder_profiles import get_encoder_profile, profile_names
+from job_journal import JobJournal
 
 
 def generate_video(
     category: str = None,
     test_mode: bool = False,
-    skip_ai_videos: bool = False
+    skip_ai_videos: bool = False,
+    profile: str = None,
+    use_video_cache: bool = True
 ) -> dict:
     """
     動画を生成してオプションでアップロード
@@ -29,6 +35,8 @@ def generate_video(
         category: 質問カテゴリ（省略時はランダム）
         test_mode: Trueの場合アップロードをスキップ
         skip_ai_videos: TrueのときAI動画生成をスキップ（プレースホルダー使用）
+        profile: エンコードプロファイル名（省略時は設定ファイルの値）
+        use_video_cache: 生成済みのAI動画を再利用するか
 
     Returns:
         結果の辞書
@@ -43,15 +51,30 @@ def generate_video(
     output_dir.mkdir(exist_ok=True)
 
     # ── ステップ 1: 質問生成 ─────────────────────────────────
+    # 中断した実行があれば同じ質問で再開し、送信済みの生成に再接続する
     print("📝 ステップ 1/3: 質問生成中...")
-    generator = QuestionGenerator()
-    question_data = generator.generate_question(category)
+    journal = JobJournal()
+    run = journal.unfinished_run("local", category)
+    if run:
+        run_id = run["run_id"]
+        question_data = run["question_data"]
+        print(f"  🔁 中断した実行を再開します: {run_id}（{run['resumes'] + 1}回目）")
+    else:
+        generator = QuestionGenerator()
+        question_data = QuestionPool(generator).generate_question(category)
 
     print(f"  カテゴリ: {question_data.get('category')}")
     print(f"  質問: {question_data.get('question')}")
 
-    if not generator.validate_content(question_data):
-        raise ValueError("生成された質問データが不正です")
+    if not run:
+        if not generator.validate_content(question_data):
+            raise ValueError("生成された質問データが不正です")
+        run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        journal.start_run(run_id, "local", question_data)
+
+    # 生成時の英訳がない質問（作り置き・再開した実行など）は、AI動画の生成と並行して翻訳しておく
+    translation_executor = ThreadPoolExecutor(max_workers=1)
+    translation = translation_executor.submit(_translate_to_english, question_data)
 
     # ── ステップ 2: AI動画生成 ────────────────────────────────
     choices = question_data.get("choices", [])
@@ -66,10 +89,14 @@ def generate_video(
         print("\n🎬 ステップ 2/3: AI動画生成中...")
         try:
             from ai_video_generator import AIVideoGenerator
-            ai_gen = AIVideoGenerator()
+            # テスト実行は手動の実行として、定期実行より先に生成の枠を使う
+            ai_gen = AIVideoGenerator(
+                use_cache=use_video_cache,
+                journal=journal,
+                priority="manual" if test_mode else "scheduled",
+            )
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_dir = output_dir / "temp" / timestamp
+            temp_dir = output_dir / "temp" / run_id
             temp_dir.mkdir(parents=True, exist_ok=True)
 
             prompts = [c["video_prompt"] for c in choices]
@@ -102,7 +129,8 @@ def generate_video(
 
     # ── 英語翻訳 ──────────────────────────────────────────────
     print("\n🌐 英語翻訳中...")
-    translations = _translate_to_english(question_data)
+    translations = translation.result()
+    translation_executor.shutdown()
 
     # ── ステップ 3: Remotionレンダリング ──────────────────────
     print("\n🎞️  ステップ 3/3: Remotionレンダリング中...")
@@ -110,7 +138,12 @@ def generate_video(
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_path = output_dir / f"quiz_{timestamp}.mp4"
 
-    renderer = QuizVideoRenderer(remotion_dir=str(project_root / "remotion"))
+    encoder_profile = get_encoder_profile(profile)
+    print(f"  エンコードプロファイル: {encoder_profile['name']}")
+    renderer = QuizVideoRenderer(
+        remotion_dir=str(project_root / "remotion"),
+        encoder_profile=encoder_profile,
+    )
 
     # Remotion用データ構築
     remotion_choices = [
@@ -135,6 +168,7 @@ def generate_video(
         output_path=str(output_path),
     )
 
+    journal.finish_run(run_id, success=success)
     if not success:
         raise RuntimeError("Remotionレンダリングに失敗しました")
 
@@ -187,49 +221,11 @@ def generate_video(
 
 
 def _translate_to_english(question_data: dict) -> dict:
-    """Geminiで質問と選択肢を英訳する"""
-    try:
-        import google.generativeai as genai
-        from dotenv import load_dotenv
-        load_dotenv()
-        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-
-        choices_ja = "\n".join(
-            f"{c['number']}. {c['title']}" for c in question_data.get("choices", [])
-        )
-        prompt = f"""Translate the following Japanese quiz content into natural English.
-Return JSON only in this format:
-{{
-  "question": "...",
-  "choices": {{
-    "1": "...",
-    "2": "...",
-    "3": "...",
-    "4": "..."
-  }}
-}}
-
-Question: {question_data.get("question", "")}
-Choices:
-{choices_ja}"""
-
-        response = model.generate_content(prompt)
-        content = response.text.strip()
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        import json
-        data = json.loads(content.strip())
-        # choicesのキーをintに変換
-        choices_en = {int(k): v for k, v in data.get("choices", {}).items()}
-        print(f"  質問EN: {data.get('question', '')}")
-        return {"question": data.get("question", ""), "choices": choices_en}
-    except Exception as e:
-        print(f"  ⚠️ 翻訳失敗: {e} → 日本語をそのまま使用")
-        choices_fallback = {c["number"]: c["title"] for c in question_data.get("choices", [])}
-        return {"question": question_data.get("question", ""), "choices": choices_fallback}
+    """質問と選択肢を英訳する（生成時の英訳 → 翻訳メモリ → Gemini の順）"""
+    from translation import get_translator
+    translations = get_translator().translate(question_data)
+    print(f"  質問EN: {translations['question']}")
+    return translations
 
 
 def _build_description(question_data: dict) -> str:
@@ -262,12 +258,25 @@ def main():
         action="store_true",
         help="AI動画生成をスキップしてプレースホルダーを使用",
     )
+    parser.add_argument(
+        "--profile",
+        choices=profile_names(),
+        default=None,
+        help="エンコードプロファイル（draft / publish / archive など、省略時は設定ファイルの値）",
+    )
+    parser.add_argument(
+        "--no-video-cache",
+        action="store_true",
+        help="生成済みのAI動画を再利用せず、必ず新しく生成する",
+    )
     args = parser.parse_args()
 
     result = generate_video(
         category=args.category,
         test_mode=args.test,
         skip_ai_videos=args.skip_videos,
+        profile=args.profile,
+        use_video_cache=not args.no_video_cache,
     )
 
     sys.exit(0 if result["success"] else 1)
@@ -5,11 +5,19 @@ LumaAI Ray3.14 APIを使用して高品質な動画を生成
 
 import os
 import time
-import requests
+import shutil
 import asyncio
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from generation_poller import AdaptivePoller, retry_after_seconds
+from http_transport import get_http_transport
+from downloader import DownloadError, get_downloader
+from luma_client import AsyncLumaClient, luma_base_url
+from video_cache import GeneratedVideoCache
+from job_journal import JobJournal
+from hedging import HedgeBudget
+from generation_scheduler import get_generation_scheduler
 
 load_dotenv()
 
@@ -17,23 +25,41 @@ load_dotenv()
 class AIVideoGenerator:
     """LumaAI API を使用した動画生成クラス"""
     
-    def __init__(self):
-        """初期化"""
+    def __init__(
+        self,
+        normalizer=None,
+        use_cache: bool = True,
+        journal: Optional[JobJournal] = None,
+        priority: str = "scheduled"
+    ):
+        """
+        Args:
+            normalizer: ダウンロード直後に動画を正規化する ClipNormalizer（オプション）
+            use_cache: 同じプロンプト・パラメータの生成済み動画を再利用するか
+            journal: 送信した生成IDを記録し、再起動後に再接続する JobJournal（オプション）
+            priority: 生成の優先度（manual: 手動のテスト実行 / scheduled: 定期実行 / backfill: 作り置き）
+        """
         self.api_key = os.getenv("LUMAAI_API_KEY")
         
         if not self.api_key:
             raise ValueError("LUMAAI_API_KEY が設定されていません")
         
-        self.base_url = "https://api.lumalabs.ai/v1/generations"
+        # ローカルの疑似サーバーなどに向ける場合は LUMAAI_BASE_URL で上書き
+        self.base_url = luma_base_url()
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        # ホストごとに接続を使い回す（ポーリングのたびに接続し直さない）
+        self.http = get_http_transport()
+        # 一時ファイルに書いて置き換え、中断したら Range で続きから再開する
+        self.downloader = get_downloader()
         
         # デフォルト設定
         self.default_config = {
             "aspect_ratio": "9:16",  # YouTubeショート用（縦型）
             "duration": 5,  # 秒
+            "model": os.getenv("LUMAAI_MODEL"),  # 省略時はAPIの既定モデル
         }
         
         # リトライ設定
@@ -42,6 +68,38 @@ class AIVideoGenerator:
         
         # タイムアウト設定
         self.generation_timeout = 300  # 5分
+        
+        # ポーリング間隔（過去の生成時間から完了見込みまで待ち、近づいたら間隔を詰める）
+        self.poll_interval = 5  # 秒
+        self.poller = AdaptivePoller(base_interval=self.poll_interval)
+        
+        # 同時接続数（generate_multiple_videos の非同期クライアント用）
+        self.max_connections = 20
+        
+        # 送信のレートと同時に処理中の生成数はプロセス全体で制限する
+        # （LUMAAI_SCHEDULER_LOCK_DIR を指定すると同時に動く他のプロセスとも共有）
+        self.scheduler = get_generation_scheduler()
+        self.priority = priority
+        
+        # ダウンロード直後の正規化（合成時の変換を省く）
+        self.normalizer = normalizer
+        
+        # 生成済み動画のキャッシュ（LUMAAI_VIDEO_CACHE=0 または use_cache=False で無効）
+        self.cache = None
+        if use_cache and os.getenv("LUMAAI_VIDEO_CACHE", "1") != "0":
+            self.cache = GeneratedVideoCache(
+                cache_dir=os.getenv("LUMAAI_VIDEO_CACHE_DIR"),
+                max_bytes=int(os.getenv("LUMAAI_VIDEO_CACHE_MAX_MB", "2048")) * 1024 * 1024
+            )
+        
+        # 生成ジョブのジャーナル（プロセスが再起動しても送信済みの生成に再接続する）
+        self.journal = journal
+        
+        # ヘッジ生成（generate_multiple_videos(hedge=True) で、遅れている選択肢に重複の生成を出す）
+        self.hedge_budget = HedgeBudget(
+            daily_limit=int(os.getenv("LUMAAI_HEDGE_DAILY_LIMIT", "10")),
+            quantile=float(os.getenv("LUMAAI_HEDGE_QUANTILE", "0.75"))
+        )
     
     def generate_video(
         self,
@@ -62,20 +120,47 @@ class AIVideoGenerator:
         """
         print(f"🎬 動画生成開始: {prompt[:50]}...")
         
+        cache_key = self._cache_key(prompt, duration)
+        if self._from_cache(cache_key, output_path):
+            return output_path
+        
+        # 前回の実行で送信済みなら再接続する
+        pending = None
+        if self.journal is not None:
+            if self.journal.downloaded(output_path, prompt):
+                print(f"♻️ 前回ダウンロード済み: {output_path}")
+                return output_path
+            pending = self.journal.pending_generation(output_path, prompt)
+        
         for attempt in range(self.max_retries):
+            ticket = None
             try:
-                # 生成リクエストを送信
-                generation_id = self._create_generation(prompt, duration)
-                
-                if not generation_id:
-                    print(f"⚠️ 生成リクエスト失敗（試行 {attempt + 1}/{self.max_retries}）")
-                    time.sleep(self.retry_delay)
-                    continue
+                if pending:
+                    generation_id = pending["generation_id"]
+                    elapsed = pending["elapsed"]
+                    pending = None
+                    print(f"🔁 生成に再接続: {generation_id}（送信から{elapsed:.0f}秒）")
+                else:
+                    # 生成リクエストを送信（スケジューラーの許可を待ってから）
+                    ticket = self.scheduler.acquire(self.priority)
+                    generation_id = self._create_generation(prompt, duration)
+                    elapsed = 0.0
+                    
+                    if not generation_id:
+                        print(f"⚠️ 生成リクエスト失敗（試行 {attempt + 1}/{self.max_retries}）")
+                        time.sleep(self.retry_delay)
+                        continue
+                    if self.journal is not None:
+                        self.journal.record_submitted(output_path, prompt, duration, generation_id)
                 
                 # 生成完了を待機
-                video_url = self._wait_for_completion(generation_id)
+                video_url = self._wait_for_completion(generation_id, duration, elapsed)
+                self.scheduler.release(ticket)
+                ticket = None
                 
                 if not video_url:
+                    if self.journal is not None:
+                        self.journal.record_failed(output_path, generation_id)
                     print(f"⚠️ 生成タイムアウト（試行 {attempt + 1}/{self.max_retries}）")
                     time.sleep(self.retry_delay)
                     continue
@@ -85,6 +170,10 @@ class AIVideoGenerator:
                 
                 if success:
                     print(f"✅ 動画生成完了: {output_path}")
+                    self._store_in_cache(cache_key, output_path, prompt, duration)
+                    self._normalize(output_path)
+                    if self.journal is not None:
+                        self.journal.record_downloaded(output_path)
                     return output_path
                 else:
                     print(f"⚠️ ダウンロード失敗（試行 {attempt + 1}/{self.max_retries}）")
@@ -94,10 +183,55 @@ class AIVideoGenerator:
                 print(f"❌ エラー発生: {e}（試行 {attempt + 1}/{self.max_retries}）")
                 if attempt < self.max_retries - 1:
                     time.sleep(self.retry_delay)
+            finally:
+                self.scheduler.release(ticket)
         
         print(f"❌ 動画生成失敗: 最大試行回数を超えました")
         return None
     
+    def _cache_key(self, prompt: str, duration: int) -> Optional[str]:
+        """生成動画キャッシュのキー（キャッシュ無効時はNone）"""
+        if self.cache is None:
+            return None
+        return self.cache.key(
+            prompt, self.default_config["aspect_ratio"], duration, self.default_config["model"]
+        )
+    
+    def _from_cache(self, cache_key: Optional[str], output_path: str) -> bool:
+        """キャッシュ済みなら output_path にコピーして正規化まで済ませる"""
+        if cache_key is None or not self.cache.get(cache_key, output_path):
+            return False
+        print(f"♻️ 生成済み動画を再利用: {output_path}")
+        self._normalize(output_path)
+        return True
+    
+    def _store_in_cache(self, cache_key: Optional[str], video_path: str, prompt: str, duration: int) -> None:
+        """生成した動画をキャッシュに登録"""
+        if cache_key is None:
+            return
+        try:
+            self.cache.store(cache_key, video_path, metadata={
+                "prompt": prompt,
+                "aspect_ratio": self.default_config["aspect_ratio"],
+                "duration": duration,
+                "model": self.default_config["model"],
+            })
+        except OSError as e:
+            print(f"⚠️ 生成動画キャッシュの保存エラー: {e}")
+    
+    def _normalize(self, video_path: str) -> None:
+        """
+        ダウンロードした動画を正規化キャッシュに登録
+        
+        元ファイルはそのまま残す（Remotion など元動画を使う経路があるため）
+        """
+        if not self.normalizer or not self.normalizer.enabled:
+            return
+        try:
+            self.normalizer.normalize(video_path)
+        except Exception as e:
+            print(f"⚠️ 正規化エラー（合成時に再試行します）: {e}")
+    
     def _create_generation(self, prompt: str, duration: int) -> Optional[str]:
         """
         動画生成リクエストを作成
@@ -113,13 +247,14 @@ class AIVideoGenerator:
             "prompt": prompt,
             "aspect_ratio": self.default_config["aspect_ratio"],
         }
+        if self.default_config["model"]:
+            payload["model"] = self.default_config["model"]
         
         try:
-            response = requests.post(
+            response = self.http.post(
                 self.base_url,
                 headers=self.headers,
-                json=payload,
-                timeout=30
+                json=payload
             )
             
             if response.status_code == 201:
@@ -136,26 +271,36 @@ class AIVideoGenerator:
             print(f"❌ リクエストエラー: {e}")
             return None
     
-    def _wait_for_completion(self, generation_id: str) -> Optional[str]:
+    def _wait_for_completion(self, generation_id: str, duration: int = 5, elapsed: float = 0.0) -> Optional[str]:
         """
         動画生成の完了を待機
         
+        過去の生成時間の分布から完了見込みまで待ってから短い間隔で確認する。
+        429 / Retry-After が返ったらその秒数だけ待つ
+        
         Args:
             generation_id: 生成ID
+            duration: 動画の長さ（生成時間の分布を分けるキー）
+            elapsed: 送信からすでに経過した秒数（再接続時）
             
         Returns:
             動画URL
         """
-        start_time = time.time()
-        poll_interval = 5  # 5秒ごとにチェック
+        start_time = time.time() - elapsed
+        poll_key = AdaptivePoller.key(self.default_config["model"], duration)
+        polls = 0
         
-        while time.time() - start_time < self.generation_timeout:
+        # 再接続時は経過時間にかかわらず一度は状態を確認する
+        checked = False
+        while not checked or time.time() - start_time < self.generation_timeout:
+            checked = True
+            delay = self.poller.next_delay(poll_key, time.time() - start_time)
             try:
-                response = requests.get(
+                response = self.http.get(
                     f"{self.base_url}/{generation_id}",
-                    headers=self.headers,
-                    timeout=30
+                    headers=self.headers
                 )
+                polls += 1
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -166,25 +311,37 @@ class AIVideoGenerator:
                     if state == "completed":
                         video_url = data.get("assets", {}).get("video")
                         if video_url:
+                            resumed = elapsed > 0
+                            elapsed = time.time() - start_time
+                            if not resumed:
+                                # 再接続した生成は完了時刻が分からないので分布に加えない
+                                self.poller.record(poll_key, elapsed)
                             print(f"✅ 生成完了！")
+                            self._report_polls(polls, elapsed)
                             return video_url
                     elif state == "failed":
                         print(f"❌ 生成失敗")
                         return None
-                    
-                    # 引き続き待機
-                    time.sleep(poll_interval)
                 else:
                     print(f"❌ ステータス確認エラー: {response.status_code}")
-                    time.sleep(poll_interval)
+                    retry_after = retry_after_seconds(response.headers)
+                    if response.status_code == 429 or retry_after is not None:
+                        delay = max(delay, retry_after or self.poll_interval)
                     
             except Exception as e:
                 print(f"❌ ポーリングエラー: {e}")
-                time.sleep(poll_interval)
+            
+            # 引き続き待機
+            time.sleep(max(0.0, min(delay, self.generation_timeout - (time.time() - start_time))))
         
         print(f"⏱️ タイムアウト: {self.generation_timeout}秒経過")
         return None
     
+    def _report_polls(self, polls: int, elapsed: float) -> None:
+        """ポーリング回数を固定間隔の場合と比較して表示"""
+        fixed = self.poller.fixed_interval_polls(elapsed)
+        print(f"📊 ポーリング {polls}回 / {elapsed:.0f}秒（固定{self.poll_interval}秒間隔なら{fixed}回）")
+    
     def _download_video(self, video_url: str, output_path: str) -> bool:
         """
         動画をダウンロード
@@ -198,32 +355,50 @@ class AIVideoGenerator:
         """
         try:
             print(f"⬇️ ダウンロード中...")
-            
-            response = requests.get(video_url, stream=True, timeout=60)
-            
-            if response.status_code == 200:
-                # ディレクトリが存在しない場合は作成
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                
-                with open(output_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                print(f"✅ ダウンロード完了: {output_path}")
-                return True
-            else:
-                print(f"❌ ダウンロードエラー: {response.status_code}")
-                return False
-                
+            self.downloader.download(video_url, output_path)
+            print(f"✅ ダウンロード完了: {output_path}")
+            return True
+        except DownloadError as e:
+            print(f"❌ ダウンロードエラー: {e}")
+            return False
         except Exception as e:
             print(f"❌ ダウンロード例外: {e}")
             return False
     
+    def async_client(self, hedge: bool = False) -> AsyncLumaClient:
+        """
+        この設定の非同期クライアントを作成
+        
+        複数の質問の動画を1プロセスでまとめて生成する場合は、
+        1つのクライアントを async with で開いて generate / generate_many を同時に呼ぶ
+        
+        Args:
+            hedge: 過去の生成時間の分位点を超えた生成に重複の生成を出すか（1日の上限は hedge_budget）
+        """
+        return AsyncLumaClient(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            aspect_ratio=self.default_config["aspect_ratio"],
+            max_connections=self.max_connections,
+            poller=self.poller,
+            journal=self.journal,
+            downloader=self.downloader,
+            hedge_budget=self.hedge_budget if hedge else None,
+            scheduler=self.scheduler,
+            priority=self.priority,
+            model=self.default_config["model"],
+            generation_timeout=self.generation_timeout,
+            max_retries=self.max_retries,
+            retry_delay=self.retry_delay
+        )
+    
     def generate_multiple_videos(
         self,
         prompts: List[str],
         output_dir: str,
-        duration: int = 5
+        duration: int = 5,
+        on_video_ready: Optional[Callable[[int, Optional[str]], None]] = None,
+        hedge: bool = False
     ) -> Dict[int, Optional[str]]:
         """
         複数の動画を並列生成
@@ -232,6 +407,37 @@ class AIVideoGenerator:
             prompts: プロンプトのリスト
             output_dir: 出力ディレクトリ
             duration: 各動画の長さ
+            on_video_ready: 1本ごとに結果が出た時点で呼ぶ処理（インデックス, 動画パス（失敗時はNone））
+            hedge: 過去の生成時間の p75 を超えた選択肢に重複の生成を出し、先に完了した方を使うか
+            
+        Returns:
+            {インデックス: 動画パス} の辞書
+        """
+        return asyncio.run(
+            self.generate_multiple_videos_async(prompts, output_dir, duration, on_video_ready, hedge)
+        )
+    
+    async def generate_multiple_videos_async(
+        self,
+        prompts: List[str],
+        output_dir: str,
+        duration: int = 5,
+        on_video_ready: Optional[Callable[[int, Optional[str]], None]] = None,
+        hedge: bool = False
+    ) -> Dict[int, Optional[str]]:
+        """
+        複数の動画を並列生成（非同期版）
+        
+        全生成を一度に送信し、1つのタスクでまとめてポーリングし、完了したものから並行してダウンロードする
+        
+        Args:
+            prompts: プロンプトのリスト
+            output_dir: 出力ディレクトリ
+            duration: 各動画の長さ
+            on_video_ready: 1本ごとに結果が出た時点で呼ぶ処理（インデックス, 動画パス（失敗時はNone））。
+                全体の完了を待たずに後続の処理（セクションのエンコードなど）を始めるために使う
+            hedge: 過去の生成時間の p75 を超えた選択肢に重複の生成を出し、先に完了した方を使うか。
+                遅れた方の生成は取り消さずに無視する（1日の件数は LUMAAI_HEDGE_DAILY_LIMIT まで）
             
         Returns:
             {インデックス: 動画パス} の辞書
@@ -239,36 +445,99 @@ class AIVideoGenerator:
         print(f"🎬 {len(prompts)}本の動画を並列生成します...")
         
         results = {}
+        # 同じキーのプロンプトは1回だけ生成する {キー: [選択肢番号, ...]}
+        pending: Dict[str, List[int]] = {}
+        output_paths = {}
+        for i, prompt in enumerate(prompts):
+            index = i + 1
+            output_paths[index] = os.path.join(output_dir, f"choice_{index}.mp4")
+            cache_key = self._cache_key(prompt, duration)
+            if self._from_cache(cache_key, output_paths[index]):
+                results[index] = output_paths[index]
+                if on_video_ready:
+                    on_video_ready(index, output_paths[index])
+            else:
+                # キャッシュ無効時は重複をまとめない
+                pending.setdefault(cache_key or f"uncached_{index}", []).append(index)
         
-        # 並列生成（最大4並列）
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_index = {}
-            
-            for i, prompt in enumerate(prompts):
-                output_path = os.path.join(output_dir, f"choice_{i+1}.mp4")
-                future = executor.submit(
-                    self.generate_video,
-                    prompt,
-                    output_path,
-                    duration
-                )
-                future_to_index[future] = i + 1
-            
-            # 結果を収集
-            for future in as_completed(future_to_index):
-                index = future_to_index[future]
-                try:
-                    video_path = future.result()
-                    results[index] = video_path
-                    print(f"✅ 選択肢{index}の動画: {'完了' if video_path else '失敗'}")
-                except Exception as e:
-                    print(f"❌ 選択肢{index}で例外発生: {e}")
-                    results[index] = None
+        stats = None
+        if pending:
+            async with self.async_client(hedge) as client:
+                generated = await asyncio.gather(*(
+                    self._generate_once(client, indices, prompts, output_paths, duration, on_video_ready)
+                    for indices in pending.values()
+                ))
+            # 終了時に未完了だった遅い方の生成の分まで含める
+            stats = client.stats()
+            for paths in generated:
+                results.update(paths)
+        
+        results = dict(sorted(results.items()))
+        for index, video_path in results.items():
+            print(f"✅ 選択肢{index}の動画: {'完了' if video_path else '失敗'}")
         
         success_count = sum(1 for v in results.values() if v is not None)
         print(f"\n📊 結果: {success_count}/{len(prompts)} 本の動画を生成")
+        if stats:
+            print(
+                f"📡 リクエスト: 送信 {stats['submits']} / ポーリング {stats['polls']} "
+                f"（固定{self.poll_interval}秒間隔なら約{stats['fixed_interval_polls']}回）/ ダウンロード {stats['downloads']}"
+            )
+            if stats["resumed"]:
+                print(f"🔁 前回の実行から引き継いだ生成: {stats['resumed']}本")
+            scheduler_stats = self.scheduler.stats()
+            if scheduler_stats["rate_limited"] or scheduler_stats["concurrency_limited"]:
+                print(
+                    f"🚦 スケジューラー: 最大待ち {scheduler_stats['max_queue_depth']}件 / "
+                    f"平均待ち {scheduler_stats['avg_wait_seconds']:.1f}秒 / "
+                    f"レート制限 {scheduler_stats['rate_limited']}回 / 同時実行の上限 {scheduler_stats['concurrency_limited']}回"
+                )
+            if stats["hedges"]:
+                budget = self.hedge_budget.stats()
+                unresolved = f"（うち{stats['hedge_unresolved']}本は下限）" if stats["hedge_unresolved"] else ""
+                print(
+                    f"🪂 ヘッジ: 追加 {stats['hedges']} / 先に完了 {stats['hedge_wins']} / "
+                    f"短縮 {stats['hedge_saved_seconds']:.0f}秒{unresolved} / "
+                    f"本日 {budget['used']}/{budget['daily_limit']}件（累計 短縮 {budget['saved_seconds']:.0f}秒）"
+                )
+        if self.cache is not None:
+            cache_stats = self.cache.stats()
+            print(f"♻️ 生成動画キャッシュ: ヒット {cache_stats['hits']} / ミス {cache_stats['misses']}")
         
         return results
+    
+    async def _generate_once(
+        self,
+        client: AsyncLumaClient,
+        indices: List[int],
+        prompts: List[str],
+        output_paths: Dict[int, str],
+        duration: int,
+        on_video_ready: Optional[Callable[[int, Optional[str]], None]] = None
+    ) -> Dict[int, Optional[str]]:
+        """
+        同じキーの選択肢をまとめて1回生成し、キャッシュに登録する
+        
+        Returns:
+            {インデックス: 動画パス} の辞書（同じキーの選択肢には同じ動画をコピーする）
+        """
+        prompt = prompts[indices[0] - 1]
+        
+        def on_downloaded(video_path: str) -> None:
+            self._store_in_cache(self._cache_key(prompt, duration), video_path, prompt, duration)
+            self._normalize(video_path)
+        
+        video_path = await client.generate(prompt, output_paths[indices[0]], duration, on_downloaded)
+        
+        results = {}
+        for index in indices:
+            if video_path and output_paths[index] != video_path:
+                await asyncio.to_thread(shutil.copyfile, video_path, output_paths[index])
+                await asyncio.to_thread(self._normalize, output_paths[index])
+            results[index] = output_paths[index] if video_path else None
+            if on_video_ready:
+                on_video_ready(index, results[index])
+        return results
 
 
 if __name__ == "__main__":
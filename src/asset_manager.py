@@ -4,11 +4,13 @@ Pexels APIを使用してフリー素材を取得・管理
 """
 
 import os
-import requests
 import hashlib
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
+from http_transport import get_http_transport
+from downloader import get_downloader
+
 load_dotenv()
 
 
@@ -28,6 +30,8 @@ class AssetManager:
         self.cache_dir = cache_dir
         self.base_url = "https://api.pexels.com/v1"
         self.headers = {"Authorization": self.api_key}
+        self.http = get_http_transport()
+        self.downloader = get_downloader()
         
         # キャッシュディレクトリを作成
         os.makedirs(cache_dir, exist_ok=True)
@@ -59,7 +63,7 @@ class AssetManager:
             "per_page": per_page
         }
         
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.http.get(url, headers=self.headers, params=params)
         response.raise_for_status()
         
         data = response.json()
@@ -89,7 +93,7 @@ class AssetManager:
             "per_page": per_page
         }
         
-        response = requests.get(url, headers=self.headers, params=params)
+        response = self.http.get(url, headers=self.headers, params=params)
         response.raise_for_status()
         
         data = response.json()
@@ -123,13 +127,8 @@ class AssetManager:
             print(f"キャッシュから読み込み: {filepath}")
             return filepath
         
-        # ダウンロード
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        # ダウンロード（一時ファイルに書いてから置き換えるので、途中で止まってもキャッシュは壊れない）
+        self.downloader.download(url, filepath)
         
         print(f"素材をダウンロードしました: {filepath}")
         return filepath
@@ -0,0 +1,198 @@
+"""
+BGMミックスモジュール
+BGMを一度だけデコードしてPCMをキャッシュし、NumPyでループ・ダッキング・ミックスする
+"""
+
+import hashlib
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+
+from ffmpeg_renderer import FFMPEG_BINARY, AUDIO_SAMPLE_RATE
+
+
+class BGMMixer:
+    """
+    BGMミキサー
+
+    デコード済みのPCM（float32 ステレオ）をディスクに .npy で保存し、プロセス内では
+    LRU でメモリマップを保持する。同じBGMを使う動画をまとめて作っても
+    デコードは1回だけになる。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, sample_rate: int = AUDIO_SAMPLE_RATE, max_entries: int = 4):
+        """
+        Args:
+            cache_dir: デコード済みPCMの保存先（省略時は プロジェクト/cache/bgm）
+            sample_rate: デコードするサンプルレート
+            max_entries: プロセス内に保持するBGMの最大数
+        """
+        if cache_dir is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache_dir = os.path.join(project_root, "cache", "bgm")
+        self.cache_dir = cache_dir
+        self.sample_rate = sample_rate
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 統計
+        self.decodes = 0
+        self.hits = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def decode(self, bgm_path: str) -> np.ndarray:
+        """
+        BGMをデコードしたPCMを取得（キャッシュ済みなら再デコードしない）
+
+        Returns:
+            (サンプル数, 2) の float32 配列
+        """
+        key = self._key(bgm_path)
+
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pcm
+
+        path = os.path.join(self.cache_dir, f"{key}.npy")
+        if os.path.exists(path):
+            with self._lock:
+                self.hits += 1
+        else:
+            print(f"🎵 BGMをデコード中: {os.path.basename(bgm_path)}")
+            result = subprocess.run(
+                [
+                    FFMPEG_BINARY, "-hide_banner", "-loglevel", "error",
+                    "-i", bgm_path,
+                    "-f", "f32le", "-ac", "2", "-ar", f"{self.sample_rate}",
+                    "pipe:1"
+                ],
+                capture_output=True
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"BGMのデコードに失敗しました: {result.stderr.decode('utf-8', errors='replace')[-2000:]}")
+            decoded = np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, 2)
+            # 書き込み途中のファイルを読まれないように一時ファイル経由で保存
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp_path, decoded)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.decodes += 1
+
+        pcm = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._memory[key] = pcm
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return pcm
+
+    def mix(
+        self,
+        voice: Optional[np.ndarray],
+        bgm_path: str,
+        volume: float,
+        duration: float,
+        ducking: Optional[Dict] = None
+    ) -> np.ndarray:
+        """
+        元の音声にBGMをループしてミックス
+
+        Args:
+            voice: 元の音声（(サンプル数, 2)、Noneの場合は無音）
+            bgm_path: BGMファイルパス
+            volume: BGMの音量
+            duration: 出力の長さ（秒）
+            ducking: ダッキング設定（threshold / ratio / attack / release、Noneまたは enabled: false で無効）
+
+        Returns:
+            (サンプル数, 2) の float32 配列
+        """
+        n_samples = int(round(duration * self.sample_rate))
+        pcm = self.decode(bgm_path)
+        if len(pcm) == 0:
+            raise RuntimeError(f"BGMが空です: {bgm_path}")
+
+        # ループはインデックスの剰余で取り出す（ループ分のクリップを作らない）
+        mixed = np.take(pcm, np.arange(n_samples) % len(pcm), axis=0)
+        mixed *= volume
+
+        if voice is None:
+            return mixed
+
+        voice = np.asarray(voice, dtype=np.float32)[:n_samples]
+        if voice.ndim == 1:
+            voice = voice[:, None]
+        if voice.shape[1] == 1:
+            voice = np.repeat(voice, 2, axis=1)
+        if ducking and ducking.get('enabled', True):
+            mixed *= self._ducking_gain(voice, n_samples, ducking)[:, None]
+        mixed[:len(voice)] += voice
+        return mixed
+
+    def stats(self) -> Dict:
+        """デコード回数とキャッシュヒット数"""
+        return {"decodes": self.decodes, "hits": self.hits}
+
+    def _key(self, bgm_path: str) -> str:
+        """BGMファイル（パス・サイズ・更新時刻）とサンプルレートからキーを生成"""
+        stat = os.stat(bgm_path)
+        params = f"{os.path.abspath(bgm_path)}|{stat.st_size}|{stat.st_mtime}|{self.sample_rate}"
+        return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+    def _ducking_gain(self, voice: np.ndarray, n_samples: int, ducking: Dict) -> np.ndarray:
+        """
+        元の音声の大きさに応じたBGMのゲイン（ffmpeg の sidechaincompress 相当）
+
+        10ms ブロックごとのピークでコンプレッサーのゲインを計算し、
+        アタック・リリースで平滑化してからサンプル単位に補間する
+        """
+        threshold = ducking.get('threshold', 0.05)
+        ratio = ducking.get('ratio', 8)
+        block = max(1, self.sample_rate // 100)
+
+        # 音声が終わった後も無音としてブロックを続け、リリースでゲインを 1.0 に戻す
+        n_blocks = -(-max(len(voice), n_samples) // block)
+        padded = np.zeros((n_blocks * block, voice.shape[1]), dtype=np.float32)
+        padded[:len(voice)] = voice
+        level = np.abs(padded).reshape(n_blocks, -1).max(axis=1)
+
+        # しきい値を超えた分を ratio 分の1に圧縮するゲイン
+        over = np.maximum(level, threshold) / threshold
+        target = over ** (1.0 / ratio - 1.0)
+
+        # アタック（ゲインを下げる）とリリース（戻す）の平滑化
+        attack = np.exp(-10.0 / max(ducking.get('attack', 20), 1e-3))
+        release = np.exp(-10.0 / max(ducking.get('release', 400), 1e-3))
+        smoothed = np.empty_like(target)
+        gain = 1.0
+        for i, value in enumerate(target):
+            coefficient = attack if value < gain else release
+            gain = value + (gain - value) * coefficient
+            smoothed[i] = gain
+
+        centers = np.arange(n_blocks) * block + block / 2
+        return np.interp(np.arange(n_samples), centers, smoothed).astype(np.float32)
+
+
+_bgm_mixers: Dict[str, BGMMixer] = {}
+
+
+def get_bgm_mixer(cache_dir: Optional[str] = None) -> BGMMixer:
+    """
+    プロセス内で共有するBGMミキサーを取得
+
+    Args:
+        cache_dir: キャッシュディレクトリ（省略時は プロジェクト/cache/bgm）
+    """
+    key = os.path.abspath(cache_dir) if cache_dir else ""
+    if key not in _bgm_mixers:
+        _bgm_mixers[key] = BGMMixer(cache_dir)
+    return _bgm_mixers[key]
@@ -0,0 +1,192 @@
+"""
+動画正規化モジュール
+AI生成動画を一度だけ ffmpeg で最終解像度・fps・尺に変換し、変換結果をキャッシュする
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import yaml
+
+from ffmpeg_renderer import (
+    FFMPEG_BINARY, AUDIO_BITRATE, AUDIO_CHANNEL_LAYOUT, AUDIO_SAMPLE_RATE,
+    probe_has_audio, run_ffmpeg
+)
+
+
+class ClipNormalizer:
+    """
+    選択肢動画の正規化（1080x1920 / 設定fps / 目標尺）とキャッシュ
+
+    キャッシュの合計サイズが上限を超えたら、最後に使われた時刻（ファイルの更新時刻）が古いものから削除する。
+    使われてから protect_seconds 以内の動画はレンダリング中かもしれないので削除しない。
+    """
+
+    def __init__(self, config_path: str = "config/video_config.yaml", config: Optional[Dict] = None):
+        """
+        Args:
+            config_path: 設定ファイルのパス
+            config: 読み込み済みの設定（指定時は config_path を読まない）
+        """
+        self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        if config is None:
+            config = {}
+            if os.path.exists(config_path):
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    config = yaml.safe_load(f)
+
+        video_config = config.get('video', {})
+        self.width, self.height = video_config.get('resolution', [1080, 1920])
+        self.fps = video_config.get('fps', 30)
+        self.duration = video_config.get('duration', {}).get('choice', 8)
+
+        normalization_config = config.get('normalization', {})
+        self.enabled = normalization_config.get('enabled', False)
+        # Discordに投稿された動画も受信時に変換するか
+        self.on_discord_attachment = normalization_config.get('on_discord_attachment', False)
+        self.crf = normalization_config.get('crf', 18)
+        self.preset = normalization_config.get('preset', 'veryfast')
+        cache_dir = normalization_config.get('cache_dir', 'cache/normalized')
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(self.project_root, cache_dir)
+        self.cache_dir = cache_dir
+        self.max_bytes = normalization_config.get('cache_max_mb', 1024) * 1024 * 1024
+        self.protect_seconds = normalization_config.get('protect_seconds', 3600)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # ファイルハッシュのメモ（パス, サイズ, 更新時刻）→ ハッシュ
+        self._hash_memo: Dict[Tuple[str, int, float], str] = {}
+        # 同じ出力を複数スレッドで同時に変換しないためのロック
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._evict_lock = threading.Lock()
+
+    def normalize(self, source_path: str, duration: Optional[float] = None) -> str:
+        """
+        動画を正規化してキャッシュ内のパスを返す
+
+        同じ内容・同じ変換パラメータの動画はすでに変換済みならそのまま返す
+
+        Args:
+            source_path: 元動画のパス
+            duration: 目標の長さ（秒、省略時は選択肢セクションの長さ）
+
+        Returns:
+            正規化済み動画のパス
+        """
+        duration = duration or self.duration
+        key = self._cache_key(source_path, duration)
+        output_path = os.path.join(self.cache_dir, f"{key}.mp4")
+
+        with self._lock_for(key):
+            if os.path.exists(output_path):
+                # 最後に使われた時刻として更新時刻を進める（LRU）
+                os.utime(output_path)
+                self.hits += 1
+                return output_path
+
+            print(f"🔧 動画を正規化中: {os.path.basename(source_path)}")
+            tmp_path = f"{output_path}.{os.getpid()}.tmp.mp4"
+            try:
+                run_ffmpeg(self._build_command(source_path, tmp_path, duration))
+                os.replace(tmp_path, output_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.misses += 1
+
+        self._evict()
+        return output_path
+
+    def is_normalized(self, path: str) -> bool:
+        """正規化済み（キャッシュ内の）動画かどうか"""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば、最近使われていないものから削除"""
+        with self._evict_lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".mp4") or ".tmp" in name:
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            protect_after = time.time() - self.protect_seconds
+            for mtime, size, path in sorted(entries):
+                if total <= self.max_bytes or mtime >= protect_after:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def _cache_key(self, source_path: str, duration: float) -> str:
+        """元動画の内容ハッシュと変換パラメータからキーを生成"""
+        params = {
+            "source": self._file_hash(source_path),
+            "resolution": [self.width, self.height],
+            "fps": self.fps,
+            "duration": duration,
+            "crf": self.crf,
+            "preset": self.preset,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _file_hash(self, path: str) -> str:
+        """ファイル内容の SHA-256（同じファイルは再計算しない）"""
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+        if memo_key not in self._hash_memo:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            self._hash_memo[memo_key] = digest.hexdigest()
+        return self._hash_memo[memo_key]
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _build_command(self, source_path: str, output_path: str, duration: float) -> list:
+        """正規化用の ffmpeg コマンド（ループ・縦型リサイズ・中央クロップ・fps変換）"""
+        cmd = [
+            FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+            "-stream_loop", "-1", "-i", source_path,
+            "-t", f"{duration}",
+            "-vf", (
+                f"scale=-2:{self.height},"
+                f"crop='min(iw,{self.width})':{self.height},"
+                f"pad={self.width}:{self.height}:(ow-iw)/2:0,"
+                f"fps={self.fps},setsar=1"
+            ),
+            "-c:v", "libx264",
+            "-preset", self.preset,
+            "-crf", f"{self.crf}",
+            "-pix_fmt", "yuv420p",
+        ]
+        if probe_has_audio(source_path):
+            cmd += [
+                "-af", f"aformat=sample_rates={AUDIO_SAMPLE_RATE}:channel_layouts={AUDIO_CHANNEL_LAYOUT},apad",
+                "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+            ]
+        else:
+            cmd += ["-an"]
+        cmd += ["-movflags", "+faststart", output_path]
+        return cmd
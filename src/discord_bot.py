@@ -4,6 +4,7 @@ Discord Bot モジュール - シンプル版
 """
 
 import os
+import asyncio
 import discord
 from discord.ext import tasks
 from datetime import time, datetime
@@ -37,9 +38,10 @@ VIDEO_DIR.mkdir(parents=True, exist_ok=True)
 active_questions: Dict[int, Dict] = {}
 
 # モジュール（遅延初期化）
-question_generator = None
+question_pool = None
 youtube_uploader = None
 discord_notifier = None
+clip_normalizer = None
 
 
 @client.event
@@ -52,6 +54,9 @@ async def on_ready():
     # データ復元
     load_active_questions()
     
+    # フォントの検索・読み込みを起動時に1回だけ済ませる
+    await asyncio.get_running_loop().run_in_executor(None, warm_up_fonts)
+    
     # 定期タスク開始
     if not post_daily_question.is_running():
         post_daily_question.start()
@@ -135,12 +140,12 @@ async def post_daily_question():
 
 async def post_question():
     """お題を生成してDiscordに投稿"""
-    global question_generator
+    global question_pool
 
-    # モジュール初期化
-    if question_generator is None:
-        from question_generator import QuestionGenerator
-        question_generator = QuestionGenerator()
+    # モジュール初期化（作り置きの質問から取り出し、減ったらバックグラウンドで補充する）
+    if question_pool is None:
+        from question_pool import QuestionPool
+        question_pool = QuestionPool()
     
     # チャンネル取得
     channel = client.get_channel(QUESTION_CHANNEL_ID)
@@ -150,7 +155,7 @@ async def post_question():
     
     # 質問生成
     print("📝 質問生成中...")
-    question_data = question_generator.generate_question()
+    question_data = question_pool.generate_question()
     
     # Embed作成
     embed = create_question_embed(question_data)
@@ -251,6 +256,7 @@ async def handle_thread_message(message):
         await video.save(video_path)
         
         question_info['videos'][choice_number] = str(video_path)
+        schedule_normalization(str(video_path))
         
         # 確認
         await message.add_reaction('✅')
@@ -266,6 +272,38 @@ async def handle_thread_message(message):
         await finalize_question(thread_id)
 
 
+def warm_up_fonts():
+    """フォントを読み込み、よく使う文字のグリフをウォームアップ"""
+    try:
+        from font_registry import COMMON_CHARACTERS, get_font_registry
+        registry = get_font_registry()
+        elapsed = registry.warm_up([COMMON_CHARACTERS])
+        print(f"🔤 フォントウォームアップ完了: {elapsed * 1000:.0f}ms（{registry.resolve()}）")
+    except Exception as e:
+        print(f"⚠️ フォントウォームアップエラー: {e}")
+
+
+def schedule_normalization(video_path: str):
+    """受信した動画の正規化をバックグラウンドで実行（設定で有効な場合のみ）"""
+    global clip_normalizer
+
+    if clip_normalizer is None:
+        from clip_normalizer import ClipNormalizer
+        config_path = Path(__file__).parent.parent / "config" / "video_config.yaml"
+        clip_normalizer = ClipNormalizer(config_path=str(config_path))
+
+    if not (clip_normalizer.enabled and clip_normalizer.on_discord_attachment):
+        return
+
+    def normalize():
+        try:
+            clip_normalizer.normalize(video_path)
+        except Exception as e:
+            print(f"⚠️ 正規化エラー: {e}")
+
+    asyncio.get_running_loop().run_in_executor(None, normalize)
+
+
 async def finalize_question(thread_id: int):
     """4本揃ったら最終処理"""
     global youtube_uploader, discord_notifier
@@ -312,7 +350,7 @@ async def finalize_question(thread_id: int):
                 "videoPath": video_path,
             })
 
-        # 2. Gemini英訳
+        # 2. 英訳（生成時の英訳がなければ翻訳メモリ・Gemini）
         translations = _translate_to_english_sync(question_data)
         for rc in remotion_choices:
             rc['textEn'] = translations['choices'].get(rc['number'], rc['text'])
@@ -436,43 +474,9 @@ def create_youtube_description(question_data: Dict) -> str:
 
 
 def _translate_to_english_sync(question_data: dict) -> dict:
-    """Geminiで質問と選択肢を英訳する（同期版）"""
-    try:
-        import google.generativeai as genai
-        import json as _json
-        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        choices_ja = "\n".join(
-            f"{c['number']}. {c['title']}" for c in question_data.get("choices", [])
-        )
-        prompt = f"""Translate the following Japanese quiz content into natural English.
-Return JSON only in this format:
-{{
-  "question": "...",
-  "choices": {{
-    "1": "...",
-    "2": "...",
-    "3": "...",
-    "4": "..."
-  }}
-}}
-
-Question: {question_data.get("question", "")}
-Choices:
-{choices_ja}"""
-        response = model.generate_content(prompt)
-        content = response.text.strip()
-        if content.startswith("```"):
-            content = content.split("```")[1]
-            if content.startswith("json"):
-                content = content[4:]
-        data = _json.loads(content.strip())
-        choices_en = {int(k): v for k, v in data.get("choices", {}).items()}
-        return {"question": data.get("question", ""), "choices": choices_en}
-    except Exception as e:
-        print(f"  ⚠️ 翻訳失敗: {e} → 日本語をそのまま使用")
-        choices_fallback = {c["number"]: c["title"] for c in question_data.get("choices", [])}
-        return {"question": question_data.get("question", ""), "choices": choices_fallback}
+    """質問と選択肢を英訳する（同期版。生成時の英訳 → 翻訳メモリ → Gemini の順）"""
+    from translation import get_translator
+    return get_translator().translate(question_data)
 
 
 def save_active_questions():
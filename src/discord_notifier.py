@@ -8,6 +8,8 @@ from typing import Dict, Optional
 from discord_webhook import DiscordWebhook, DiscordEmbed
 from dotenv import load_dotenv
 
+from http_transport import get_http_transport
+
 load_dotenv()
 
 
@@ -23,6 +25,9 @@ class DiscordNotifier:
         
         if not self.webhook_url:
             raise ValueError("DISCORD_WEBHOOK_URL が設定されていません")
+        
+        # 通知ごとに接続し直さないよう、共有のセッションで送信する
+        self.http = get_http_transport()
     
     def send_notification(
         self,
@@ -72,10 +77,14 @@ class DiscordNotifier:
         
         webhook.add_embed(embed)
         
-        # 送信
-        response = webhook.execute()
+        # 送信（ペイロードの組み立てだけ DiscordWebhook に任せる）
+        try:
+            response = self.http.post(self.webhook_url, json=webhook.json)
+        except Exception as e:
+            print(f"Discord通知の送信に失敗しました: {e}")
+            return False
         
-        if response.status_code == 200:
+        if response.status_code in (200, 204):
             print("Discord通知を送信しました")
             return True
         else:
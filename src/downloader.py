@@ -0,0 +1,308 @@
+"""
+ダウンロードモジュール
+一時ファイルに書いてから置き換え、HTTP Range で途中から再開し、大きいファイルは範囲ごとに並列で取得する
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from http_transport import HTTPTransport, get_http_transport
+
+
+class DownloadError(Exception):
+    """ダウンロードに失敗した（再試行しても完了しなかった）"""
+
+
+class ResumableDownloader:
+    """
+    再開できるダウンロード
+
+    - 書き込みは「出力パス.part」に行い、サイズを確認してから出力パスに置き換える
+      （途中で止まっても壊れたファイルが出力パスに残らない）
+    - 失敗したら .part の続きから Range で再開する
+    - Range に対応したサーバーの大きいファイルは、範囲ごとに並列で取得する
+    - チャンクサイズはファイルサイズに合わせて決める
+    """
+
+    def __init__(
+        self,
+        transport: Optional[HTTPTransport] = None,
+        max_attempts: int = 4,
+        retry_delay: float = 1.0,
+        segment_threshold: int = 8 * 1024 * 1024,
+        max_segments: int = 4,
+        min_chunk_size: int = 64 * 1024,
+        max_chunk_size: int = 1024 * 1024,
+        timeout: Tuple[float, float] = (5.0, 60.0)
+    ):
+        """
+        Args:
+            transport: 使用する HTTPTransport（省略時はプロセス共通のもの）
+            max_attempts: 再開を含めた最大試行回数
+            retry_delay: 再試行までの待ち時間（秒、試行ごとに倍）
+            segment_threshold: これ以上のサイズなら範囲ごとに並列で取得する（バイト）
+            max_segments: 並列に取得する範囲の数（1なら並列にしない）
+            min_chunk_size: チャンクサイズの下限（バイト）
+            max_chunk_size: チャンクサイズの上限（バイト）
+            timeout: (接続, 読み込み) タイムアウト（秒）
+        """
+        self.transport = transport or get_http_transport()
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.segment_threshold = segment_threshold
+        self.max_segments = max_segments
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+        # 統計
+        self.downloads = 0
+        self.bytes = 0
+        self.resumed = 0
+        self.segmented = 0
+
+    def download(self, url: str, output_path: str, headers: Optional[Dict] = None) -> int:
+        """
+        URLの内容を output_path に保存
+
+        Args:
+            url: ダウンロードURL
+            output_path: 出力パス
+            headers: 追加のリクエストヘッダー
+
+        Returns:
+            ダウンロードしたバイト数
+
+        Raises:
+            DownloadError: 最大試行回数を超えても完了しなかった場合
+        """
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_path = f"{output_path}.part"
+        headers = dict(headers or {})
+
+        # 前回の途中のファイルは、同じURLのものだけ続きから再開する
+        source_path = f"{tmp_path}.url"
+        if os.path.exists(tmp_path) or os.path.exists(f"{tmp_path}.0"):
+            previous = None
+            if os.path.exists(source_path):
+                with open(source_path, 'r', encoding='utf-8') as f:
+                    previous = f.read()
+            if previous != url:
+                self._discard(tmp_path)
+        with open(source_path, 'w', encoding='utf-8') as f:
+            f.write(url)
+
+        size, accepts_ranges = self._probe(url, headers)
+        try:
+            if (
+                size and accepts_ranges
+                and self.max_segments > 1
+                and size >= self.segment_threshold
+            ):
+                self._download_segments(url, tmp_path, headers, size)
+                with self._lock:
+                    self.segmented += 1
+            else:
+                size = self._download_stream(url, tmp_path, headers, size)
+
+            actual = os.path.getsize(tmp_path)
+            if size is not None and actual != size:
+                raise DownloadError(f"サイズが一致しません: {actual} / {size} バイト")
+        except DownloadError:
+            # 別の内容の続きとして再開しないよう、途中のファイルは残さない
+            self._discard(tmp_path)
+            raise
+
+        os.replace(tmp_path, output_path)
+        os.remove(source_path)
+        with self._lock:
+            self.downloads += 1
+            self.bytes += actual
+        return actual
+
+    def stats(self) -> Dict:
+        """ダウンロードの統計"""
+        with self._lock:
+            return {
+                "downloads": self.downloads,
+                "bytes": self.bytes,
+                "resumed": self.resumed,
+                "segmented": self.segmented,
+            }
+
+    def chunk_size(self, size: Optional[int]) -> int:
+        """ファイルサイズに合わせたチャンクサイズ（1ファイルあたり約64回の読み込み）"""
+        if not size:
+            return self.min_chunk_size
+        return max(self.min_chunk_size, min(self.max_chunk_size, size // 64))
+
+    def _discard(self, tmp_path: str) -> None:
+        """途中のファイル（範囲ごとの一時ファイルを含む）を削除"""
+        paths = [tmp_path, f"{tmp_path}.url"] + [f"{tmp_path}.{i}" for i in range(self.max_segments)]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _probe(self, url: str, headers: Dict) -> Tuple[Optional[int], bool]:
+        """
+        HEAD でサイズと Range 対応を確認
+
+        Returns:
+            (サイズ（不明ならNone）, Range に対応しているか)
+        """
+        try:
+            response = self.transport.request(
+                "HEAD", url, headers=headers, timeout=self.timeout, allow_redirects=True
+            )
+        except requests.RequestException:
+            return None, False
+        if response.status_code != 200:
+            return None, False
+        length = response.headers.get("Content-Length")
+        size = int(length) if length and length.isdigit() else None
+        return size, response.headers.get("Accept-Ranges", "").lower() == "bytes"
+
+    def _download_stream(self, url: str, tmp_path: str, headers: Dict, size: Optional[int]) -> Optional[int]:
+        """
+        1本のストリームでダウンロード（失敗したら .part の続きから再開）
+
+        Returns:
+            全体のサイズ（レスポンスから分からなければNone）
+        """
+        for attempt in range(self.max_attempts):
+            offset = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+            if size is not None and offset == size:
+                return size
+            try:
+                size = self._fetch_range(url, tmp_path, headers, offset, None, size)
+                return size
+            except (requests.RequestException, DownloadError, OSError) as e:
+                if attempt + 1 >= self.max_attempts:
+                    raise DownloadError(f"ダウンロード失敗: {e}") from e
+                print(f"⚠️ ダウンロード中断（{attempt + 1}/{self.max_attempts}）、続きから再開します: {e}")
+                time.sleep(self.retry_delay * (2 ** attempt))
+        return size
+
+    def _download_segments(self, url: str, tmp_path: str, headers: Dict, size: int) -> None:
+        """範囲ごとに並列で取得し、.part にまとめる（範囲ごとの一時ファイルから再開できる）"""
+        segment_size = -(-size // self.max_segments)
+        ranges = [
+            (start, min(start + segment_size, size) - 1)
+            for start in range(0, size, segment_size)
+        ]
+        segment_paths = [f"{tmp_path}.{i}" for i in range(len(ranges))]
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [
+                executor.submit(self._download_segment, url, path, headers, start, end, size)
+                for path, (start, end) in zip(segment_paths, ranges)
+            ]
+            for future in futures:
+                future.result()
+
+        with open(tmp_path, 'wb') as out:
+            for path in segment_paths:
+                with open(path, 'rb') as f:
+                    while True:
+                        block = f.read(self.max_chunk_size)
+                        if not block:
+                            break
+                        out.write(block)
+        for path in segment_paths:
+            os.remove(path)
+
+    def _download_segment(
+        self, url: str, path: str, headers: Dict, start: int, end: int, size: int
+    ) -> None:
+        """1つの範囲を取得（失敗したら範囲内の続きから再開）"""
+        expected = end - start + 1
+        for attempt in range(self.max_attempts):
+            done = os.path.getsize(path) if os.path.exists(path) else 0
+            if done >= expected:
+                return
+            try:
+                self._fetch_range(url, path, headers, start + done, end, size, base=start)
+                return
+            except (requests.RequestException, DownloadError, OSError) as e:
+                if attempt + 1 >= self.max_attempts:
+                    raise DownloadError(f"範囲 {start}-{end} のダウンロード失敗: {e}") from e
+                time.sleep(self.retry_delay * (2 ** attempt))
+
+    def _fetch_range(
+        self,
+        url: str,
+        path: str,
+        headers: Dict,
+        offset: int,
+        end: Optional[int],
+        size: Optional[int],
+        base: int = 0
+    ) -> Optional[int]:
+        """
+        offset から end まで（end=None なら最後まで）を取得して path に追記
+
+        Args:
+            base: path の先頭がファイル全体のどこにあたるか（範囲ごとの一時ファイル用）
+
+        Returns:
+            全体のサイズ（分からなければNone）
+        """
+        request_headers = dict(headers)
+        if offset > base or end is not None:
+            request_headers["Range"] = f"bytes={offset}-{'' if end is None else end}"
+
+        with self.transport.get(url, headers=request_headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 206:
+                if offset > base:
+                    with self._lock:
+                        self.resumed += 1
+                mode = 'ab'
+                total = _content_range_total(response.headers.get("Content-Range"))
+                size = total or size
+            elif response.status_code == 200:
+                if base or end is not None:
+                    raise DownloadError("サーバーが Range に対応していません")
+                # 続きからの取得に対応していないので最初から書き直す
+                mode = 'wb'
+                offset = 0
+                length = response.headers.get("Content-Length")
+                if length and length.isdigit():
+                    size = int(length)
+            elif response.status_code == 416 and size is not None and offset >= size:
+                return size
+            else:
+                raise DownloadError(f"HTTP {response.status_code}")
+
+            expected = (end + 1 if end is not None else size)
+            with open(path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size(size)):
+                    f.write(chunk)
+
+        if expected is not None and base + os.path.getsize(path) < expected:
+            raise DownloadError(f"途中で切断されました: {base + os.path.getsize(path)} / {expected} バイト")
+        return size
+
+
+def _content_range_total(value: Optional[str]) -> Optional[int]:
+    """Content-Range（bytes 0-99/1234）から全体のサイズを取り出す"""
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
+
+_downloader: Optional[ResumableDownloader] = None
+
+
+def get_downloader() -> ResumableDownloader:
+    """プロセス内で共有するダウンローダーを取得"""
+    global _downloader
+    if _downloader is None:
+        _downloader = ResumableDownloader()
+    return _downloader
@@ -0,0 +1,150 @@
+"""
+エンコードプロファイルモジュール
+draft / publish / archive などの名前付きエンコード設定を読み込み、各レンダラー用の引数に変換する
+"""
+
+import os
+from typing import Dict, List, Optional
+import yaml
+
+
+# 設定ファイルに encoding セクションがない場合のプロファイル
+DEFAULT_PROFILES = {
+    # 確認用: 速度優先（画質・サイズは気にしない）
+    "draft": {
+        "preset": "ultrafast",
+        "crf": 30,
+        "tune": None,
+        "threads": 0,
+        "gop": 2,
+        "audio_bitrate": "128k",
+    },
+    # 投稿用: これまでの固定設定（medium / 4スレッド）と同等
+    "publish": {
+        "preset": "medium",
+        "crf": 23,
+        "tune": None,
+        "threads": 4,
+        "gop": 2,
+        "audio_bitrate": "192k",
+    },
+    # 保存用: 速度より画質
+    "archive": {
+        "preset": "slow",
+        "crf": 18,
+        "tune": "film",
+        "threads": 0,
+        "gop": 4,
+        "audio_bitrate": "256k",
+    },
+}
+
+DEFAULT_PROFILE_NAME = "publish"
+
+
+def _load_config() -> Dict:
+    """プロジェクトの config/video_config.yaml を読み込む"""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config_path = os.path.join(project_root, "config", "video_config.yaml")
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_encoder_profile(name: Optional[str] = None, config: Optional[Dict] = None) -> Dict:
+    """
+    エンコードプロファイルを取得
+
+    Args:
+        name: プロファイル名（省略時は設定ファイルの encoding.profile）
+        config: 読み込み済みの設定（省略時は config/video_config.yaml を読む）
+
+    Returns:
+        プロファイル（preset / crf / tune / threads / gop / audio_bitrate / name）
+    """
+    if config is None:
+        config = _load_config()
+
+    encoding_config = config.get('encoding', {})
+    profiles = {**DEFAULT_PROFILES, **encoding_config.get('profiles', {})}
+    name = name or encoding_config.get('profile', DEFAULT_PROFILE_NAME)
+    if name not in profiles:
+        raise ValueError(f"不明なエンコードプロファイル: {name}（{', '.join(profiles)}）")
+
+    # 設定ファイル側で省略された項目は publish の値で補う
+    return {**DEFAULT_PROFILES[DEFAULT_PROFILE_NAME], **profiles[name], "name": name}
+
+
+def profile_names(config: Optional[Dict] = None) -> List[str]:
+    """利用可能なプロファイル名の一覧（config 省略時は設定ファイルから）"""
+    if config is None:
+        config = _load_config()
+    encoding_config = config.get('encoding', {})
+    return list({**DEFAULT_PROFILES, **encoding_config.get('profiles', {})})
+
+
+def ffmpeg_video_args(profile: Dict, fps: int) -> List[str]:
+    """
+    ffmpeg コマンド用の映像エンコード引数
+
+    Args:
+        profile: エンコードプロファイル
+        fps: フレームレート（GOP長の秒数をフレーム数に変換する）
+    """
+    args = [
+        "-c:v", "libx264",
+        "-preset", profile['preset'],
+        "-crf", f"{profile['crf']}",
+    ]
+    if profile.get('tune'):
+        args += ["-tune", profile['tune']]
+    args += [
+        "-pix_fmt", "yuv420p",
+        "-r", f"{fps}",
+        "-g", f"{int(profile['gop'] * fps)}",
+    ]
+    if profile.get('threads'):
+        args += ["-threads", f"{profile['threads']}"]
+    return args
+
+
+def moviepy_write_kwargs(profile: Dict, fps: int) -> Dict:
+    """
+    MoviePy の write_videofile 用の引数
+
+    Args:
+        profile: エンコードプロファイル
+        fps: フレームレート
+    """
+    ffmpeg_params = [
+        "-crf", f"{profile['crf']}",
+        "-pix_fmt", "yuv420p",
+        "-g", f"{int(profile['gop'] * fps)}",
+    ]
+    if profile.get('tune'):
+        ffmpeg_params += ["-tune", profile['tune']]
+    return {
+        'fps': fps,
+        'codec': 'libx264',
+        'audio_codec': 'aac',
+        'audio_bitrate': profile['audio_bitrate'],
+        'preset': profile['preset'],
+        'threads': profile.get('threads') or None,
+        'ffmpeg_params': ffmpeg_params,
+        'logger': None,
+    }
+
+
+def remotion_render_args(profile: Dict) -> List[str]:
+    """
+    npx remotion render 用の引数
+
+    Remotion が公開していない tune / GOP長 はRemotionの既定値のまま
+    """
+    return [
+        "--codec", "h264",
+        "--crf", f"{profile['crf']}",
+        "--x264-preset", profile['preset'],
+        "--audio-bitrate", profile['audio_bitrate'],
+    ]
@@ -0,0 +1,270 @@
+"""
+LumaAI 疑似サーバーモジュール
+クレジットを使わずに生成・ポーリング・ダウンロードを試すための、ローカルの /v1/generations 互換サーバー
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class FakeLumaServer:
+    """
+    LumaAI 生成APIのローカルの代用
+
+    - POST /v1/generations: 生成を受け付けて ID を返す
+    - GET  /v1/generations/{id}: 経過時間に応じて queued → dreaming → completed / failed を返す
+    - GET / HEAD /assets/{id}.mp4: 指定サイズの動画データを返す（Range 対応）
+
+    生成時間は中央値と p95 を指定した対数正規分布から決める。
+
+    使い方:
+        with FakeLumaServer(latency_median=3, latency_p95=10) as server:
+            generator.base_url = server.base_url
+            ...
+            print(server.stats())
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_median: float = 3.0,
+        latency_p95: float = 8.0,
+        failure_rate: float = 0.0,
+        error_rate: float = 0.0,
+        asset_bytes: int = 2 * 1024 * 1024,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            host: 待ち受けるアドレス
+            port: 待ち受けるポート（0なら空いているポート）
+            latency_median: 生成時間の中央値（秒）
+            latency_p95: 生成時間の p95（秒、中央値以下なら一定）
+            failure_rate: 生成が failed になる割合
+            error_rate: API リクエストが 500 を返す割合
+            asset_bytes: 動画データのサイズ（バイト）
+            seed: 乱数のシード（再現したい場合）
+        """
+        self.latency_median = latency_median
+        self.latency_p95 = latency_p95
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self.asset_bytes = asset_bytes
+        self._random = random.Random(seed)
+        self._asset = bytes(range(256)) * (asset_bytes // 256) + bytes(asset_bytes % 256)
+        self._lock = threading.Lock()
+        # {生成ID: {"ready_at": ..., "failed": ...}}
+        self._generations: Dict[str, Dict] = {}
+        self._counts = {"create": 0, "status": 0, "asset": 0, "head": 0, "errors": 0, "bytes_sent": 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """生成APIのURL（AIVideoGenerator.base_url / LUMAAI_BASE_URL に設定する）"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/generations"
+
+    def start(self) -> "FakeLumaServer":
+        """バックグラウンドのスレッドで待ち受けを始める"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """このスレッドで待ち受ける（Ctrl+C まで）"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """待ち受けを止める"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLumaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self) -> Dict:
+        """受け付けたリクエストの数と送ったバイト数"""
+        with self._lock:
+            return dict(self._counts, generations=len(self._generations))
+
+    def sample_latency(self) -> float:
+        """生成時間を1つ決める（対数正規分布）"""
+        if self.latency_p95 <= self.latency_median:
+            return self.latency_median
+        sigma = math.log(self.latency_p95 / self.latency_median) / 1.645
+        return self._random.lognormvariate(math.log(self.latency_median), sigma)
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += amount
+
+    def _create(self) -> Dict:
+        """生成を受け付ける"""
+        generation_id = str(uuid.uuid4())
+        with self._lock:
+            latency = self.sample_latency()
+            failed = self._random.random() < self.failure_rate
+            self._generations[generation_id] = {
+                "created_at": time.monotonic(),
+                "ready_at": time.monotonic() + latency,
+                "failed": failed,
+            }
+        return {"id": generation_id, "state": "queued", "assets": None}
+
+    def _status(self, generation_id: str, host: str) -> Optional[Dict]:
+        """生成の状態（存在しない ID ならNone）"""
+        with self._lock:
+            generation = self._generations.get(generation_id)
+        if generation is None:
+            return None
+        now = time.monotonic()
+        if now < generation["ready_at"]:
+            state = "queued" if now - generation["created_at"] < 0.5 else "dreaming"
+            return {"id": generation_id, "state": state, "assets": None}
+        if generation["failed"]:
+            return {"id": generation_id, "state": "failed", "failure_reason": "fake failure", "assets": None}
+        return {
+            "id": generation_id,
+            "state": "completed",
+            "assets": {"video": f"http://{host}/assets/{generation_id}.mp4"},
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send_json(self, status: int, body: Dict) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _api_error(self) -> bool:
+                """error_rate の割合で 500 を返す"""
+                if server._random.random() >= server.error_rate:
+                    return False
+                server._count("errors")
+                self._send_json(500, {"detail": "fake server error"})
+                return True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                if not self.path.rstrip("/").endswith("/v1/generations"):
+                    self._send_json(404, {"detail": "not found"})
+                    return
+                server._count("create")
+                if self._api_error():
+                    return
+                self._send_json(201, server._create())
+
+            def do_HEAD(self) -> None:
+                server._count("head")
+                if not self.path.startswith("/assets/"):
+                    self.send_response(405)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(server.asset_bytes))
+                self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+
+            def do_GET(self) -> None:
+                if self.path.startswith("/assets/"):
+                    self._send_asset()
+                    return
+                prefix = "/v1/generations/"
+                if not self.path.startswith(prefix):
+                    self._send_json(404, {"detail": "not found"})
+                    return
+                server._count("status")
+                if self._api_error():
+                    return
+                status = server._status(self.path[len(prefix):], self.headers.get("Host", ""))
+                if status is None:
+                    self._send_json(404, {"detail": "generation not found"})
+                else:
+                    self._send_json(200, status)
+
+            def _send_asset(self) -> None:
+                server._count("asset")
+                size = server.asset_bytes
+                start, end = 0, size - 1
+                range_header = self.headers.get("Range")
+                if range_header and range_header.startswith("bytes="):
+                    first, _, last = range_header[len("bytes="):].partition("-")
+                    start = int(first or 0)
+                    end = min(int(last), size - 1) if last else size - 1
+                    if start >= size:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.send_header("Accept-Ranges", "bytes")
+                self.end_headers()
+                view = memoryview(server._asset)
+                for offset in range(start, end + 1, 256 * 1024):
+                    self.wfile.write(view[offset:min(offset + 256 * 1024, end + 1)])
+                server._count("bytes_sent", end - start + 1)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='LumaAI 疑似サーバー')
+    parser.add_argument('--port', type=int, default=8765, help='待ち受けるポート')
+    parser.add_argument('--latency-median', type=float, default=3.0, help='生成時間の中央値（秒）')
+    parser.add_argument('--latency-p95', type=float, default=8.0, help='生成時間の p95（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='生成が failed になる割合')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='API リクエストが 500 を返す割合')
+    parser.add_argument('--asset-mb', type=float, default=2.0, help='動画データのサイズ（MB）')
+    args = parser.parse_args()
+
+    server = FakeLumaServer(
+        port=args.port,
+        latency_median=args.latency_median,
+        latency_p95=args.latency_p95,
+        failure_rate=args.failure_rate,
+        error_rate=args.error_rate,
+        asset_bytes=int(args.asset_mb * 1024 * 1024)
+    )
+    print(f"🧪 LumaAI 疑似サーバー: {server.base_url}")
+    print(f"   LUMAAI_BASE_URL={server.base_url} を設定して実行してください（Ctrl+C で終了）")
+    server.serve_forever()
+    print(f"📊 {server.stats()}")
@@ -0,0 +1,642 @@
+"""
+ffmpegレンダリングモジュール
+選択式質問動画のレイアウトを1回の ffmpeg filter_complex 呼び出しにコンパイルする
+（フレームをPythonに通さずに合成・エンコードする）
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+from typing import Dict, List, Optional
+
+from encoder_profiles import ffmpeg_video_args, get_encoder_profile
+from text_overlay import OverlayCache, get_overlay_cache
+
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+
+# 無音トラックの形式（セクション間で音声形式を揃える）
+AUDIO_SAMPLE_RATE = 44100
+AUDIO_CHANNEL_LAYOUT = "stereo"
+AUDIO_BITRATE = "192k"
+
+# ストリームコピーで結合するときに一致している必要があるパラメータ
+CONCAT_STREAM_KEYS = {
+    "video": ["codec_name", "profile", "width", "height", "pix_fmt", "r_frame_rate", "time_base"],
+    "audio": ["codec_name", "sample_rate", "channels", "channel_layout"],
+}
+
+
+def probe_has_audio(path: str) -> bool:
+    """動画ファイルに音声ストリームがあるか確認"""
+    try:
+        result = subprocess.run(
+            [
+                FFPROBE_BINARY, "-v", "error",
+                "-select_streams", "a",
+                "-show_entries", "stream=index",
+                "-of", "csv=p=0",
+                path
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        return bool(result.stdout.strip())
+    except Exception:
+        return False
+
+
+def probe_stream_params(path: str) -> Optional[Dict]:
+    """
+    結合可否の判定に使うストリームパラメータを取得
+
+    Returns:
+        {"video": {...}, "audio": {...}, "duration": 秒}（取得失敗時はNone）
+    """
+    try:
+        result = subprocess.run(
+            [
+                FFPROBE_BINARY, "-v", "error",
+                "-show_entries", "stream:format=duration",
+                "-of", "json",
+                path
+            ],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        data = json.loads(result.stdout)
+    except Exception:
+        return None
+
+    params = {"video": None, "audio": None, "duration": float(data.get("format", {}).get("duration", 0))}
+    for stream in data.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind in CONCAT_STREAM_KEYS and params[kind] is None:
+            params[kind] = {key: stream.get(key) for key in CONCAT_STREAM_KEYS[kind]}
+    return params
+
+
+def bgm_filters(
+    source_label: str,
+    bgm_index: int,
+    volume: float,
+    duration: float,
+    ducking: Optional[Dict] = None
+) -> List[str]:
+    """
+    BGMをループ・ダッキングして元の音声にミックスするフィルタ
+
+    BGMは aloop でデコード済みのサンプルをループする（ファイルを繰り返しデコードしない）。
+    ダッキング有効時は元の音声をサイドチェインにしてBGMを sidechaincompress で下げる。
+
+    Args:
+        source_label: 元の音声のラベル（例: "[0:a]"）
+        bgm_index: BGMの入力番号
+        volume: BGMの音量
+        duration: 出力の長さ（秒）
+        ducking: ダッキング設定（threshold / ratio / attack / release、Noneまたは enabled: false で無効）
+
+    Returns:
+        フィルタのリスト（出力ラベルは [aout]）
+    """
+    audio_format = f"aformat=sample_rates={AUDIO_SAMPLE_RATE}:channel_layouts={AUDIO_CHANNEL_LAYOUT}"
+    filters = [
+        f"[{bgm_index}:a]aloop=loop=-1:size=2e9,volume={volume},{audio_format},"
+        f"atrim=duration={duration}[bgm]"
+    ]
+    if ducking and ducking.get('enabled', True):
+        filters.append(f"{source_label}{audio_format},asplit=2[voice][sidechain]")
+        filters.append(
+            f"[bgm][sidechain]sidechaincompress="
+            f"threshold={ducking.get('threshold', 0.05)}:ratio={ducking.get('ratio', 8)}:"
+            f"attack={ducking.get('attack', 20)}:release={ducking.get('release', 400)}[ducked]"
+        )
+        filters.append("[voice][ducked]amix=inputs=2:duration=first:normalize=0[aout]")
+    else:
+        filters.append(f"{source_label}[bgm]amix=inputs=2:duration=first:normalize=0[aout]")
+    return filters
+
+
+def concat_segments(
+    segment_paths: List[str],
+    output_path: str,
+    bgm_path: Optional[str] = None,
+    bgm_volume: float = 0.3,
+    bgm_ducking: Optional[Dict] = None,
+    video_encoder_args: Optional[List[str]] = None,
+    audio_bitrate: str = AUDIO_BITRATE
+) -> bool:
+    """
+    セグメントを結合して1本の動画にする
+
+    すべてのセグメントのストリームパラメータが一致する場合は concat demuxer で
+    ストリームコピー（再エンコードなし）、一致しない場合は concat フィルタで再エンコードする。
+    BGMがある場合でも映像はコピーし、音声のみミックスして再エンコードする。
+
+    Args:
+        segment_paths: セグメントファイルのリスト（再生順）
+        output_path: 出力ファイルパス
+        bgm_path: BGMファイルパス（オプション）
+        bgm_volume: BGMの音量
+        bgm_ducking: BGMのダッキング設定（bgm_filters を参照）
+        video_encoder_args: 再エンコード時の映像エンコード設定（省略時は libx264 medium）
+        audio_bitrate: 音声を再エンコードする場合のビットレート
+
+    Returns:
+        ストリームコピーで結合できた場合True
+    """
+    probes = [probe_stream_params(path) for path in segment_paths]
+    reference = probes[0]
+    stream_copy = all(
+        probe is not None
+        and probe["video"] is not None
+        and probe["audio"] is not None
+        and probe["video"] == reference["video"]
+        and probe["audio"] == reference["audio"]
+        for probe in probes
+    )
+    use_bgm = bool(bgm_path and os.path.exists(bgm_path))
+    total_duration = sum(probe["duration"] for probe in probes if probe)
+
+    with tempfile.TemporaryDirectory(prefix="concat_") as work_dir:
+        cmd = [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error"]
+
+        if stream_copy:
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for path in segment_paths:
+                    escaped = os.path.abspath(path).replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            cmd += ["-f", "concat", "-safe", "0", "-i", list_path]
+            video_label, audio_label = "0:v", "0:a"
+            filters = []
+            next_input = 1
+        else:
+            print("⚠️ セグメントのパラメータが一致しないため再エンコードで結合します")
+            for path in segment_paths:
+                cmd += ["-i", path]
+            labels = "".join(f"[{i}:v][{i}:a]" for i in range(len(segment_paths)))
+            filters = [f"{labels}concat=n={len(segment_paths)}:v=1:a=1[vcat][acat]"]
+            video_label, audio_label = "[vcat]", "[acat]"
+            next_input = len(segment_paths)
+
+        if use_bgm:
+            cmd += ["-i", bgm_path]
+            source_audio = f"[{audio_label}]" if stream_copy else audio_label
+            filters += bgm_filters(source_audio, next_input, bgm_volume, total_duration, bgm_ducking)
+            audio_label = "[aout]"
+
+        if filters:
+            cmd += ["-filter_complex", ";".join(filters)]
+        cmd += ["-map", video_label, "-map", audio_label]
+        if stream_copy:
+            cmd += ["-c:v", "copy"]
+        else:
+            cmd += video_encoder_args or ["-c:v", "libx264", "-preset", "medium", "-pix_fmt", "yuv420p"]
+        cmd += ["-c:a", "copy"] if stream_copy and not use_bgm else ["-c:a", "aac", "-b:a", audio_bitrate]
+        cmd += ["-movflags", "+faststart", output_path]
+
+        run_ffmpeg(cmd)
+
+    return stream_copy
+
+
+def section_jobs(question_data: Dict, choice_videos: Dict[int, str]) -> List[Dict]:
+    """
+    動画を構成するセクションの一覧を作成（再生順）
+
+    各要素は kind（opening / choice / fallback / ending）とレンダリングに必要な値だけを持つ。
+    choice 以外はテキストのみで決まるため、内容が同じなら同じ映像になる。
+
+    Args:
+        question_data: 質問データ
+        choice_videos: {選択肢番号: 動画パス} の辞書
+
+    Returns:
+        セクションジョブのリスト
+    """
+    jobs = [opening_job(question_data)]
+    for choice in question_data.get('choices', []):
+        jobs.append(choice_job(choice, choice_videos.get(choice['number'])))
+    jobs.append(ending_job())
+    return jobs
+
+
+def opening_job(question_data: Dict) -> Dict:
+    """オープニングのセクションジョブ"""
+    return {
+        "name": "opening",
+        "kind": "opening",
+        "question_data": {
+            "question": question_data.get('question', '質問'),
+            "context": question_data.get('context', '')
+        }
+    }
+
+
+def choice_job(choice: Dict, video_path: Optional[str]) -> Dict:
+    """選択肢のセクションジョブ（動画がなければフォールバック）"""
+    number = choice['number']
+    if video_path and os.path.exists(video_path):
+        return {"name": f"choice_{number}", "kind": "choice", "choice": choice, "video_path": video_path}
+    print(f"⚠️ 選択肢{number}の動画が見つかりません: {video_path}")
+    return {"name": f"choice_{number}", "kind": "fallback", "choice": choice}
+
+
+def ending_job() -> Dict:
+    """エンディングのセクションジョブ"""
+    return {"name": "ending", "kind": "ending"}
+
+
+def run_ffmpeg(cmd: List[str]) -> None:
+    """ffmpegを実行し、失敗時は stderr を含めて例外を送出"""
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg 実行エラー: {result.stderr[-2000:]}")
+
+
+class FFmpegQuestionRenderer:
+    """ffmpeg filter_complex による選択式質問動画レンダラー"""
+
+    def __init__(self, config: Dict, overlay_cache: Optional[OverlayCache] = None):
+        """
+        Args:
+            config: QuestionVideoCreator と同じ形式の設定
+            overlay_cache: テキストオーバーレイのキャッシュ（省略時は共有キャッシュ）
+        """
+        self.config = config
+        self.width = config['video']['resolution'][0]
+        self.height = config['video']['resolution'][1]
+        self.fps = config['video']['fps']
+        self.durations = config['video']['duration']
+        self.text_config = config['text_overlay']
+        self.audio_config = config['audio']
+        self.encoder_profile = get_encoder_profile(config=config)
+        self.overlay_cache = overlay_cache or get_overlay_cache(
+            self.text_config.get('cache_dir')
+        )
+
+    def render(
+        self,
+        question_data: Dict,
+        choice_videos: Dict[int, str],
+        output_path: str,
+        bgm_path: Optional[str] = None
+    ) -> str:
+        """
+        選択式質問動画を生成
+
+        Args:
+            question_data: 質問データ
+            choice_videos: {選択肢番号: 動画パス} の辞書
+            output_path: 出力ファイルパス
+            bgm_path: BGMファイルパス（オプション）
+
+        Returns:
+            生成された動画ファイルのパス
+        """
+        sections = self.build_sections(question_data, choice_videos)
+        cmd = self.build_command(sections, output_path, bgm_path)
+        run_ffmpeg(cmd)
+        return output_path
+
+    def render_section(self, section: Dict, output_path: str, threads: Optional[int] = None) -> str:
+        """
+        1セクションだけを結合用の中間ファイルとしてエンコード
+
+        Args:
+            section: セクション定義
+            output_path: 出力ファイルパス
+            threads: エンコードスレッド数（省略時は ffmpeg の自動設定）
+
+        Returns:
+            出力ファイルパス
+        """
+        encoder_args = self.segment_encoder_args()
+        if threads:
+            encoder_args += ["-threads", f"{threads}"]
+        cmd = self.build_command([section], output_path, encoder_args=encoder_args)
+        run_ffmpeg(cmd)
+        return output_path
+
+    def build_sections(
+        self,
+        question_data: Dict,
+        choice_videos: Dict[int, str]
+    ) -> List[Dict]:
+        """
+        オープニング・選択肢4つ・エンディングのセクション定義を作成
+
+        Returns:
+            セクション定義のリスト
+        """
+        return [self.build_section(job) for job in section_jobs(question_data, choice_videos)]
+
+    def build_section(self, job: Dict) -> Dict:
+        """
+        セクションジョブ（section_jobs の要素）からセクション定義を作成
+
+        Returns:
+            セクション定義
+        """
+        kind = job['kind']
+        if kind == 'opening':
+            return self._opening_section(job['question_data'])
+        if kind == 'choice':
+            return self._choice_section(job['choice'], job['video_path'])
+        if kind == 'fallback':
+            return self._fallback_choice_section(job['choice'])
+        return self._ending_section()
+
+    def _overlay(
+        self,
+        x,
+        y,
+        text: str,
+        font_size: int,
+        color,
+        box_width: Optional[int] = None,
+        bg_color=None
+    ) -> Dict:
+        """テキストを PNG に描画（キャッシュ済みなら再利用）してオーバーレイ定義を返す"""
+        path = self.overlay_cache.get_path(
+            text=text,
+            font_path=self.text_config['font'],
+            font_size=font_size,
+            color=color,
+            box_width=box_width,
+            bg_color=bg_color
+        )
+        return {"image": path, "x": self._position(x, "W-w"), "y": self._position(y, "H-h")}
+
+    def _position(self, value, span: str) -> str:
+        """MoviePy形式の位置指定を overlay フィルタの式に変換"""
+        if value == 'center':
+            return f"({span})/2"
+        return str(int(value))
+
+    def _opening_section(self, question_data: Dict) -> Dict:
+        """オープニングのセクション定義"""
+        question_text = question_data.get('question', '質問')
+        context_text = question_data.get('context', '')
+
+        overlays = [
+            self._overlay(
+                'center', self.height * 0.35,
+                text=question_text,
+                font_size=80,
+                color=self.text_config['colors']['accent'],
+                box_width=self.width - 100
+            )
+        ]
+        if context_text:
+            overlays.append(self._overlay(
+                'center', self.height * 0.55,
+                text=context_text,
+                font_size=50,
+                color=self.text_config['colors']['primary'],
+                box_width=self.width - 100
+            ))
+
+        return {
+            "name": "opening",
+            "duration": self.durations['opening'],
+            "source": None,
+            "background": (0, 0, 0),
+            "overlays": overlays,
+            "fade_in": 0.5,
+            "fade_out": 0.0
+        }
+
+    def _choice_section(self, choice: Dict, video_path: str) -> Dict:
+        """AI生成動画を使った選択肢のセクション定義"""
+        number = choice['number']
+        description = choice.get('description', '')
+
+        overlays = [
+            self._overlay(
+                50, 100,
+                text=f"{number}",
+                font_size=100,
+                color=self.text_config['colors']['accent']
+            ),
+            self._overlay(
+                'center', self.height * 0.75,
+                text=choice['title'],
+                font_size=70,
+                color=self.text_config['colors']['primary'],
+                box_width=self.width - 200,
+                bg_color=self.text_config['colors']['background']
+            )
+        ]
+        if description:
+            overlays.append(self._overlay(
+                'center', self.height * 0.85,
+                text=description,
+                font_size=45,
+                color=self.text_config['colors']['primary'],
+                box_width=self.width - 200,
+                bg_color=self.text_config['colors']['background']
+            ))
+
+        return {
+            "name": f"choice_{number}",
+            "duration": self.durations['choice'],
+            "source": video_path,
+            "background": (20, 20, 20),
+            "overlays": overlays,
+            "fade_in": 0.0,
+            "fade_out": 0.0
+        }
+
+    def _fallback_choice_section(self, choice: Dict) -> Dict:
+        """動画がない選択肢のセクション定義"""
+        number = choice['number']
+        overlays = [
+            self._overlay(
+                'center', 'center',
+                text=f"❶{number}\n{choice['title']}",
+                font_size=80,
+                color='white',
+                box_width=self.width - 100
+            )
+        ]
+        return {
+            "name": f"choice_{number}",
+            "duration": self.durations['choice'],
+            "source": None,
+            "background": (20, 20, 20),
+            "overlays": overlays,
+            "fade_in": 0.0,
+            "fade_out": 0.0
+        }
+
+    def _ending_section(self) -> Dict:
+        """エンディングのセクション定義"""
+        overlays = [
+            self._overlay(
+                'center', 'center',
+                text="あなたはどれを選んだ？\n\nコメント欄で教えて！",
+                font_size=70,
+                color=self.text_config['colors']['accent'],
+                box_width=self.width - 100
+            )
+        ]
+        return {
+            "name": "ending",
+            "duration": self.durations['ending'],
+            "source": None,
+            "background": (0, 0, 0),
+            "overlays": overlays,
+            "fade_in": 0.0,
+            "fade_out": 0.5
+        }
+
+    def build_command(
+        self,
+        sections: List[Dict],
+        output_path: str,
+        bgm_path: Optional[str] = None,
+        encoder_args: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        セクション定義から ffmpeg コマンドを組み立てる
+
+        Args:
+            sections: build_sections で作成したセクション定義
+            output_path: 出力ファイルパス
+            bgm_path: BGMファイルパス（オプション）
+            encoder_args: エンコード設定（省略時は encoder_args()）
+
+        Returns:
+            ffmpeg コマンド（引数リスト）
+        """
+        inputs: List[str] = []
+        filters: List[str] = []
+        concat_labels: List[str] = []
+        input_count = 0
+
+        def add_input(*args: str) -> int:
+            nonlocal input_count
+            inputs.extend(args)
+            input_count += 1
+            return input_count - 1
+
+        for i, section in enumerate(sections):
+            duration = section['duration']
+
+            # 背景（AI生成動画 or 単色）
+            source_index = None
+            if section['source']:
+                source_index = add_input(
+                    "-stream_loop", "-1", "-t", f"{duration}", "-i", section['source']
+                )
+                filters.append(
+                    f"[{source_index}:v]scale=-2:{self.height},"
+                    f"crop='min(iw,{self.width})':{self.height},"
+                    f"pad={self.width}:{self.height}:(ow-iw)/2:0,"
+                    f"fps={self.fps},setsar=1,"
+                    f"trim=duration={duration},setpts=PTS-STARTPTS[base{i}]"
+                )
+            else:
+                r, g, b = section['background']
+                filters.append(
+                    f"color=c=0x{r:02x}{g:02x}{b:02x}:s={self.width}x{self.height}:"
+                    f"r={self.fps}:d={duration}[base{i}]"
+                )
+
+            # テキストオーバーレイ
+            label = f"base{i}"
+            for j, overlay in enumerate(section['overlays']):
+                image_index = add_input(
+                    "-loop", "1", "-framerate", f"{self.fps}",
+                    "-t", f"{duration}", "-i", overlay['image']
+                )
+                filters.append(
+                    f"[{label}][{image_index}:v]overlay=x={overlay['x']}:y={overlay['y']}"
+                    f"[ov{i}_{j}]"
+                )
+                label = f"ov{i}_{j}"
+
+            # フェード
+            fades = []
+            if section['fade_in']:
+                fades.append(f"fade=t=in:st=0:d={section['fade_in']}")
+            if section['fade_out']:
+                fades.append(
+                    f"fade=t=out:st={duration - section['fade_out']}:d={section['fade_out']}"
+                )
+            fades.append("format=yuv420p")
+            filters.append(f"[{label}]{','.join(fades)}[v{i}]")
+
+            # 音声（元動画の音声、なければ無音）
+            audio_format = (
+                f"aformat=sample_rates={AUDIO_SAMPLE_RATE}:channel_layouts={AUDIO_CHANNEL_LAYOUT}"
+            )
+            if source_index is not None and probe_has_audio(section['source']):
+                filters.append(
+                    f"[{source_index}:a]{audio_format},apad,"
+                    f"atrim=duration={duration},asetpts=PTS-STARTPTS[a{i}]"
+                )
+            else:
+                filters.append(
+                    f"anullsrc=r={AUDIO_SAMPLE_RATE}:cl={AUDIO_CHANNEL_LAYOUT},"
+                    f"atrim=duration={duration}[a{i}]"
+                )
+
+            concat_labels.append(f"[v{i}][a{i}]")
+
+        filters.append(
+            f"{''.join(concat_labels)}concat=n={len(sections)}:v=1:a=1[vout][acat]"
+        )
+
+        # BGMをミックス（オプション）
+        audio_label = "acat"
+        if bgm_path and os.path.exists(bgm_path):
+            total_duration = sum(section['duration'] for section in sections)
+            bgm_index = add_input("-i", bgm_path)
+            filters += bgm_filters(
+                "[acat]", bgm_index, self.audio_config['bgm_volume'], total_duration,
+                self.audio_config.get('bgm_ducking')
+            )
+            audio_label = "aout"
+
+        return [
+            FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+            *inputs,
+            "-filter_complex", ";".join(filters),
+            "-map", "[vout]", "-map", f"[{audio_label}]",
+            *(encoder_args or self.encoder_args()),
+            output_path
+        ]
+
+    def encoder_args(self) -> List[str]:
+        """エンコード設定（エンコードプロファイルに従う。MoviePy版の write_videofile と同等）"""
+        return [
+            *ffmpeg_video_args(self.encoder_profile, self.fps),
+            "-c:a", "aac",
+            "-b:a", self.encoder_profile['audio_bitrate'],
+            "-movflags", "+faststart"
+        ]
+
+    def segment_encoder_args(self) -> List[str]:
+        """
+        結合用中間ファイルのエンコード設定
+
+        キーフレーム間隔をプロファイルのGOP長に固定（シーンカット挿入なし）し、音声形式も揃えることで
+        どのセグメント同士でもストリームコピーで結合できるようにする
+        （プリセット・CRF などはエンコードプロファイルに従う）
+        """
+        return [
+            *ffmpeg_video_args(self.encoder_profile, self.fps),
+            "-keyint_min", f"{self.fps}",
+            "-sc_threshold", "0",
+            "-c:a", "aac",
+            "-b:a", self.encoder_profile['audio_bitrate'],
+            "-ar", f"{AUDIO_SAMPLE_RATE}",
+            "-ac", "2"
+        ]
@@ -0,0 +1,145 @@
+"""
+フォントレジストリモジュール
+日本語フォントの検索をプロセスごとに1回だけ行い、読み込んだフォントをサイズごとに保持する
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from PIL import ImageFont
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 日本語対応フォントの候補（上から順に検索）
+FONT_CANDIDATES = [
+    # プロジェクト内フォント（最優先）
+    os.path.join(PROJECT_ROOT, "fonts", "NotoSansCJKjp-Bold.otf"),
+    # システムフォント
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJKjp-Bold.otf",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "/usr/share/fonts/truetype/vlgothic/VL-Gothic-Regular.ttf",
+]
+# フォールバック（英語のみ）
+FALLBACK_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+# video_creator / ffmpeg_renderer で使う文字サイズ
+DEFAULT_WARM_UP_SIZES = (45, 50, 70, 80, 100)
+
+# よく使う文字（ウォームアップ用）
+COMMON_CHARACTERS = (
+    "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    "がぎぐげござじずぜぞだぢづでどばびぶべぼぱぴぷぺぽぁぃぅぇぉっゃゅょー"
+    "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワヲン"
+    "ガギグゲゴザジズゼゾダヂヅデドバビブベボパピプペポァィゥェォッャュョ"
+    "0123456789！？、。「」（）・…"
+)
+
+
+class FontRegistry:
+    """
+    フォントレジストリ
+
+    フォントファイルの検索結果と (パス, サイズ) ごとの FreeTypeFont を保持し、
+    同じプロセス内ではファイルシステムの探索やフォントの再読み込みをしない。
+    """
+
+    def __init__(self):
+        self._resolved: Optional[str] = None
+        self._fonts: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
+        self._lock = threading.Lock()
+
+        # 統計
+        self.resolve_seconds = 0.0
+        self.load_seconds = 0.0
+        self.warm_up_seconds = 0.0
+        self.warmed_characters = 0
+
+    def resolve(self) -> str:
+        """日本語対応フォントのパスを返す（検索は初回のみ）"""
+        with self._lock:
+            if self._resolved is None:
+                start = time.perf_counter()
+                self._resolved = next(
+                    (path for path in FONT_CANDIDATES if os.path.exists(path)), FALLBACK_FONT
+                )
+                self.resolve_seconds = time.perf_counter() - start
+            return self._resolved
+
+    def get_font(self, font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+        """
+        読み込み済みのフォントを取得（未読み込みなら読み込んで保持）
+
+        Args:
+            font_path: フォントファイルのパス
+            font_size: フォントサイズ
+        """
+        key = (os.path.abspath(font_path), font_size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                start = time.perf_counter()
+                font = ImageFont.truetype(font_path, font_size)
+                self.load_seconds += time.perf_counter() - start
+                self._fonts[key] = font
+            return font
+
+    def warm_up(
+        self,
+        texts: Iterable[str] = (),
+        font_path: Optional[str] = None,
+        sizes: Iterable[int] = DEFAULT_WARM_UP_SIZES
+    ) -> float:
+        """
+        フォントを読み込み、テキストに含まれる文字のグリフを一度描画しておく
+
+        初回描画時のフォントファイル読み込み（グリフデータのページイン）を
+        レンダリング前に済ませる
+
+        Args:
+            texts: 描画予定のテキスト（質問文・選択肢など）
+            font_path: フォントファイルのパス（省略時は resolve() の結果）
+            sizes: ウォームアップする文字サイズ
+
+        Returns:
+            ウォームアップにかかった秒数
+        """
+        start = time.perf_counter()
+        font_path = font_path or self.resolve()
+        characters = "".join(sorted({char for text in texts for char in text if not char.isspace()}))
+
+        for size in sizes:
+            font = self.get_font(font_path, size)
+            if characters:
+                font.getmask(characters)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.warm_up_seconds += elapsed
+            self.warmed_characters += len(characters)
+        return elapsed
+
+    def stats(self) -> Dict:
+        """検索・読み込み・ウォームアップの所要時間"""
+        with self._lock:
+            return {
+                "font": self._resolved,
+                "loaded_fonts": len(self._fonts),
+                "resolve_seconds": self.resolve_seconds,
+                "load_seconds": self.load_seconds,
+                "warm_up_seconds": self.warm_up_seconds,
+                "warmed_characters": self.warmed_characters,
+            }
+
+
+_font_registry: Optional[FontRegistry] = None
+
+
+def get_font_registry() -> FontRegistry:
+    """プロセス内で共有するフォントレジストリを取得"""
+    global _font_registry
+    if _font_registry is None:
+        _font_registry = FontRegistry()
+    return _font_registry
@@ -0,0 +1,201 @@
+"""
+フレーム合成モジュール
+固定レイアウト（背景＋静止オーバーレイ＋フェード）専用の NumPy 合成カーネル
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class _Overlay:
+    """事前計算済みのオーバーレイ（フレーム内に切り詰めた ROI と乗算済みアルファ）"""
+
+    def __init__(self, rgba: np.ndarray, position: Tuple[int, int], frame_size: Tuple[int, int]):
+        frame_w, frame_h = frame_size
+        h, w = rgba.shape[:2]
+        x, y = position
+
+        # フレームからはみ出す部分を切り詰める
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, frame_w), min(y + h, frame_h)
+        self.empty = x0 >= x1 or y0 >= y1
+        self.slices = (slice(y0, y1), slice(x0, x1))
+        if self.empty:
+            return
+
+        crop = rgba[y0 - y:y1 - y, x0 - x:x1 - x].astype(np.float32)
+        alpha = crop[:, :, 3:4] / 255.0
+
+        # out = base * (1 - a) + rgb * a の後半は定数なので事前計算（+0.5 で四捨五入）
+        self.premultiplied = crop[:, :, :3] * alpha + 0.5
+        self.inverse_alpha = 1.0 - alpha
+        self.scratch = np.empty(self.premultiplied.shape, dtype=np.float32)
+
+    def blend_into(self, frame: np.ndarray) -> None:
+        """ROI だけをその場でブレンド"""
+        if self.empty:
+            return
+        roi = frame[self.slices]
+        np.multiply(roi, self.inverse_alpha, out=self.scratch)
+        self.scratch += self.premultiplied
+        np.copyto(roi, self.scratch, casting='unsafe')
+
+
+class LayoutCompositor:
+    """
+    固定レイアウト用のフレーム合成
+
+    オーバーレイのアルファ乗算と位置はコンストラクタで一度だけ計算し、
+    フレームごとの処理は再利用バッファへの ROI ブレンドとフェードのスカラー乗算だけにする。
+    背景が単色なら合成結果そのものをキャッシュする。
+    フレームサイズと違う背景は、縦横比を保って縮小・拡大し、背景色で余白を埋めて中央に置く。
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        duration: float,
+        overlays: Sequence[Tuple[np.ndarray, Tuple[int, int]]],
+        background: Optional[Callable[[float], np.ndarray]] = None,
+        background_color: Tuple[int, int, int] = (0, 0, 0),
+        fade_in: float = 0.0,
+        fade_out: float = 0.0
+    ):
+        """
+        Args:
+            size: フレームサイズ (width, height)
+            duration: 長さ（秒）
+            overlays: [(RGBA画像, (x, y))] のリスト（描画順）
+            background: 背景フレームを返す関数（Noneの場合は単色）
+            background_color: 単色背景の色（サイズの違う背景の余白の色）
+            fade_in: フェードイン秒数
+            fade_out: フェードアウト秒数
+        """
+        self.width, self.height = size
+        self.duration = duration
+        self.background = background
+        self.background_color = background_color
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+
+        self._overlays: List[_Overlay] = [
+            _Overlay(rgba, (int(x), int(y)), size) for rgba, (x, y) in overlays
+        ]
+        self._frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._fade_scratch = (
+            np.empty((self.height, self.width, 3), dtype=np.float32)
+            if fade_in or fade_out else None
+        )
+
+        # サイズの違う背景の {(高さ, 幅): (行の添字, 列の添字, 貼り付け先のスライス, 余白を塗ったバッファ)}
+        self._fits: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray, Tuple[slice, slice], np.ndarray]] = {}
+
+        # 単色背景なら静止画として一度だけ合成しておく
+        self._static: Optional[np.ndarray] = None
+        if background is None:
+            self._static = np.empty_like(self._frame)
+            self._static[:] = background_color
+            for overlay in self._overlays:
+                overlay.blend_into(self._static)
+
+    def frame(self, t: float) -> np.ndarray:
+        """
+        時刻 t のフレームを返す
+
+        返す配列は内部バッファ（次の呼び出しで上書きされる）
+        """
+        if self._static is not None:
+            source = self._static
+        else:
+            base = self.background(t)
+            if base.shape[:2] != (self.height, self.width):
+                base = self._fit(base)
+            np.copyto(self._frame, base[:, :, :3], casting='unsafe')
+            for overlay in self._overlays:
+                overlay.blend_into(self._frame)
+            source = self._frame
+
+        factor = self._fade_factor(t)
+        if factor >= 1.0:
+            return source
+
+        np.multiply(source, factor, out=self._fade_scratch)
+        np.copyto(self._frame, self._fade_scratch, casting='unsafe')
+        return self._frame
+
+    def _fit(self, base: np.ndarray) -> np.ndarray:
+        """フレームサイズと違う背景を縦横比を保ってフレームに収め、余白を背景色で埋める（最近傍補間）"""
+        h, w = base.shape[:2]
+        if (h, w) not in self._fits:
+            scale = min(self.width / w, self.height / h)
+            fit_w = max(1, min(self.width, round(w * scale)))
+            fit_h = max(1, min(self.height, round(h * scale)))
+            rows = np.minimum((np.arange(fit_h) / scale).astype(np.intp), h - 1)
+            cols = np.minimum((np.arange(fit_w) / scale).astype(np.intp), w - 1)
+            x0, y0 = (self.width - fit_w) // 2, (self.height - fit_h) // 2
+            canvas = np.empty((self.height, self.width, 3), dtype=np.uint8)
+            canvas[:] = self.background_color
+            self._fits[(h, w)] = (rows[:, None], cols, (slice(y0, y0 + fit_h), slice(x0, x0 + fit_w)), canvas)
+        rows, cols, slices, canvas = self._fits[(h, w)]
+        np.copyto(canvas[slices], base[rows, cols, :3], casting='unsafe')
+        return canvas
+
+    def _fade_factor(self, t: float) -> float:
+        """フェードの明るさ係数（0.0〜1.0）"""
+        factor = 1.0
+        if self.fade_in and t < self.fade_in:
+            factor = min(factor, max(t, 0.0) / self.fade_in)
+        if self.fade_out and t > self.duration - self.fade_out:
+            factor = min(factor, max(self.duration - t, 0.0) / self.fade_out)
+        return factor
+
+
+if __name__ == "__main__":
+    # マイクロベンチマーク: MoviePy の CompositeVideoClip と比較
+    import time
+    from moviepy import ColorClip, CompositeVideoClip, ImageClip, vfx
+
+    width, height, duration, fps = 1080, 1920, 5.0, 30
+    rng = np.random.default_rng(0)
+
+    def text_box(w, h):
+        rgba = rng.integers(0, 255, size=(h, w, 4), dtype=np.uint8)
+        rgba[:, :, 3] = 178
+        return rgba
+
+    overlay_specs = [
+        (text_box(120, 140), (50, 100)),
+        (text_box(880, 200), (100, int(height * 0.75))),
+        (text_box(880, 140), (100, int(height * 0.85))),
+    ]
+    video_frame = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+
+    def benchmark(label, frame_function):
+        times = np.arange(0, duration, 1 / fps)
+        start = time.perf_counter()
+        for t in times:
+            frame_function(t)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>28}: {len(times) / elapsed:8.1f} fps")
+
+    for background_kind in ["単色背景", "動画背景"]:
+        print(f"\n=== {background_kind} + オーバーレイ3枚 + フェード ===")
+
+        if background_kind == "単色背景":
+            base_clip = ColorClip(size=(width, height), color=(0, 0, 0), duration=duration)
+            background = None
+        else:
+            base_clip = ImageClip(video_frame).with_duration(duration)
+            background = lambda t: video_frame
+
+        layers = [base_clip] + [
+            ImageClip(rgba).with_position(pos).with_duration(duration) for rgba, pos in overlay_specs
+        ]
+        composite = CompositeVideoClip(layers).with_effects([vfx.FadeIn(0.5), vfx.FadeOut(0.5)])
+        benchmark("MoviePy CompositeVideoClip", composite.get_frame)
+
+        compositor = LayoutCompositor(
+            (width, height), duration, overlay_specs,
+            background=background, fade_in=0.5, fade_out=0.5
+        )
+        benchmark("LayoutCompositor", compositor.frame)
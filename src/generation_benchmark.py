@@ -0,0 +1,215 @@
+"""
+生成ベンチマークモジュール
+LumaAI 疑似サーバーに対して AIVideoGenerator を動かし、完了までの時間・リクエスト数・ダウンロード量を測る
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ai_video_generator import AIVideoGenerator
+from downloader import ResumableDownloader
+from fake_luma_server import FakeLumaServer
+from generation_poller import AdaptivePoller
+from generation_scheduler import GenerationScheduler
+from hedging import HedgeBudget
+
+# 計測する経路
+MODES = {
+    "multiple": "generate_multiple_videos（非同期クライアントで一括ポーリング）",
+    "threads": "generate_video をプロンプトごとのスレッドで同時に実行",
+}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """分位点（線形補間、値がなければNone）"""
+    if not values:
+        return None
+    values = sorted(values)
+    position = q * (len(values) - 1)
+    lower, upper = math.floor(position), math.ceil(position)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def run_benchmark(
+    mode: str = "multiple",
+    prompts: int = 8,
+    server: Optional[FakeLumaServer] = None,
+    poll_interval: float = 1.0,
+    max_concurrent: int = 8,
+    rate_per_minute: float = 0.0,
+    hedge: bool = False
+) -> Dict:
+    """
+    疑似サーバーに対して N 本を同時に生成して計測
+
+    生成動画キャッシュ・ジャーナル・生成時間の記録・ヘッジの予算は一時ディレクトリに分け、
+    本番の状態（output/ や cache/）には書き込まない
+
+    Args:
+        mode: MODES のキー
+        prompts: 同時に生成する本数
+        server: 使う疑似サーバー（省略時は既定の設定で起動）
+        poll_interval: ポーリング間隔の基準（秒）
+        max_concurrent: スケジューラーの同時実行数
+        rate_per_minute: スケジューラーの送信レート（0で無制限）
+        hedge: ヘッジ生成を有効にするか（multiple のみ）
+
+    Returns:
+        計測結果の辞書
+    """
+    if mode not in MODES:
+        raise ValueError(f"不明なモード: {mode}（{', '.join(MODES)}）")
+
+    own_server = server is None
+    if own_server:
+        server = FakeLumaServer().start()
+    os.environ.setdefault("LUMAAI_API_KEY", "fake-key")
+
+    work_dir = tempfile.mkdtemp(prefix="generation_benchmark_")
+    try:
+        generator = AIVideoGenerator(use_cache=False)
+        generator.base_url = server.base_url
+        generator.poll_interval = poll_interval
+        generator.retry_delay = poll_interval
+        generator.poller = AdaptivePoller(
+            base_interval=poll_interval,
+            state_path=os.path.join(work_dir, "generation_times.json")
+        )
+        generator.scheduler = GenerationScheduler(
+            max_concurrent=max_concurrent, rate_per_minute=rate_per_minute
+        )
+        generator.downloader = ResumableDownloader(transport=generator.http)
+        generator.hedge_budget = HedgeBudget(
+            state_path=os.path.join(work_dir, "hedge_budget.json"), daily_limit=prompts
+        )
+
+        # 実行ごとに違うプロンプト（サーバー側の状態を持ち越さない）
+        run_id = os.urandom(4).hex()
+        prompt_list = [f"benchmark {run_id} prompt {i + 1}" for i in range(prompts)]
+        output_dir = os.path.join(work_dir, "videos")
+        os.makedirs(output_dir, exist_ok=True)
+
+        before = server.stats()
+        latencies: Dict[int, float] = {}
+        start = time.perf_counter()
+
+        if mode == "multiple":
+            def on_video_ready(index: int, path: Optional[str]) -> None:
+                if path:
+                    latencies[index] = time.perf_counter() - start
+
+            results = generator.generate_multiple_videos(
+                prompt_list, output_dir, duration=5, on_video_ready=on_video_ready, hedge=hedge
+            )
+        else:
+            def generate(index: int) -> Optional[str]:
+                path = generator.generate_video(
+                    prompt_list[index - 1], os.path.join(output_dir, f"choice_{index}.mp4"), duration=5
+                )
+                if path:
+                    latencies[index] = time.perf_counter() - start
+                return path
+
+            with ThreadPoolExecutor(max_workers=prompts) as executor:
+                paths = list(executor.map(generate, range(1, prompts + 1)))
+            results = dict(enumerate(paths, start=1))
+
+        wall_seconds = time.perf_counter() - start
+        after = server.stats()
+        requests_sent = {
+            key: after[key] - before[key] for key in ("create", "status", "head", "asset", "errors")
+        }
+        values = list(latencies.values())
+        return {
+            "mode": mode,
+            "prompts": prompts,
+            "succeeded": sum(1 for path in results.values() if path),
+            "wall_seconds": wall_seconds,
+            "p50_seconds": percentile(values, 0.5),
+            "p95_seconds": percentile(values, 0.95),
+            "requests": requests_sent,
+            "requests_total": sum(requests_sent.values()) - requests_sent["errors"],
+            "bytes_downloaded": after["bytes_sent"] - before["bytes_sent"],
+            "scheduler": generator.scheduler.stats(),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if own_server:
+            server.stop()
+
+
+def print_report(results: List[Dict]) -> None:
+    """計測結果を表で表示"""
+    print("\n📊 生成ベンチマーク結果")
+    print(f"{'モード':<10} {'成功':>7} {'全体':>8} {'p50':>8} {'p95':>8} {'送信':>6} {'状態確認':>8} {'DL':>5} {'MB':>8}")
+    for result in results:
+        p50 = result["p50_seconds"]
+        p95 = result["p95_seconds"]
+        print(
+            f"{result['mode']:<10} "
+            f"{result['succeeded']:>3}/{result['prompts']:<3} "
+            f"{result['wall_seconds']:>7.1f}s "
+            f"{(f'{p50:.1f}s' if p50 is not None else '-'):>8} "
+            f"{(f'{p95:.1f}s' if p95 is not None else '-'):>8} "
+            f"{result['requests']['create']:>6} "
+            f"{result['requests']['status']:>8} "
+            f"{result['requests']['asset']:>5} "
+            f"{result['bytes_downloaded'] / 1024 / 1024:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='AI動画生成のベンチマーク（LumaAI 疑似サーバーを使用）')
+    parser.add_argument('--mode', choices=list(MODES) + ['all'], default='all', help='計測する経路')
+    parser.add_argument('--prompts', type=int, default=8, help='同時に生成する本数')
+    parser.add_argument('--rounds', type=int, default=1, help='繰り返す回数')
+    parser.add_argument('--latency-median', type=float, default=3.0, help='生成時間の中央値（秒）')
+    parser.add_argument('--latency-p95', type=float, default=8.0, help='生成時間の p95（秒）')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='生成が failed になる割合')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='API リクエストが 500 を返す割合')
+    parser.add_argument('--asset-mb', type=float, default=2.0, help='動画データのサイズ（MB）')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='ポーリング間隔の基準（秒）')
+    parser.add_argument('--max-concurrent', type=int, default=8, help='同時に処理中にできる生成数')
+    parser.add_argument('--rate', type=float, default=0.0, help='1分あたりの送信数（0で無制限）')
+    parser.add_argument('--hedge', action='store_true', help='ヘッジ生成を有効にする（multiple のみ）')
+    parser.add_argument('--seed', type=int, default=None, help='疑似サーバーの乱数シード')
+    parser.add_argument('--json', type=str, default=None, help='結果を書き出す JSON ファイル')
+    args = parser.parse_args()
+
+    modes = list(MODES) if args.mode == 'all' else [args.mode]
+    results = []
+    with FakeLumaServer(
+        latency_median=args.latency_median,
+        latency_p95=args.latency_p95,
+        failure_rate=args.failure_rate,
+        error_rate=args.error_rate,
+        asset_bytes=int(args.asset_mb * 1024 * 1024),
+        seed=args.seed
+    ) as server:
+        print(f"🧪 LumaAI 疑似サーバー: {server.base_url}")
+        for round_number in range(args.rounds):
+            for mode in modes:
+                print(f"\n⏱️ {MODES[mode]}（{args.prompts}本、{round_number + 1}/{args.rounds}回目）")
+                results.append(run_benchmark(
+                    mode=mode,
+                    prompts=args.prompts,
+                    server=server,
+                    poll_interval=args.poll_interval,
+                    max_concurrent=args.max_concurrent,
+                    rate_per_minute=args.rate,
+                    hedge=args.hedge
+                ))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 結果を保存しました: {args.json}")
@@ -0,0 +1,136 @@
+"""
+適応ポーリングモジュール
+過去の生成時間の分布（モデル・長さごと）からポーリング間隔を決め、Retry-After に従う
+"""
+
+import email.utils
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Mapping, Optional
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Retry-After ヘッダーを秒数に変換
+
+    Args:
+        headers: レスポンスヘッダー（requests / httpx のどちらでもよい）
+
+    Returns:
+        待つべき秒数（ヘッダーがない・解釈できない場合はNone）
+    """
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # HTTP日付形式
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptivePoller:
+    """
+    生成時間の分布にもとづくポーリング間隔の決定
+
+    完了が見込まれる時刻（過去の生成時間の下位10%）まではまとめて待ち、
+    そこから上位10%までは短い間隔で確認する。それを過ぎたら通常の間隔に戻す。
+    生成時間はモデル・長さごとにファイルへ保存し、実行をまたいで使う。
+    """
+
+    def __init__(
+        self,
+        state_path: Optional[str] = None,
+        base_interval: float = 5.0,
+        min_interval: float = 1.0,
+        max_samples: int = 200,
+        min_samples: int = 3
+    ):
+        """
+        Args:
+            state_path: 生成時間の保存先（省略時は プロジェクト/output/generation_times.json）
+            base_interval: 分布がない場合・想定を過ぎた場合の間隔（秒）
+            min_interval: 完了が近いときの間隔（秒）
+            max_samples: モデル・長さごとに保持する生成時間の最大件数
+            min_samples: 分布を使い始める件数
+        """
+        if state_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            state_path = os.path.join(project_root, "output", "generation_times.json")
+        self.state_path = state_path
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = self._load()
+
+    @staticmethod
+    def key(model: Optional[str], duration: int) -> str:
+        """分布を分けるキー（モデル・長さ）"""
+        return f"{model or 'default'}:{duration}"
+
+    def quantile(self, key: str, q: float) -> Optional[float]:
+        """生成時間の分位点（件数が足りない場合はNone）"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, []))
+        if len(samples) < self.min_samples:
+            return None
+        position = q * (len(samples) - 1)
+        lower, upper = math.floor(position), math.ceil(position)
+        return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+    def next_delay(self, key: str, elapsed: float) -> float:
+        """
+        次に状態を確認するまでの秒数
+
+        Args:
+            key: key() で作ったキー
+            elapsed: 生成リクエストからの経過秒数
+        """
+        early = self.quantile(key, 0.1)
+        late = self.quantile(key, 0.9)
+        if early is None or late is None:
+            return self.base_interval
+        if elapsed < early - self.min_interval:
+            # 完了が見込まれる時刻の少し前まで一度に待つ
+            return early - elapsed - self.min_interval
+        if elapsed < late:
+            return self.min_interval
+        return self.base_interval
+
+    def record(self, key: str, seconds: float) -> None:
+        """完了した生成の所要時間を記録して保存"""
+        with self._lock:
+            samples = self._samples.setdefault(key, [])
+            samples.append(round(seconds, 2))
+            del samples[:-self.max_samples]
+            self._save()
+
+    def fixed_interval_polls(self, seconds: float) -> int:
+        """固定間隔（base_interval）でポーリングした場合の回数（比較用）"""
+        return max(1, math.ceil(seconds / self.base_interval))
+
+    def _load(self) -> Dict[str, List[float]]:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 生成時間の読み込みエラー: {e}")
+            return {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._samples, f, indent=2)
+        os.replace(tmp_path, self.state_path)
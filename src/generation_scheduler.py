@@ -0,0 +1,282 @@
+"""
+生成スケジューラーモジュール
+LumaAI への生成リクエストをプロセス全体（オプションでプロセス間）でまとめ、レートと同時実行数を制限する
+"""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間の制限を使わない
+    fcntl = None
+
+
+# 優先度（小さいほど先）: 手動のテスト実行 > 定期実行 > 作り置きの生成
+PRIORITIES = {
+    "manual": 0,
+    "scheduled": 1,
+    "backfill": 2,
+}
+
+
+class GenerationScheduler:
+    """
+    生成リクエストの送信許可を出すスケジューラー
+
+    - トークンバケットで送信レートを制限する（rate_per_minute、最大 burst 件まで連続）
+    - 処理中（送信してから完了・失敗まで）の生成を max_concurrent 件までに抑える
+    - 待っている生成は優先度順（同じ優先度なら到着順）に許可する
+    - lock_dir を指定すると、同じディレクトリを使う他のプロセスとも
+      同時実行数（スロットごとのロックファイル）とトークンバケット（ロック付きの状態ファイル）を共有する
+
+    使い方:
+        ticket = scheduler.enqueue("manual")
+        wait = scheduler.try_start(ticket)   # 0.0 なら送信してよい、それ以外は次に試すまでの秒数
+        ...
+        scheduler.release(ticket)            # 生成が完了・失敗したら
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        rate_per_minute: float = 20.0,
+        burst: Optional[int] = None,
+        lock_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            max_concurrent: 同時に処理中にできる生成の数
+            rate_per_minute: 1分あたりの送信数
+            burst: 連続して送信できる件数（省略時は max_concurrent）
+            lock_dir: プロセス間で制限を共有するディレクトリ（省略時はこのプロセス内だけ）
+        """
+        self.max_concurrent = max_concurrent
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst or max_concurrent
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if lock_dir and fcntl is None:
+            print("⚠️ fcntl が使えないため、生成の制限はこのプロセス内だけで行います")
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._cond = threading.Condition()
+        self._counter = itertools.count()
+        # 待ち行列 [(優先度, 到着順, チケット)] と許可済みのチケット {チケット: スロットのファイル}
+        self._waiting: List[Tuple[int, int, int]] = []
+        self._enqueued_at: Dict[int, float] = {}
+        self._active: Dict[int, Optional[object]] = {}
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+
+        # 統計
+        self.granted = 0
+        self.wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.rate_limited = 0
+        self.concurrency_limited = 0
+
+    def enqueue(self, priority: str = "scheduled") -> int:
+        """
+        送信待ちに並ぶ
+
+        Args:
+            priority: PRIORITIES のキー
+
+        Returns:
+            チケット（try_start / release に渡す）
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES["scheduled"])
+        with self._cond:
+            ticket = next(self._counter)
+            heapq.heappush(self._waiting, (rank, ticket, ticket))
+            self._enqueued_at[ticket] = time.monotonic()
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+            return ticket
+
+    def try_start(self, ticket: int) -> float:
+        """
+        送信してよいか確認し、よければ許可する
+
+        Returns:
+            許可した場合（許可済みの場合も）0.0、まだの場合は次に試すまでの秒数
+        """
+        with self._cond:
+            if ticket in self._active:
+                return 0.0
+            if not self._waiting or self._waiting[0][2] != ticket:
+                # 先に並んでいる（または優先度の高い）生成を待つ
+                return 0.2
+            if len(self._active) >= self.max_concurrent:
+                self.concurrency_limited += 1
+                return 1.0
+            slot = self._take_slot()
+            if slot is False:
+                self.concurrency_limited += 1
+                return 1.0
+            wait = self._take_token()
+            if wait > 0:
+                self._release_slot(slot)
+                self.rate_limited += 1
+                return wait
+
+            heapq.heappop(self._waiting)
+            self._active[ticket] = slot
+            self.granted += 1
+            self.wait_seconds += time.monotonic() - self._enqueued_at.pop(ticket)
+            self._cond.notify_all()
+            return 0.0
+
+    def acquire(self, priority: str = "scheduled") -> int:
+        """
+        許可が出るまで待つ（スレッドから使う同期版）
+
+        Returns:
+            許可済みのチケット
+        """
+        ticket = self.enqueue(priority)
+        try:
+            while True:
+                wait = self.try_start(ticket)
+                if wait == 0.0:
+                    return ticket
+                with self._cond:
+                    self._cond.wait(wait)
+        except BaseException:
+            self.release(ticket)
+            raise
+
+    def release(self, ticket: Optional[int]) -> None:
+        """生成が終わった（または待つのをやめた）チケットを外す"""
+        if ticket is None:
+            return
+        with self._cond:
+            if ticket in self._active:
+                self._release_slot(self._active.pop(ticket))
+            elif ticket in self._enqueued_at:
+                self._waiting = [entry for entry in self._waiting if entry[2] != ticket]
+                heapq.heapify(self._waiting)
+                del self._enqueued_at[ticket]
+            self._cond.notify_all()
+
+    def has_capacity(self) -> bool:
+        """待たずにすぐ許可を出せる空きがあるか（このプロセス内の判定）"""
+        with self._cond:
+            return not self._waiting and len(self._active) < self.max_concurrent
+
+    def stats(self) -> Dict:
+        """待ち行列と制限の統計"""
+        with self._cond:
+            names = {rank: name for name, rank in PRIORITIES.items()}
+            queued: Dict[str, int] = {}
+            for rank, _, _ in self._waiting:
+                queued[names[rank]] = queued.get(names[rank], 0) + 1
+            return {
+                "active": len(self._active),
+                "queued": len(self._waiting),
+                "queued_by_priority": queued,
+                "max_queue_depth": self.max_queue_depth,
+                "granted": self.granted,
+                "avg_wait_seconds": self.wait_seconds / self.granted if self.granted else 0.0,
+                "rate_limited": self.rate_limited,
+                "concurrency_limited": self.concurrency_limited,
+                "shared": bool(self.lock_dir),
+            }
+
+    def _take_token(self) -> float:
+        """
+        トークンを1つ使う
+
+        Returns:
+            使えた場合0.0、足りない場合はたまるまでの秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+        if self.lock_dir:
+            return self._take_shared_token()
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        if self._tokens < 1.0:
+            return (1.0 - self._tokens) / self.rate
+        self._tokens -= 1.0
+        return 0.0
+
+    def _take_shared_token(self) -> float:
+        """プロセス間で共有するトークンバケットから1つ使う（状態ファイルをロックして更新）"""
+        state_path = os.path.join(self.lock_dir, "bucket.json")
+        with open(os.path.join(self.lock_dir, "bucket.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                tokens, updated_at = float(self.burst), now
+                if os.path.exists(state_path):
+                    try:
+                        with open(state_path, 'r', encoding='utf-8') as f:
+                            state = json.load(f)
+                        tokens, updated_at = state["tokens"], state["updated_at"]
+                    except (OSError, ValueError, KeyError):
+                        pass
+                tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+                wait = 0.0
+                if tokens < 1.0:
+                    wait = (1.0 - tokens) / self.rate
+                else:
+                    tokens -= 1.0
+                tmp_path = f"{state_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({"tokens": tokens, "updated_at": now}, f)
+                os.replace(tmp_path, state_path)
+                return wait
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _take_slot(self):
+        """
+        プロセス間で共有する同時実行のスロットを1つ確保
+
+        Returns:
+            ロックしたスロットのファイル（共有しない場合はNone）、空きがなければFalse
+        """
+        if not self.lock_dir:
+            return None
+        for i in range(self.max_concurrent):
+            slot = open(os.path.join(self.lock_dir, f"slot_{i}.lock"), 'a')
+            try:
+                # プロセスが落ちてもロックは OS が外す
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return slot
+            except OSError:
+                slot.close()
+        return False
+
+    @staticmethod
+    def _release_slot(slot) -> None:
+        if slot:
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            slot.close()
+
+
+_scheduler: Optional[GenerationScheduler] = None
+
+
+def get_generation_scheduler() -> GenerationScheduler:
+    """
+    プロセス内で共有する生成スケジューラーを取得
+
+    LUMAAI_MAX_CONCURRENT / LUMAAI_RATE_PER_MINUTE で制限を、
+    LUMAAI_SCHEDULER_LOCK_DIR でプロセス間で共有するディレクトリを指定する
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = GenerationScheduler(
+            max_concurrent=int(os.getenv("LUMAAI_MAX_CONCURRENT", "4")),
+            rate_per_minute=float(os.getenv("LUMAAI_RATE_PER_MINUTE", "20")),
+            lock_dir=os.getenv("LUMAAI_SCHEDULER_LOCK_DIR") or None
+        )
+    return _scheduler
@@ -0,0 +1,125 @@
+"""
+ヘッジ生成モジュール
+生成が遅れている選択肢に重複の生成を出すための1日あたりの予算と、短縮できた時間の記録
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間のロックを使わない
+    fcntl = None
+
+
+class HedgeBudget:
+    """
+    ヘッジ生成（重複の生成リクエスト）の1日あたりの上限と累計の記録
+
+    重複の生成はそのまま API の費用になるため、日ごとの件数を上限で抑える。
+    件数と効果（ヘッジが先に完了した回数・短縮できた秒数）はファイルに保存し、実行をまたいで集計する。
+    同時に動く複数のプロセスが同じ予算を使うので、更新はファイルをロックして読み直してから行う。
+    """
+
+    def __init__(self, state_path: Optional[str] = None, daily_limit: int = 10, quantile: float = 0.75):
+        """
+        Args:
+            state_path: 記録の保存先（省略時は プロジェクト/output/hedge_budget.json）
+            daily_limit: 1日あたりのヘッジ生成の上限（0で無効）
+            quantile: 過去の生成時間のこの分位点を超えたらヘッジを出す
+        """
+        if state_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            state_path = os.path.join(project_root, "output", "hedge_budget.json")
+        self.state_path = state_path
+        self.daily_limit = daily_limit
+        self.quantile = quantile
+        self._lock = threading.Lock()
+        self._state = self._load()
+
+    def try_acquire(self) -> bool:
+        """
+        今日の予算が残っていれば1件使う
+
+        Returns:
+            ヘッジを出してよい場合True
+        """
+        with self._locked():
+            if self._state["used"] >= self.daily_limit:
+                return False
+            self._state["used"] += 1
+            self._state["launched"] += 1
+            self._save()
+            return True
+
+    def record_result(self, hedge_won: bool, saved_seconds: float = 0.0) -> None:
+        """
+        ヘッジの結果を記録
+
+        Args:
+            hedge_won: ヘッジが元の生成より先に完了したか
+            saved_seconds: 元の生成の完了を待った場合と比べて短縮できた秒数
+        """
+        with self._locked():
+            if hedge_won:
+                self._state["wins"] += 1
+                self._state["saved_seconds"] = round(self._state["saved_seconds"] + saved_seconds, 2)
+            self._save()
+
+    def remaining(self) -> int:
+        """今日の残りの件数"""
+        with self._lock:
+            self._state = self._load()
+            self._roll_over()
+            return max(0, self.daily_limit - self._state["used"])
+
+    def stats(self) -> Dict:
+        """累計の統計"""
+        with self._lock:
+            self._state = self._load()
+            self._roll_over()
+            return dict(self._state, daily_limit=self.daily_limit)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """ファイルをロックし、他のプロセスの更新を読み直してから日付の切り替えを反映する"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            with open(f"{self.state_path}.lock", 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    self._state = self._load()
+                    self._roll_over()
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _roll_over(self) -> None:
+        """日付が変わっていれば今日の件数をリセット"""
+        today = date.today().isoformat()
+        if self._state["date"] != today:
+            self._state["date"] = today
+            self._state["used"] = 0
+
+    def _load(self) -> Dict:
+        state = {"date": date.today().isoformat(), "used": 0, "launched": 0, "wins": 0, "saved_seconds": 0.0}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    state.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ ヘッジ予算の読み込みエラー: {e}")
+        return state
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
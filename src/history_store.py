@@ -0,0 +1,182 @@
+"""
+お題履歴ストアモジュール
+使用したお題を SQLite（WAL モード）に1件ずつ追記し、カテゴリ・日時で引けるようにする
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class HistoryStore:
+    """
+    お題の履歴
+
+    - 1件ごとに INSERT するだけ（ファイル全体を読み書きしない）
+    - WAL モードで、Discord Bot と定期実行が同時に書き込んでも互いの書き込みを消さない
+    - category / created_at にインデックスを張り、直近の件数やカテゴリ・期間で絞り込める
+    - 初回に旧形式の question_history.json（質問文のリスト）を取り込む
+    """
+
+    def __init__(self, db_path: Optional[str] = None, legacy_path: Optional[str] = None):
+        """
+        Args:
+            db_path: データベースのパス（省略時は プロジェクト/output/question_history.db）
+            legacy_path: 取り込む旧形式の履歴（省略時は プロジェクト/output/question_history.json）
+        """
+        output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+        self.db_path = db_path or os.path.join(output_dir, "question_history.db")
+        self.legacy_path = legacy_path or os.path.join(output_dir, "question_history.json")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    question TEXT NOT NULL,
+                    category TEXT,
+                    created_at TEXT NOT NULL,
+                    data TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_questions_created_at ON questions (created_at)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_questions_category ON questions (category, created_at)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._migrate()
+
+    def append(self, question: str, category: Optional[str] = None, data: Optional[Dict] = None) -> None:
+        """
+        お題を1件追記
+
+        Args:
+            question: 質問文
+            category: カテゴリ名
+            data: 質問データ全体（オプション）
+        """
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO questions (question, category, created_at, data) VALUES (?, ?, ?, ?)",
+                (
+                    question,
+                    category,
+                    datetime.now().isoformat(timespec="seconds"),
+                    json.dumps(data, ensure_ascii=False) if data is not None else None,
+                ),
+            )
+
+    def recent(self, limit: Optional[int] = 30, category: Optional[str] = None) -> List[str]:
+        """
+        直近の質問文（古い順）
+
+        Args:
+            limit: 件数（Noneなら全件）
+            category: カテゴリで絞り込む（省略時はすべて）
+        """
+        return [row["question"] for row in reversed(self.query(category=category, limit=limit))]
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        履歴を新しい順に取得
+
+        Args:
+            category: カテゴリで絞り込む
+            since: この日時以降
+            until: この日時より前
+            limit: 最大件数
+
+        Returns:
+            [{"question", "category", "created_at", "data"}] のリスト
+        """
+        conditions, params = [], []
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if since:
+            conditions.append("created_at >= ?")
+            params.append(since.isoformat(timespec="seconds"))
+        if until:
+            conditions.append("created_at < ?")
+            params.append(until.isoformat(timespec="seconds"))
+        sql = "SELECT question, category, created_at, data FROM questions"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {
+                "question": row["question"],
+                "category": row["category"],
+                "created_at": row["created_at"],
+                "data": json.loads(row["data"]) if row["data"] else None,
+            }
+            for row in rows
+        ]
+
+    def count(self, category: Optional[str] = None) -> int:
+        """件数"""
+        with closing(self._connect()) as conn:
+            if category:
+                return conn.execute("SELECT COUNT(*) FROM questions WHERE category = ?", (category,)).fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """全体とカテゴリごとの件数"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT category, COUNT(*) AS count FROM questions GROUP BY category"
+            ).fetchall()
+        return {
+            "total": sum(row["count"] for row in rows),
+            "by_category": {row["category"] or "（不明）": row["count"] for row in rows},
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        # 他のプロセスが書き込み中なら待つ
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _migrate(self) -> None:
+        """旧形式の question_history.json を1回だけ取り込む（元のファイルはそのまま残す）"""
+        if not os.path.exists(self.legacy_path):
+            return
+        with closing(self._connect()) as conn, conn:
+            # 同時に起動した別のプロセスと二重に取り込まないよう、書き込みロックを取ってから確認する
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+                return
+            try:
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    questions = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 旧形式の履歴の読み込みエラー: {e}")
+                questions = []
+            # 旧形式には日時がないため、ファイルの更新日時を全件に使う（順序は id で保つ）
+            created_at = datetime.fromtimestamp(os.path.getmtime(self.legacy_path)).isoformat(timespec="seconds")
+            conn.executemany(
+                "INSERT INTO questions (question, created_at) VALUES (?, ?)",
+                [(question, created_at) for question in questions if isinstance(question, str)],
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)",
+                (datetime.now().isoformat(timespec="seconds"),),
+            )
+        print(f"📚 旧形式の履歴を取り込みました: {len(questions)}件")
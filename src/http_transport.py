@@ -0,0 +1,152 @@
+"""
+HTTPトランスポートモジュール
+ホストごとに keep-alive のコネクションプールを持つ requests.Session を共有し、タイムアウトと再試行を揃える
+"""
+
+import threading
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (接続タイムアウト, 読み込みタイムアウト) 秒
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HTTPTransport:
+    """
+    送信先ホストごとのプール済みセッション
+
+    同じホストへのリクエストは同じ Session（同じコネクションプール）を通るので、
+    ポーリングやチャンク単位のダウンロードでも TCP/TLS 接続を張り直さない。
+    再試行は接続エラーと、GETなど冪等なリクエストの 5xx に限る（429 は呼び出し側で扱う）。
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        total_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: Timeout = DEFAULT_TIMEOUT
+    ):
+        """
+        Args:
+            pool_maxsize: ホストごとに保持する接続数の上限
+            total_retries: 再試行の最大回数
+            backoff_factor: 再試行の待ち時間の係数（0.5なら 0.5, 1, 2 秒...）
+            timeout: 既定のタイムアウト（秒、または (接続, 読み込み) の組）
+        """
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.retry = Retry(
+            total=total_retries,
+            connect=total_retries,
+            read=total_retries,
+            status=total_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+            raise_on_status=False
+        )
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+
+        # 統計
+        self.requests = 0
+        self.errors = 0
+
+    def session(self, url: str) -> requests.Session:
+        """URLのホストに対応するセッション（なければ作成）"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=self.retry
+                )
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[origin] = session
+            return session
+
+    def request(self, method: str, url: str, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        """
+        リクエストを送信
+
+        Args:
+            method: HTTPメソッド
+            url: URL
+            timeout: タイムアウト（省略時は既定値）
+            **kwargs: requests.Session.request にそのまま渡す引数
+
+        Returns:
+            レスポンス（stream=True の場合は読み終えるか close するまで接続を返さない）
+        """
+        with self._lock:
+            self.requests += 1
+        try:
+            return self.session(url).request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            raise
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict:
+        """リクエスト数と接続の再利用の統計"""
+        with self._lock:
+            sessions = dict(self._sessions)
+            requests_sent = self.requests
+            errors = self.errors
+
+        hosts = {}
+        for origin, session in sessions.items():
+            opened = 0
+            for adapter in session.adapters.values():
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        opened += pool.num_connections
+            hosts[origin] = opened
+
+        connections = sum(hosts.values())
+        reused = max(0, requests_sent - errors - connections)
+        return {
+            "requests": requests_sent,
+            "errors": errors,
+            "connections": connections,
+            "reused": reused,
+            "reuse_rate": reused / requests_sent if requests_sent else 0.0,
+            "hosts": hosts
+        }
+
+    def close(self) -> None:
+        """全セッションを閉じる"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_http_transport: Optional[HTTPTransport] = None
+
+
+def get_http_transport() -> HTTPTransport:
+    """プロセス内で共有する HTTPTransport を取得"""
+    global _http_transport
+    if _http_transport is None:
+        _http_transport = HTTPTransport()
+    return _http_transport
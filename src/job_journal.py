@@ -0,0 +1,362 @@
+"""
+生成ジョブジャーナルモジュール
+送信済みの生成IDと状態を追記専用のJSONLに記録し、プロセスが再起動しても処理中の生成に再接続する
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows ではファイルの先頭1バイトをロックする
+    fcntl = None
+    import msvcrt
+
+
+class JobJournal:
+    """
+    生成ジョブのジャーナル
+
+    1行1イベントで追記し、起動時に読み直して状態を復元する。
+    - 実行（run）: 質問データ。終了を記録するまで再開の対象になる
+    - ジョブ: 出力パスごとの生成ID・プロンプト・状態（submitted / downloaded / failed）
+
+    実行の持ち主（プロセスIDとホスト名）を記録し、実行中はロックファイル（job_runs/<実行ID>.lock）を
+    ロックし続ける。持ち主のプロセスが生きている実行は再開しない（重なって起動した定期実行が
+    同じ質問・同じ作業ディレクトリを使わないように）。プロセスが落ちればロックは OS が外す。
+
+    追記と書き直し（compact）は job_journal.lock をロックして行い、他のプロセスの追記が
+    書き直しで消えないようにする。
+
+    使い方:
+        journal = JobJournal()
+        run = journal.unfinished_run("main")
+        if run is None:
+            journal.start_run(run_id, "main", question_data)
+        ...
+        journal.finish_run(run_id, success=True)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age_hours: float = 24.0, max_resumes: int = 3):
+        """
+        Args:
+            path: ジャーナルファイル（省略時は プロジェクト/output/job_journal.jsonl）
+            max_age_hours: これより古い実行・生成には再接続しない
+            max_resumes: 1つの実行を再開する最大回数（再起動を繰り返す場合の歯止め）
+        """
+        if path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            path = os.path.join(project_root, "output", "job_journal.jsonl")
+        self.path = path
+        self.max_age = max_age_hours * 3600
+        self.max_resumes = max_resumes
+        self.lock_dir = os.path.join(os.path.dirname(path), "job_runs")
+        self.file_lock_path = f"{os.path.splitext(path)[0]}.lock"
+        self._lock = threading.Lock()
+        # このプロセスが実行中の {実行ID: ロックしているファイル}
+        self._run_locks: Dict[str, IO] = {}
+        self._runs: Dict[str, Dict] = {}
+        self._jobs: Dict[str, Dict] = {}
+        self._load()
+
+    def start_run(self, run_id: str, kind: str, question_data: Dict) -> None:
+        """
+        実行の開始を記録
+
+        Args:
+            run_id: 実行ID（作業ディレクトリ名に使うタイムスタンプ）
+            kind: 実行の種類（"main" / "local" など。再開時に一致するものだけを探す）
+            question_data: 質問データ（再開時にそのまま使う）
+        """
+        self._claim(run_id)
+        self._append({
+            "event": "run_started",
+            "run_id": run_id,
+            "kind": kind,
+            "category": question_data.get("category"),
+            "question_data": question_data,
+            "owner": self._owner(),
+        })
+
+    def unfinished_run(self, kind: str, category: Optional[str] = None) -> Optional[Dict]:
+        """
+        再開すべき中断された実行を探す（見つかれば持ち主になり、再開回数を記録する）
+
+        持ち主のプロセスがまだ動いている実行は対象にしない
+
+        Args:
+            kind: 実行の種類
+            category: 指定されたカテゴリ（Noneなら問わない）
+
+        Returns:
+            {"run_id": ..., "question_data": ..., "resumes": ...}（なければNone）
+        """
+        now = time.time()
+        with self._lock:
+            # 起動後に他のプロセスが記録した実行も対象にする
+            self._reload()
+            candidates = [
+                run for run in self._runs.values()
+                if run["kind"] == kind
+                and not run["finished"]
+                and run["resumes"] < self.max_resumes
+                and now - run["at"] < self.max_age
+                and (category is None or run["category"] == category)
+            ]
+        for run in sorted(candidates, key=lambda r: r["at"], reverse=True):
+            if not self._claim(run["run_id"]):
+                continue
+            with self._lock:
+                # ロックを取る直前に持ち主が終了を記録していないか確かめる
+                self._reload()
+                finished = self._runs.get(run["run_id"], run)["finished"]
+            if finished:
+                self._release(run["run_id"])
+                continue
+            self._append({"event": "run_resumed", "run_id": run["run_id"], "owner": self._owner()})
+            return run
+        return None
+
+    def finish_run(self, run_id: str, success: bool) -> None:
+        """実行の終了を記録（失敗でも終了扱いにし、再開しない）"""
+        self._append({"event": "run_finished", "run_id": run_id, "success": success})
+        self._release(run_id)
+        with self._lock:
+            self._compact()
+
+    def record_submitted(self, output_path: str, prompt: str, duration: int, generation_id: str) -> None:
+        """生成リクエストの送信を記録"""
+        self._append({
+            "event": "submitted",
+            "output_path": output_path,
+            "prompt": prompt,
+            "duration": duration,
+            "generation_id": generation_id,
+        })
+
+    def record_downloaded(self, output_path: str) -> None:
+        """ダウンロード（と後処理）の完了を記録"""
+        self._append({"event": "downloaded", "output_path": output_path})
+
+    def record_failed(self, output_path: str, generation_id: str) -> None:
+        """生成の失敗を記録（この生成IDには再接続しない）"""
+        self._append({"event": "failed", "output_path": output_path, "generation_id": generation_id})
+
+    def pending_generation(self, output_path: str, prompt: str) -> Optional[Dict]:
+        """
+        再接続できる送信済みの生成を探す
+
+        Returns:
+            {"generation_id": ..., "elapsed": 送信からの経過秒数}（なければNone）
+        """
+        with self._lock:
+            job = self._jobs.get(output_path)
+        if not job or job["state"] != "submitted" or job["prompt"] != prompt:
+            return None
+        elapsed = time.time() - job["at"]
+        if elapsed > self.max_age:
+            return None
+        return {"generation_id": job["generation_id"], "elapsed": elapsed}
+
+    def downloaded(self, output_path: str, prompt: str) -> bool:
+        """同じプロンプトの動画がダウンロード済みで、ファイルも残っているか"""
+        with self._lock:
+            job = self._jobs.get(output_path)
+        return bool(
+            job and job["state"] == "downloaded" and job["prompt"] == prompt
+            and os.path.exists(output_path) and os.path.getsize(output_path) > 0
+        )
+
+    @staticmethod
+    def _owner() -> Dict:
+        """このプロセスを表す持ち主の情報"""
+        return {"pid": os.getpid(), "host": socket.gethostname()}
+
+    def _claim(self, run_id: str) -> bool:
+        """
+        実行の持ち主になる（実行のロックファイルをロックし、終了まで持ち続ける）
+
+        Returns:
+            持ち主になれた場合True（このプロセスや他の生きているプロセスが実行中ならFalse）
+        """
+        with self._lock:
+            if run_id in self._run_locks:
+                return False
+            os.makedirs(self.lock_dir, exist_ok=True)
+            lock_file = open(os.path.join(self.lock_dir, f"{run_id}.lock"), 'a+')
+            if not _try_lock(lock_file):
+                lock_file.close()
+                return False
+            self._run_locks[run_id] = lock_file
+            return True
+
+    def _release(self, run_id: str) -> None:
+        """実行のロックを外してロックファイルを消す"""
+        with self._lock:
+            lock_file = self._run_locks.pop(run_id, None)
+        if lock_file is None:
+            return
+        try:
+            os.remove(lock_file.name)
+        except OSError:
+            # Windows では開いているファイルは消せない（次の compact で消す）
+            pass
+        lock_file.close()
+
+    def _append(self, event: Dict) -> None:
+        """イベントを1行追記して同期（再起動しても失われないように）"""
+        event["at"] = time.time()
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock, self._file_locked():
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(event)
+
+    @contextmanager
+    def _file_locked(self) -> Iterator[None]:
+        """ジャーナルのロックファイルをロックする（他のプロセスの追記・書き直しと重ならないように）"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.file_lock_path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            yield
+        finally:
+            # 閉じるとロックも外れる
+            lock_file.close()
+
+    def _apply(self, event: Dict) -> None:
+        """イベントをメモリ上の状態に反映"""
+        kind = event.get("event")
+        if kind == "run_started":
+            self._runs[event["run_id"]] = {
+                "run_id": event["run_id"],
+                "kind": event["kind"],
+                "category": event.get("category"),
+                "question_data": event["question_data"],
+                "owner": event.get("owner"),
+                "at": event["at"],
+                "resumes": 0,
+                "finished": False,
+            }
+        elif kind in ("run_resumed", "run_finished"):
+            run = self._runs.get(event["run_id"])
+            if run is None:
+                return
+            if kind == "run_resumed":
+                run["resumes"] += 1
+                run["owner"] = event.get("owner")
+            else:
+                run["finished"] = True
+        elif kind == "submitted":
+            self._jobs[event["output_path"]] = {
+                "prompt": event["prompt"],
+                "duration": event.get("duration"),
+                "generation_id": event["generation_id"],
+                "state": "submitted",
+                "at": event["at"],
+            }
+        elif kind in ("downloaded", "failed"):
+            job = self._jobs.get(event["output_path"])
+            if job is not None:
+                job["state"] = kind
+
+    def _reload(self) -> None:
+        """ファイルを読み直して状態を作り直す（ロックを持って呼ぶ）"""
+        self._runs.clear()
+        self._jobs.clear()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError):
+                        # 書き込み途中で止まった行は読み飛ばす
+                        continue
+        except OSError as e:
+            print(f"⚠️ ジョブジャーナルの読み込みエラー: {e}")
+
+    def _compact(self) -> None:
+        """
+        どの実行も処理中でなければファイルを書き直して小さくする
+
+        他のプロセスが追記しているかもしれないので、ファイルをロックして読み直してから判断し、
+        書き直し終わるまでロックを持ち続ける
+        """
+        with self._file_locked():
+            self._reload()
+            now = time.time()
+            if any(not run["finished"] and now - run["at"] < self.max_age for run in self._runs.values()):
+                return
+            self._rewrite(now)
+        self._remove_stale_locks()
+
+    def _rewrite(self, now: float) -> None:
+        """期限内の送信中の生成だけを残してファイルを書き直す（ファイルのロックを持って呼ぶ）"""
+        self._runs.clear()
+        self._jobs = {
+            path: job for path, job in self._jobs.items()
+            if job["state"] == "submitted" and now - job["at"] < self.max_age
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for path, job in self._jobs.items():
+                f.write(json.dumps({
+                    "event": "submitted",
+                    "output_path": path,
+                    "prompt": job["prompt"],
+                    "duration": job["duration"],
+                    "generation_id": job["generation_id"],
+                    "at": job["at"],
+                }, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def _remove_stale_locks(self) -> None:
+        """持ち主のいなくなった実行のロックファイルを消す（ロックを持って呼ぶ）"""
+        if not os.path.isdir(self.lock_dir):
+            return
+        for name in os.listdir(self.lock_dir):
+            if name[:-len(".lock")] in self._run_locks:
+                continue
+            path = os.path.join(self.lock_dir, name)
+            with open(path, 'a+') as lock_file:
+                if not _try_lock(lock_file):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _try_lock(lock_file: IO) -> bool:
+    """
+    ロックファイルをロック（待たない。ロックはファイルを閉じるかプロセスが終わると外れる）
+
+    Returns:
+        ロックできた場合True
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
@@ -0,0 +1,664 @@
+"""
+LumaAI 非同期クライアントモジュール
+1つのコネクションプールで生成リクエストを送り、1つのタスクでまとめてポーリングし、並行してダウンロードする
+"""
+
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional
+import httpx
+
+from generation_poller import AdaptivePoller, retry_after_seconds
+from job_journal import JobJournal
+from downloader import DownloadError, ResumableDownloader, get_downloader
+from hedging import HedgeBudget
+from generation_scheduler import GenerationScheduler, get_generation_scheduler
+
+# 本番の生成APIのURL（環境変数 LUMAAI_BASE_URL はインスタンス作成時に読む。.env の読み込み後に反映されるように）
+LUMAAI_DEFAULT_BASE_URL = "https://api.lumalabs.ai/v1/generations"
+
+
+def luma_base_url() -> str:
+    """生成APIのURL（LUMAAI_BASE_URL が設定されていればそちら）"""
+    return os.getenv("LUMAAI_BASE_URL") or LUMAAI_DEFAULT_BASE_URL
+
+
+class AsyncLumaClient:
+    """
+    LumaAI API の非同期クライアント
+
+    generate() を何本同時に呼んでも、ポーリングは1つのタスクが1回のループで
+    処理中の全生成をまとめて確認する。HTTP接続は1つの httpx.AsyncClient で共有する。
+
+    使い方:
+        async with AsyncLumaClient(api_key) as client:
+            results = await client.generate_many([{"prompt": ..., "output_path": ...}])
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        aspect_ratio: str = "9:16",
+        model: Optional[str] = None,
+        max_connections: int = 20,
+        poller: Optional[AdaptivePoller] = None,
+        journal: Optional[JobJournal] = None,
+        downloader: Optional[ResumableDownloader] = None,
+        hedge_budget: Optional[HedgeBudget] = None,
+        scheduler: Optional[GenerationScheduler] = None,
+        priority: str = "scheduled",
+        generation_timeout: float = 300.0,
+        max_retries: int = 3,
+        retry_delay: float = 10.0,
+        request_timeout: float = 30.0
+    ):
+        """
+        Args:
+            api_key: LumaAI APIキー
+            base_url: 生成APIのURL（省略時は環境変数 LUMAAI_BASE_URL または本番URL）
+            aspect_ratio: アスペクト比
+            model: 生成モデル（省略時はAPIの既定モデル）
+            max_connections: 同時接続数の上限
+            poller: ポーリング間隔を決める AdaptivePoller（省略時は既定の設定で作成）
+            journal: 送信した生成IDを記録し、再起動後に再接続する JobJournal（オプション）
+            downloader: 動画のダウンロードに使う ResumableDownloader（省略時はプロセス共通のもの）
+            hedge_budget: 指定すると、過去の生成時間の分位点を超えた生成に重複の生成（ヘッジ）を出し、
+                先に完了した方を使う（予算と分位点は HedgeBudget の設定）
+            scheduler: 送信のレートと同時実行数を制限する GenerationScheduler（省略時はプロセス共通のもの）
+            priority: このクライアントの生成の優先度（generation_scheduler.PRIORITIES のキー）
+            generation_timeout: 1回の生成を待つ最大時間（秒）
+            max_retries: 1本あたりの最大試行回数
+            retry_delay: 再試行までの待ち時間（秒）
+            request_timeout: API リクエストのタイムアウト（秒）
+        """
+        self.api_key = api_key
+        self.base_url = (base_url or luma_base_url()).rstrip("/")
+        self.aspect_ratio = aspect_ratio
+        self.model = model
+        self.max_connections = max_connections
+        self.poller = poller or AdaptivePoller()
+        self.poll_interval = self.poller.base_interval
+        self.journal = journal
+        self.downloader = downloader or get_downloader()
+        self.hedge_budget = hedge_budget
+        self.scheduler = scheduler or get_generation_scheduler()
+        self.priority = priority
+        self.generation_timeout = generation_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.request_timeout = request_timeout
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self._jobs: List[Dict] = []
+        self._poller: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._downloads: set = set()
+        # 429 / Retry-After を受けたら全リクエストをこの時刻まで止める
+        self._backoff_until = 0.0
+
+        # 統計
+        self.submits = 0
+        self.polls = 0
+        self.downloads = 0
+        self.throttled = 0
+        self.resumed = 0
+        self.fixed_interval_polls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedge_saved_seconds = 0.0
+        self.hedge_unresolved = 0
+
+    async def __aenter__(self) -> "AsyncLumaClient":
+        # API リクエスト用のプール（動画のダウンロードは ResumableDownloader がスレッドで行う）
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            ),
+            timeout=httpx.Timeout(self.request_timeout),
+            follow_redirects=True
+        )
+        self._wakeup = asyncio.Event()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._close_shadows()
+        for job in self._jobs:
+            self._release_slot(job)
+        tasks = list(self._downloads)
+        if self._poller is not None:
+            tasks.append(self._poller)
+            self._poller = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._http.aclose()
+        self._http = None
+
+    async def generate(
+        self,
+        prompt: str,
+        output_path: str,
+        duration: int = 5,
+        on_downloaded: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """
+        動画を1本生成してダウンロード
+
+        Args:
+            prompt: 動画生成用のプロンプト
+            output_path: 出力ファイルパス
+            duration: 動画の長さ（秒）
+            on_downloaded: ダウンロード直後にスレッドで実行する処理（正規化など）
+
+        Returns:
+            生成された動画のパス（失敗時はNone）
+        """
+        if self._http is None:
+            raise RuntimeError("AsyncLumaClient は async with の中で使用してください")
+
+        job = {
+            "prompt": prompt,
+            "output_path": output_path,
+            "duration": duration,
+            "on_downloaded": on_downloaded,
+            "attempts": 0,
+            "generation_id": None,
+            "submitted_at": None,
+            "next_attempt_at": 0.0,
+            "next_poll_at": 0.0,
+            "poll_key": AdaptivePoller.key(self.model, duration),
+            "polls": 0,
+            "resumed": False,
+            "downloading": False,
+            # ヘッジ: 元の生成は hedge に重複の生成を、重複の生成は hedge_of に元の生成を持つ
+            "hedge": None,
+            "hedge_of": None,
+            # ヘッジに先を越された元の生成（ダウンロードせず、完了時刻の記録のためだけに確認を続ける）
+            "shadow": False,
+            "won_at": None,
+            # 確認を続けた元の生成が完了した場合の動画URL（ヘッジのダウンロードが失敗したときに使う）
+            "video_url": None,
+            # スケジューラーのチケット（送信待ち〜生成完了まで）
+            "ticket": None,
+            "future": asyncio.get_running_loop().create_future(),
+        }
+        if self.journal is not None and not self._resume(job):
+            return output_path
+        self._jobs.append(job)
+        self._ensure_poller()
+        return await job["future"]
+
+    async def generate_many(
+        self,
+        items: List[Dict],
+        on_downloaded: Optional[Callable[[str], None]] = None
+    ) -> List[Optional[str]]:
+        """
+        複数の動画をまとめて生成
+
+        Args:
+            items: [{"prompt": ..., "output_path": ..., "duration": ...}] のリスト
+            on_downloaded: ダウンロード直後にスレッドで実行する処理
+
+        Returns:
+            items と同じ順の動画パスのリスト（失敗した要素はNone）
+        """
+        return await asyncio.gather(*(
+            self.generate(
+                item["prompt"], item["output_path"], item.get("duration", 5), on_downloaded
+            )
+            for item in items
+        ))
+
+    def stats(self) -> Dict:
+        """リクエスト数の統計（fixed_interval_polls は固定間隔でポーリングした場合の見込み回数）"""
+        return {
+            "submits": self.submits,
+            "polls": self.polls,
+            "downloads": self.downloads,
+            "throttled": self.throttled,
+            "resumed": self.resumed,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_saved_seconds": self.hedge_saved_seconds,
+            "hedge_unresolved": self.hedge_unresolved,
+            "fixed_interval_polls": self.fixed_interval_polls,
+        }
+
+    def _resume(self, job: Dict) -> bool:
+        """
+        ジャーナルに記録された前回の生成を引き継ぐ
+
+        Returns:
+            まだ処理が必要な場合True（ダウンロード済みならFalse）
+        """
+        if self.journal.downloaded(job["output_path"], job["prompt"]):
+            print(f"♻️ 前回ダウンロード済み: {job['output_path']}")
+            self.resumed += 1
+            return False
+
+        pending = self.journal.pending_generation(job["output_path"], job["prompt"])
+        if pending:
+            # 送信済みの生成に再接続し、すぐに状態を確認する
+            job["attempts"] = 1
+            job["generation_id"] = pending["generation_id"]
+            job["submitted_at"] = time.monotonic() - pending["elapsed"]
+            job["resumed"] = True
+            self.resumed += 1
+            print(f"🔁 生成に再接続: {pending['generation_id']}（送信から{pending['elapsed']:.0f}秒）")
+        return True
+
+    def _ensure_poller(self) -> None:
+        """ポーリングタスクが止まっていれば起動し、動いていれば起こす"""
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_loop())
+        self._wakeup.set()
+
+    async def _poll_loop(self) -> None:
+        """ポーリングループ（想定外の例外は待っている呼び出し元に伝える）"""
+        try:
+            await self._run_jobs()
+        except Exception as e:
+            for job in list(self._jobs):
+                self._release_slot(job)
+                if not job["future"].done():
+                    job["future"].set_exception(e)
+            self._jobs.clear()
+            raise
+
+    async def _run_jobs(self) -> None:
+        """
+        処理中の全生成を1つのループで進める
+
+        1回のループで、送信待ちの生成をまとめて送信し、処理中の生成の状態を
+        まとめて確認し、完了したものはダウンロードタスクに渡す
+        """
+        while self._jobs:
+            self._wakeup.clear()
+            now = time.monotonic()
+            if now < self._backoff_until:
+                await asyncio.sleep(self._backoff_until - now)
+                continue
+
+            # 1. 送信（初回・再試行、スケジューラーの許可が出たものだけ）
+            to_submit = [
+                job for job in self._jobs
+                if job["generation_id"] is None and not job["downloading"] and job["next_attempt_at"] <= now
+                and self._schedule(job, now)
+            ]
+            if to_submit:
+                await asyncio.gather(*(self._submit(job) for job in to_submit))
+
+            # 2. 状態確認（確認時刻が来ている生成をまとめて。少し先の生成も同じ回に含める）
+            now = time.monotonic()
+            due = now + self.poll_interval * 0.25
+            in_flight = [
+                job for job in self._jobs
+                if job["generation_id"] and not job["downloading"] and job["next_poll_at"] <= due
+            ]
+            if in_flight:
+                statuses = await asyncio.gather(*(self._status(job["generation_id"]) for job in in_flight))
+                states: Dict[str, int] = {}
+                for job, data in zip(in_flight, statuses):
+                    job["polls"] += 1
+                    elapsed = time.monotonic() - job["submitted_at"]
+                    job["next_poll_at"] = time.monotonic() + self.poller.next_delay(job["poll_key"], elapsed)
+                    self._handle_status(job, data)
+                    if data:
+                        states[data.get("state")] = states.get(data.get("state"), 0) + 1
+                if states:
+                    print("⏳ 状態: " + " / ".join(f"{state} {count}件" for state, count in states.items()))
+
+            # 3. 想定より遅れている生成にヘッジを出す（次のループで送信される）
+            if self.hedge_budget is not None:
+                self._launch_hedges()
+
+            if not self._jobs:
+                break
+
+            # 4. 次の送信・確認時刻まで待つ（新しい生成が追加されたら早めに起きる）
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_wait())
+            except asyncio.TimeoutError:
+                pass
+
+    def _next_wait(self) -> float:
+        """次にループを回すまでの秒数"""
+        now = time.monotonic()
+        waits = [self.poll_interval]
+        for job in self._jobs:
+            if job["downloading"]:
+                continue
+            if job["generation_id"] is None:
+                waits.append(max(0.0, job["next_attempt_at"] - now))
+            else:
+                waits.append(max(0.0, job["next_poll_at"] - now))
+        return min(waits)
+
+    def _handle_status(self, job: Dict, data: Optional[Dict]) -> None:
+        """1件の状態確認結果を処理"""
+        if job not in self._jobs:
+            # 同じ回で先に外されたヘッジは無視
+            return
+        if data is None:
+            # 一時的なエラーは次のループで再確認（失敗が続いてもタイムアウトは適用する）
+            if time.monotonic() - job["submitted_at"] <= self.generation_timeout:
+                return
+            if job["shadow"]:
+                self._observe_shadow(job, {})
+            else:
+                self._retry_or_fail(job, f"タイムアウト: {self.generation_timeout}秒経過（状態確認エラー）")
+            return
+        if job["shadow"]:
+            self._observe_shadow(job, data)
+            return
+
+        state = data.get("state")
+        if state == "completed":
+            video_url = (data.get("assets") or {}).get("video")
+            if video_url:
+                elapsed = time.monotonic() - job["submitted_at"]
+                if not job["resumed"]:
+                    # 再接続した生成は完了時刻が分からないので分布に加えない
+                    self.poller.record(job["poll_key"], elapsed)
+                fixed = self.poller.fixed_interval_polls(elapsed)
+                self.fixed_interval_polls += fixed
+                print(
+                    f"📊 ポーリング {job['polls']}回 / {elapsed:.0f}秒"
+                    f"（固定{self.poll_interval}秒間隔なら{fixed}回）: {job['prompt'][:30]}..."
+                )
+                self._settle_hedge(job)
+                self._release_slot(job)
+                self._start_download(job, video_url)
+                return
+            self._retry_or_fail(job, "動画URLがありません")
+        elif state == "failed":
+            self._retry_or_fail(job, f"生成失敗: {data.get('failure_reason', '')}")
+        elif time.monotonic() - job["submitted_at"] > self.generation_timeout:
+            self._retry_or_fail(job, f"タイムアウト: {self.generation_timeout}秒経過")
+
+    def _retry_or_fail(self, job: Dict, reason: str) -> None:
+        """再試行できれば送信待ちに戻し、できなければ失敗として終了"""
+        print(f"⚠️ {reason}（試行 {job['attempts']}/{self.max_retries}）: {job['prompt'][:30]}...")
+        self._release_slot(job)
+        if job["hedge_of"] is not None:
+            self._drop_hedge(job)
+            return
+        if self.journal is not None and job["generation_id"]:
+            self.journal.record_failed(job["output_path"], job["generation_id"])
+        job["generation_id"] = None
+        job["downloading"] = False
+        if job["attempts"] >= self.max_retries:
+            hedge = job["hedge"]
+            if hedge is not None and hedge in self._jobs:
+                # ヘッジがまだ生きていればそちらを元の生成として続ける
+                print(f"🪂 ヘッジの生成を引き継ぎます: {hedge['generation_id']}")
+                hedge["hedge_of"] = None
+                self._jobs.remove(job)
+                return
+            print(f"❌ 動画生成失敗: 最大試行回数を超えました")
+            self._finish(job, None)
+        else:
+            job["next_attempt_at"] = time.monotonic() + self.retry_delay
+            self._wakeup.set()
+
+    def _finish(self, job: Dict, result: Optional[str]) -> None:
+        """ジョブを終了して待っている呼び出し元に結果を返す"""
+        self._release_slot(job)
+        if job in self._jobs:
+            self._jobs.remove(job)
+        if not job["future"].done():
+            job["future"].set_result(result)
+        if not self._jobs:
+            # ポーリングループを終了させる
+            self._wakeup.set()
+
+    def _launch_hedges(self) -> None:
+        """過去の生成時間の分位点を超えた生成に、予算の範囲で重複の生成を追加"""
+        now = time.monotonic()
+        for job in list(self._jobs):
+            if (
+                job["hedge"] is not None or job["hedge_of"] is not None or job["shadow"]
+                or job["downloading"] or not job["generation_id"]
+            ):
+                continue
+            threshold = self.poller.quantile(job["poll_key"], self.hedge_budget.quantile)
+            elapsed = now - job["submitted_at"]
+            if threshold is None or elapsed <= threshold:
+                continue
+            if not self.scheduler.has_capacity():
+                # 枠が埋まっているときにヘッジを出しても送信が遅れるだけなので出さない
+                break
+            if not self.hedge_budget.try_acquire():
+                break
+
+            hedge = dict(
+                job,
+                attempts=self.max_retries - 1,  # ヘッジ自体は再試行しない
+                generation_id=None,
+                submitted_at=None,
+                next_attempt_at=0.0,
+                next_poll_at=0.0,
+                polls=0,
+                resumed=False,
+                hedge=None,
+                ticket=None,
+                hedge_of=job,
+            )
+            job["hedge"] = hedge
+            self._jobs.append(hedge)
+            self.hedges += 1
+            print(
+                f"🪂 ヘッジ生成: {elapsed:.0f}秒経過（p{self.hedge_budget.quantile * 100:.0f} {threshold:.0f}秒超過、"
+                f"本日の残り{self.hedge_budget.remaining()}件）: {job['prompt'][:30]}..."
+            )
+
+    def _settle_hedge(self, job: Dict) -> None:
+        """先に完了した方を使い、もう一方は無視する"""
+        if job["hedge_of"] is not None:
+            primary = job["hedge_of"]
+            self.hedge_wins += 1
+            if primary in self._jobs:
+                # 元の生成はダウンロードせず、短縮できた時間を測るためだけに確認を続ける
+                primary["shadow"] = True
+                primary["won_at"] = time.monotonic()
+                print(f"🏁 ヘッジが先に完了しました: {job['prompt'][:30]}...")
+            else:
+                self.hedge_budget.record_result(True)
+        elif job["hedge"] is not None and job["hedge"] in self._jobs:
+            # 元の生成が先に完了したのでヘッジは無視する
+            self._release_slot(job["hedge"])
+            self._jobs.remove(job["hedge"])
+            self.hedge_budget.record_result(False)
+
+    def _drop_hedge(self, hedge: Dict) -> None:
+        """失敗したヘッジを外す（先に完了してダウンロードに失敗した場合は元の生成に戻す）"""
+        if hedge in self._jobs:
+            self._jobs.remove(hedge)
+        primary = hedge["hedge_of"]
+        if primary["shadow"]:
+            primary["shadow"] = False
+            primary["won_at"] = None
+            self.hedge_wins -= 1
+            if primary not in self._jobs:
+                # 元の生成の確認はもう終わっているので、完了していればその動画をダウンロードし、
+                # 失敗していれば元の生成として再試行する（呼び出し元を待たせたままにしない）
+                self._jobs.append(primary)
+                if primary["video_url"]:
+                    print(f"↩️ ヘッジのダウンロードに失敗したため元の生成の動画を使います: {primary['prompt'][:30]}...")
+                    self._start_download(primary, primary["video_url"])
+                else:
+                    self._retry_or_fail(primary, "ヘッジのダウンロード失敗")
+                    self._ensure_poller()
+                return
+        else:
+            self.hedge_budget.record_result(False)
+        self._wakeup.set()
+
+    def _observe_shadow(self, job: Dict, data: Dict) -> None:
+        """ヘッジに先を越された生成の完了を待ち、短縮できた時間を記録"""
+        state = data.get("state")
+        now = time.monotonic()
+        if state == "completed":
+            if not job["resumed"]:
+                # 遅い生成も分布に残す（ヘッジした分だけ分布が速い側に偏らないように）
+                self.poller.record(job["poll_key"], now - job["submitted_at"])
+            job["video_url"] = (data.get("assets") or {}).get("video")
+        elif state != "failed" and now - job["submitted_at"] <= self.generation_timeout:
+            return
+        saved = now - job["won_at"]
+        self.hedge_saved_seconds += saved
+        self.hedge_budget.record_result(True, saved)
+        self._release_slot(job)
+        print(f"⏱️ ヘッジで短縮: {saved:.0f}秒（元の生成: {state}）: {job['prompt'][:30]}...")
+        self._jobs.remove(job)
+        if not self._jobs:
+            self._wakeup.set()
+
+    def _close_shadows(self) -> None:
+        """終了時にまだ完了していない元の生成は、それまでの経過時間を短縮時間の下限として記録"""
+        now = time.monotonic()
+        for job in [job for job in self._jobs if job["shadow"]]:
+            saved = now - job["won_at"]
+            self.hedge_saved_seconds += saved
+            self.hedge_unresolved += 1
+            self.hedge_budget.record_result(True, saved)
+            self._release_slot(job)
+            self._jobs.remove(job)
+
+    def _schedule(self, job: Dict, now: float) -> bool:
+        """
+        スケジューラーに送信の許可を求める
+
+        Returns:
+            送信してよい場合True（だめなら次に試す時刻を next_attempt_at に入れる）
+        """
+        if job["ticket"] is None:
+            job["ticket"] = self.scheduler.enqueue(self.priority)
+        wait = self.scheduler.try_start(job["ticket"])
+        if wait > 0:
+            job["next_attempt_at"] = now + wait
+            return False
+        return True
+
+    def _release_slot(self, job: Dict) -> None:
+        """生成が終わった（または送信し直す）ジョブのスケジューラーの枠を返す"""
+        if job["ticket"] is not None:
+            self.scheduler.release(job["ticket"])
+            job["ticket"] = None
+
+    async def _submit(self, job: Dict) -> None:
+        """生成リクエストを送信"""
+        job["attempts"] += 1
+        payload = {
+            "prompt": job["prompt"],
+            "aspect_ratio": self.aspect_ratio,
+        }
+        if self.model:
+            payload["model"] = self.model
+        try:
+            response = await self._http.post(self.base_url, headers=self.headers, json=payload)
+            self.submits += 1
+            if response.status_code == 201:
+                job["generation_id"] = response.json().get("id")
+                job["submitted_at"] = time.monotonic()
+                job["polls"] = 0
+                job["resumed"] = False
+                job["next_poll_at"] = job["submitted_at"] + self.poller.next_delay(job["poll_key"], 0.0)
+                if self.journal is not None and job["hedge_of"] is None:
+                    self.journal.record_submitted(
+                        job["output_path"], job["prompt"], job["duration"], job["generation_id"]
+                    )
+                print(f"📝 生成ID: {job['generation_id']}")
+                return
+            if self._throttle(response):
+                # レート制限は試行回数に数えず、指定された時間だけ待って再送信
+                job["attempts"] -= 1
+                self._release_slot(job)
+                job["next_attempt_at"] = self._backoff_until
+                return
+            print(f"❌ API エラー: {response.status_code}")
+            print(f"レスポンス: {response.text}")
+        except httpx.HTTPError as e:
+            print(f"❌ リクエストエラー: {e}")
+        self._retry_or_fail(job, "生成リクエスト失敗")
+
+    async def _status(self, generation_id: str) -> Optional[Dict]:
+        """生成の状態を取得（一時的なエラー時はNone、存在しない生成IDは failed として返す）"""
+        try:
+            response = await self._http.get(f"{self.base_url}/{generation_id}", headers=self.headers)
+            self.polls += 1
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code == 404:
+                # 期限切れ・削除済みの生成IDは何度確認しても見つからない
+                return {"id": generation_id, "state": "failed", "failure_reason": "生成IDが見つかりません（404）"}
+            if not self._throttle(response):
+                print(f"❌ ステータス確認エラー: {response.status_code}")
+        except httpx.HTTPError as e:
+            print(f"❌ ポーリングエラー: {e}")
+        return None
+
+    def _throttle(self, response: httpx.Response) -> bool:
+        """
+        429 / Retry-After 付きのレスポンスなら全リクエストを一時停止
+
+        Returns:
+            レート制限として扱った場合True
+        """
+        retry_after = retry_after_seconds(response.headers)
+        if response.status_code != 429 and retry_after is None:
+            return False
+        wait = retry_after if retry_after is not None else self.poll_interval
+        self._backoff_until = max(self._backoff_until, time.monotonic() + wait)
+        self.throttled += 1
+        print(f"🐢 レート制限: {wait:.1f}秒待機します（{response.status_code}）")
+        return True
+
+    def _start_download(self, job: Dict, video_url: str) -> None:
+        """完了した生成のダウンロードを開始"""
+        job["downloading"] = True
+        task = asyncio.create_task(self._download_job(job, video_url))
+        self._downloads.add(task)
+        task.add_done_callback(self._downloads.discard)
+
+    async def _download_job(self, job: Dict, video_url: str) -> None:
+        """完了した生成をダウンロードし、後処理をしてから結果を返す"""
+        output_path = job["output_path"]
+        if not await self._download(video_url, output_path):
+            self._retry_or_fail(job, "ダウンロード失敗")
+            return
+
+        print(f"✅ 動画生成完了: {output_path}")
+        if job["on_downloaded"]:
+            await asyncio.to_thread(job["on_downloaded"], output_path)
+        if self.journal is not None:
+            self.journal.record_downloaded(output_path)
+        self._finish(job, output_path)
+
+    async def _download(self, video_url: str, output_path: str) -> bool:
+        """
+        動画をダウンロード（一時ファイルに書いて置き換え、中断したら続きから再開する）
+
+        Returns:
+            成功した場合True
+        """
+        try:
+            print(f"⬇️ ダウンロード中...")
+            await asyncio.to_thread(self.downloader.download, video_url, output_path)
+            self.downloads += 1
+            print(f"✅ ダウンロード完了: {output_path}")
+            return True
+        except DownloadError as e:
+            print(f"❌ ダウンロードエラー: {e}")
+            return False
+        except OSError as e:
+            print(f"❌ ダウンロード例外: {e}")
+            return False
@@ -8,22 +8,57 @@ import sys
 import argparse
 from datetime import datetime
 from pathlib import Path
+from typing import Dict
 
 from question_generator import QuestionGenerator
+from question_pool import QuestionPool
 from ai_video_generator import AIVideoGenerator
 from video_creator import QuestionVideoCreator
 from youtube_uploader import YouTubeUploader
 from discord_notifier import DiscordNotifier
+from encoder_profiles import profile_names
+from job_journal import JobJournal
+from http_transport import get_http_transport
+from section_pipeline import SectionPipeline
+from generation_scheduler import PRIORITIES
 
 
 class QuestionVideoAutoUploader:
     """選択式質問動画自動投稿システム"""
     
-    def __init__(self):
-        """初期化"""
+    def __init__(
+        self,
+        profile: str = None,
+        use_video_cache: bool = True,
+        pipelined: bool = None,
+        hedge: bool = False,
+        priority: str = "scheduled"
+    ):
+        """
+        初期化
+        
+        Args:
+            profile: エンコードプロファイル名（省略時は設定ファイルの値）
+            use_video_cache: 生成済みのAI動画を再利用するか
+            pipelined: AI動画の生成中に届いた順でセクションをエンコードするか（省略時は設定ファイルの値）
+            hedge: 生成が遅れている選択肢に重複の生成を出し、先に完了した方を使うか
+            priority: 同時に動く他の実行と生成を取り合うときの優先度（manual / scheduled / backfill）
+        """
         self.question_generator = QuestionGenerator()
-        self.ai_video_generator = AIVideoGenerator()
-        self.video_creator = QuestionVideoCreator()
+        # 作り置きの質問から取り出し、減ったらバックグラウンドでまとめて補充する
+        self.question_pool = QuestionPool(self.question_generator)
+        self.video_creator = QuestionVideoCreator(profile=profile)
+        self.pipelined = self.video_creator.pipelined if pipelined is None else pipelined
+        self.hedge = hedge
+        # 送信した生成IDを記録し、中断した実行を再開できるようにする
+        self.journal = JobJournal()
+        # ダウンロード直後に正規化しておき、合成時は変換済みの動画を読むだけにする
+        self.ai_video_generator = AIVideoGenerator(
+            normalizer=self.video_creator.normalizer,
+            use_cache=use_video_cache,
+            journal=self.journal,
+            priority=priority
+        )
         self.youtube_uploader = None
         self.discord_notifier = None
         
@@ -46,30 +81,40 @@ class QuestionVideoAutoUploader:
         Returns:
             結果の辞書
         """
+        timestamp = None
+        pipeline = None
         try:
             print(f"\n{'='*70}")
             print(f"選択式質問動画自動生成システム")
             print(f"開始時刻: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             print(f"{'='*70}\n")
             
-            # 1. 質問生成
+            # 1. 質問生成（中断した実行があれば同じ質問で再開し、送信済みの生成に再接続する）
             print("📝 ステップ 1/5: 質問生成中...")
-            question_data = self.question_generator.generate_question(category)
+            run = self.journal.unfinished_run("main", category)
+            if run:
+                timestamp = run["run_id"]
+                question_data = run["question_data"]
+                print(f"🔁 中断した実行を再開します: {timestamp}（{run['resumes'] + 1}回目）")
+            else:
+                question_data = self.question_pool.generate_question(category)
             
             print(f"カテゴリ: {question_data.get('category')}")
             print(f"質問: {question_data.get('question')}")
             print(f"選択肢数: {len(question_data.get('choices', []))}")
             
-            # バリデーション
-            if not self.question_generator.validate_content(question_data):
-                raise ValueError("生成された質問データが不正です")
+            if not run:
+                # バリデーション
+                if not self.question_generator.validate_content(question_data):
+                    raise ValueError("生成された質問データが不正です")
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                self.journal.start_run(timestamp, "main", question_data)
             
             # 2. AI動画生成（4つの選択肢を並列生成）
             print("\n🎬 ステップ 2/5: AI動画生成中...")
             print("（4つの選択肢動画を並列生成します。数分かかる場合があります）\n")
             
-            # タイムスタンプで一時ディレクトリを作成
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # タイムスタンプで一時ディレクトリを作成（再開時は前回のディレクトリ）
             session_temp_dir = self.temp_dir / timestamp
             session_temp_dir.mkdir(exist_ok=True)
             
@@ -79,11 +124,20 @@ class QuestionVideoAutoUploader:
                 for choice in question_data['choices']
             ]
             
+            # パイプライン: 生成を待つ間にオープニング・エンディングを、届いた選択肢から順にエンコード
+            on_video_ready = None
+            if self.pipelined:
+                pipeline = SectionPipeline(self.video_creator, question_data)
+                numbers = [choice['number'] for choice in question_data['choices']]
+                on_video_ready = lambda index, path: pipeline.submit_choice(numbers[index - 1], path)
+            
             # 並列生成
             choice_videos = self.ai_video_generator.generate_multiple_videos(
                 prompts=prompts,
                 output_dir=str(session_temp_dir),
-                duration=8
+                duration=8,
+                on_video_ready=on_video_ready,
+                hedge=self.hedge
             )
             
             # 生成に成功した動画数を確認
@@ -97,11 +151,16 @@ class QuestionVideoAutoUploader:
             print("\n🎞️  ステップ 3/5: 最終動画作成中...")
             final_video_path = self.output_dir / f"question_{timestamp}.mp4"
             
-            self.video_creator.create_question_video(
-                question_data=question_data,
-                choice_videos=choice_videos,
-                output_path=str(final_video_path)
-            )
+            if pipeline:
+                # 残りは届いていないセクションの完了待ちと結合だけ
+                pipeline.finish(str(final_video_path))
+                pipeline.close()
+            else:
+                self.video_creator.create_question_video(
+                    question_data=question_data,
+                    choice_videos=choice_videos,
+                    output_path=str(final_video_path)
+                )
             
             # 4. YouTubeメタデータ準備
             title = question_data.get('question', '選択式質問')
@@ -112,6 +171,7 @@ class QuestionVideoAutoUploader:
                 'category': question_data.get('category'),
                 'question': question_data.get('question'),
                 'video_path': str(final_video_path),
+                'render_report': self.video_creator.last_render_report,
                 'success': True
             }
             
@@ -151,6 +211,13 @@ class QuestionVideoAutoUploader:
                 print("\n🧹 一時ファイルをクリーンアップ中...")
                 self._cleanup_temp_files(session_temp_dir)
             
+            http_stats = get_http_transport().stats()
+            if http_stats["requests"]:
+                print(
+                    f"🔌 HTTP: リクエスト {http_stats['requests']} / 新規接続 {http_stats['connections']} "
+                    f"/ 接続再利用率 {http_stats['reuse_rate']:.0%}"
+                )
+            
             print(f"\n{'='*70}")
             print(f"✅ 完了!")
             print(f"動画パス: {final_video_path}")
@@ -158,6 +225,7 @@ class QuestionVideoAutoUploader:
                 print(f"YouTube URL: {result['video_url']}")
             print(f"{'='*70}\n")
             
+            self.journal.finish_run(timestamp, success=True)
             return result
             
         except Exception as e:
@@ -165,6 +233,9 @@ class QuestionVideoAutoUploader:
             import traceback
             traceback.print_exc()
             
+            if timestamp:
+                self.journal.finish_run(timestamp, success=False)
+            
             # エラー通知
             if not test_mode and self.discord_notifier:
                 self.discord_notifier.notify_error(
@@ -177,6 +248,9 @@ class QuestionVideoAutoUploader:
                 'success': False,
                 'error': str(e)
             }
+        finally:
+            if pipeline:
+                pipeline.close()
     
     def _create_description(self, question_data: Dict) -> str:
         """
@@ -230,11 +304,47 @@ def main():
         action='store_true',
         help='テストモード (アップロードをスキップ)'
     )
+    parser.add_argument(
+        '--profile',
+        type=str,
+        choices=profile_names(),
+        default=None,
+        help='エンコードプロファイル（draft / publish / archive など、省略時は設定ファイルの値）'
+    )
+    parser.add_argument(
+        '--pipelined',
+        action='store_true',
+        default=None,
+        help='AI動画の生成中に届いた順でセクションをエンコードし、最後に結合だけを行う'
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='生成が過去の p75 より遅れている選択肢に重複の生成を出し、先に完了した方を使う（1日の上限あり）'
+    )
+    parser.add_argument(
+        '--priority',
+        type=str,
+        choices=list(PRIORITIES),
+        default=None,
+        help='AI動画生成の優先度（省略時は --test なら manual、それ以外は scheduled）'
+    )
+    parser.add_argument(
+        '--no-video-cache',
+        action='store_true',
+        help='生成済みのAI動画を再利用せず、必ず新しく生成する'
+    )
     
     args = parser.parse_args()
     
     # システムを実行
-    uploader = QuestionVideoAutoUploader()
+    uploader = QuestionVideoAutoUploader(
+        profile=args.profile,
+        use_video_cache=not args.no_video_cache,
+        pipelined=args.pipelined,
+        hedge=args.hedge,
+        priority=args.priority or ('manual' if args.test else 'scheduled')
+    )
     result = uploader.generate_and_upload(
         category=args.category,
         test_mode=args.test
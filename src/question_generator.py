@@ -6,19 +6,29 @@ Gemini APIを使用して視聴者参加型の選択式質問を生成
 import json
 import random
 import os
+import sqlite3
 from datetime import datetime
 from typing import Dict, List
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from history_store import HistoryStore
+from similarity_index import SimilarityIndex, jaccard, shingles
+
 load_dotenv()
 
 
 class QuestionGenerator:
     """選択式質問生成クラス"""
     
-    def __init__(self):
-        """初期化"""
+    def __init__(self, bilingual: bool = None):
+        """
+        初期化
+
+        Args:
+            bilingual: 同じ応答で英訳（question_en / title_en）も出力させるか
+                       （省略時は QUESTION_BILINGUAL=0 で無効）
+        """
         self.api_key = os.getenv("GEMINI_API_KEY")
         
         if not self.api_key:
@@ -35,13 +45,30 @@ class QuestionGenerator:
             "恋愛・人間関係": 2,
         }
 
-        # 履歴ファイルのパス
+        # 履歴（SQLite に1件ずつ追記。旧形式の JSON は初回に取り込む）
         self.history_file = os.path.join(
             os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
             "output", "question_history.json"
         )
-        self.history_max = 30  # 直近30件を記憶
-
+        self.history = HistoryStore(legacy_path=self.history_file)
+        self.history_max = 30  # プロンプトに入れるのは直近30件
+
+        # 全履歴の近似重複インデックス（直近30件より古いお題との重複も検出する）
+        self.similarity = SimilarityIndex()
+        if not len(self.similarity):
+            self.similarity.seed(
+                (row["question"], "question", row["category"]) for row in reversed(self.history.query())
+            )
+        self.max_regenerations = 2  # 重複していたら生成し直す回数
+
+        # 英訳を同じ応答に含める（レンダリング時に翻訳のためだけにGeminiを呼ばない）
+        self.bilingual = os.getenv("QUESTION_BILINGUAL", "1") != "0" if bilingual is None else bilingual
+        self.bilingual_instruction = """
+【英訳】
+英語版の字幕にも使うため、出力するJSONに次の項目を追加してください（他の項目はそのまま）：
+- "question_en": 質問文の自然な英訳
+- 各選択肢の "title_en": 選択肢タイトルの自然で短い英訳
+"""
         
         # 安全性設定（不適切コンテンツをブロック）
         self.safety_settings = [
@@ -269,32 +296,43 @@ JSON形式のみを出力してください。
         ]
     
     def _load_history(self) -> List[str]:
-        """過去の質問履歴を読み込む"""
-        if not os.path.exists(self.history_file):
-            return []
+        """直近の質問履歴を読み込む（古い順）"""
         try:
-            with open(self.history_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
+            return self.history.recent(self.history_max)
+        except sqlite3.Error as e:
+            print(f"⚠️ 履歴の読み込みエラー: {e}")
             return []
 
-    def _save_history(self, question: str) -> None:
+    def _save_history(self, question: str, category: str = None, data: Dict = None) -> None:
         """質問を履歴に追記する"""
-        history = self._load_history()
-        history.append(question)
-        history = history[-self.history_max:]  # 直近N件だけ保持
-        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-        with open(self.history_file, "w", encoding="utf-8") as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-
-    def _build_prompt(self, template: str, history: List[str]) -> str:
-        """履歴を避けるよう指示をプロンプトに付加する"""
-        if not history:
-            return template
-        recent = "\n".join(f"- {q}" for q in history[-10:])
-        avoidance = f"\n【過去に使用済みのお題（これらと似た内容は避けること）】\n{recent}\n"
-        # テンプレートの【出力形式】の直前に挿入
-        return template.replace("【出力形式】", avoidance + "【出力形式】", 1)
+        self.history.append(question, category, data)
+
+    def _record(self, question_data: Dict) -> None:
+        """使ったお題を履歴と近似重複インデックスに残す"""
+        self._save_history(question_data["question"], question_data.get("category"), question_data)
+        self.similarity.add_question(question_data)
+
+    def _build_prompt(self, template: str, history: List[str], similar: List[str] = None) -> str:
+        """
+        履歴を避けるよう指示をプロンプトに付加する
+
+        Args:
+            template: カテゴリのプロンプト
+            history: 直近の質問
+            similar: 優先して避けさせる質問（重複した過去のお題・繰り返されがちなお題）
+        """
+        avoid = []
+        for question in list(similar or []) + history[::-1]:
+            if question not in avoid:
+                avoid.append(question)
+        if avoid:
+            recent = "\n".join(f"- {q}" for q in avoid[:10])
+            avoidance = f"\n【過去に使用済みのお題（これらと似た内容は避けること）】\n{recent}\n"
+            # テンプレートの【出力形式】の直前に挿入
+            template = template.replace("【出力形式】", avoidance + "【出力形式】", 1)
+        if self.bilingual:
+            template += self.bilingual_instruction
+        return template
 
     def generate_question(self, category: str = None) -> Dict:
         """
@@ -317,33 +355,36 @@ JSON形式のみを出力してください。
         else:
             selected_category = self._weighted_random_category()
 
-        # 履歴を読み込んでプロンプトに付加
+        # 履歴と、このカテゴリで繰り返されがちなお題をプロンプトに付加
         history = self._load_history()
-        prompt = self._build_prompt(selected_category["prompt_template"], history)
+        similar = self.similarity.crowded(selected_category["name"])
 
         try:
-            response = self.model.generate_content(
-                prompt,
-                safety_settings=self.safety_settings
-            )
-            content = response.text.strip()
-
-            # JSONをパース
-            # コードブロックを除去
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-
-            question_data = json.loads(content.strip())
-
-            # カテゴリ情報を追加
-            question_data["category"] = selected_category["name"]
+            for attempt in range(self.max_regenerations + 1):
+                prompt = self._build_prompt(selected_category["prompt_template"], history, similar)
+                response = self.model.generate_content(
+                    prompt,
+                    safety_settings=self.safety_settings
+                )
+                question_data = self._parse_response(response.text)
+                self._check_bilingual(question_data)
+
+                # カテゴリ情報を追加
+                question_data["category"] = selected_category["name"]
+
+                # 過去のお題と近似重複していれば、重複したお題を先頭に避けさせて生成し直す
+                duplicate = self.similarity.find_duplicate(question_data)
+                if duplicate is None:
+                    break
+                score, entry = duplicate
+                print(f"♻️ 過去のお題と類似（{score:.2f}）: {question_data['question']} ≒ {entry['text']}")
+                if attempt == self.max_regenerations:
+                    print("⚠️ 生成し直しても類似したため、このお題を使います")
+                    break
+                similar = [question_data["question"], entry["text"]] + similar
 
             # 履歴に保存
-            self._save_history(question_data["question"])
+            self._record(question_data)
 
             return question_data
 
@@ -352,6 +393,88 @@ JSON形式のみを出力してください。
             # フォールバック: デフォルト質問を返す
             return self._get_fallback_question()
 
+    def generate_questions(self, category: str, count: int, avoid: List[str] = None) -> List[Dict]:
+        """
+        1回のリクエストで同じカテゴリの質問を複数生成（お題プールの補充用）
+
+        履歴には保存しない（実際に使うときに保存する）
+
+        Args:
+            category: カテゴリ名
+            count: 生成する数
+            avoid: 履歴に加えて避ける質問文（プールに残っている質問など）
+
+        Returns:
+            validate_content を通った質問データのリスト（失敗時は空）
+        """
+        selected_category = next((c for c in self.categories if c["name"] == category), None)
+        if not selected_category:
+            return []
+
+        history = self._load_history() + list(avoid or [])
+        prompt = self._build_prompt(
+            selected_category["prompt_template"], history, self.similarity.crowded(category)
+        )
+        prompt += (
+            f"\n【まとめて生成】上記の出力形式の質問を{count}個、互いに似ていない内容で生成し、"
+            f"JSON配列（[{{...}}, {{...}}]）として出力してください。\n"
+        )
+
+        try:
+            response = self.model.generate_content(
+                prompt,
+                safety_settings=self.safety_settings
+            )
+            parsed = self._parse_response(response.text)
+        except Exception as e:
+            print(f"エラー: {e}")
+            return []
+
+        questions = []
+        for question_data in parsed if isinstance(parsed, list) else [parsed]:
+            if not isinstance(question_data, dict) or not self.validate_content(question_data):
+                continue
+            self._check_bilingual(question_data)
+            # 過去のお題・同じ回の他の質問・avoid と近似重複するものは除く
+            grams = shingles(question_data["question"])
+            if self.similarity.find_duplicate(question_data) or any(
+                jaccard(grams, shingles(other)) >= self.similarity.threshold
+                for other in [q["question"] for q in questions] + list(avoid or [])
+            ):
+                print(f"♻️ 類似のため除外: {question_data['question']}")
+                continue
+            question_data["category"] = selected_category["name"]
+            questions.append(question_data)
+        return questions
+
+    def _parse_response(self, text: str):
+        """Geminiの応答からJSONを取り出す（コードブロックを除去）"""
+        content = text.strip()
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        return json.loads(content.strip())
+
+    def _check_bilingual(self, question_data: Dict) -> bool:
+        """
+        英訳の項目を検証し、不完全なら取り除く（レンダリング時の翻訳にまかせる）
+
+        Returns:
+            英訳がそろっている場合True
+        """
+        if validate_bilingual(question_data):
+            return True
+        if self.bilingual and "question_en" in question_data:
+            print("⚠️ 英訳の項目が不完全なため破棄します（レンダリング時に翻訳します）")
+        question_data.pop("question_en", None)
+        for choice in question_data.get("choices") or []:
+            if isinstance(choice, dict):
+                choice.pop("title_en", None)
+        return False
+
     def _weighted_random_category(self) -> Dict:
         """重み付きランダムでカテゴリを選択"""
         names = [c["name"] for c in self.categories]
@@ -363,30 +486,35 @@ JSON形式のみを出力してください。
         return {
             "category": "大金獲得チャレンジ",
             "question": "1週間耐えたら1億円！どの部屋を選ぶ？",
+            "question_en": "Survive one week for 100 million yen! Which room do you pick?",
             "context": "※1週間外出禁止です！",
             "reward": "1億円",
             "choices": [
                 {
                     "number": 1,
                     "title": "極寒の部屋",
+                    "title_en": "Freezing Room",
                     "description": "氷点下20度の冷凍室",
                     "video_prompt": "A freezing cold room with ice-covered walls, frost everywhere, dim blue lighting, icy atmosphere, cinematic, ultra-realistic, 4k"
                 },
                 {
                     "number": 2,
                     "title": "灼熱の部屋",
+                    "title_en": "Scorching Room",
                     "description": "気温50度のサウナ室",
                     "video_prompt": "An extremely hot sauna room, steam rising, wooden walls glowing with heat, sweat dripping, orange warm lighting, cinematic, ultra-realistic, 4k"
                 },
                 {
                     "number": 3,
                     "title": "完全暗闇",
+                    "title_en": "Total Darkness",
                     "description": "光が一切ない真っ暗な部屋",
                     "video_prompt": "A pitch black dark room, complete darkness, only faint shadows, eerie atmosphere, mysterious, cinematic, ultra-realistic, 4k"
                 },
                 {
                     "number": 4,
                     "title": "騒音地獄",
+                    "title_en": "Noise Hell",
                     "description": "24時間大音量の音楽が流れる",
                     "video_prompt": "A room with massive speakers, sound waves visible, vibrating walls, intense noise, chaotic energy, cinematic, ultra-realistic, 4k"
                 }
@@ -421,6 +549,25 @@ JSON形式のみを出力してください。
         return True
 
 
+def validate_bilingual(question_data: Dict) -> bool:
+    """
+    英訳の項目（question_en と各選択肢の title_en）がそろっているかチェック
+
+    Args:
+        question_data: 質問データ
+
+    Returns:
+        すべて空でない文字列の場合True
+    """
+    def filled(value) -> bool:
+        return isinstance(value, str) and bool(value.strip())
+
+    choices = question_data.get("choices")
+    if not filled(question_data.get("question_en")) or not isinstance(choices, list) or not choices:
+        return False
+    return all(isinstance(choice, dict) and filled(choice.get("title_en")) for choice in choices)
+
+
 if __name__ == "__main__":
     # テスト実行
     import sys
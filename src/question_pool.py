@@ -0,0 +1,232 @@
+"""
+お題プールモジュール
+Geminiでカテゴリごとにまとめて生成した質問を output/ に貯めておき、投稿時はそこから即座に取り出す
+"""
+
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間のロックを使わない
+    fcntl = None
+
+from question_generator import QuestionGenerator
+
+
+class QuestionPool:
+    """
+    事前に生成した質問のプール
+
+    - カテゴリごとのキューを output/question_pool.json に保存する（プロセスが終わっても残る）
+    - generate_question はキューの先頭を取り出すだけ（Geminiを待たない）
+    - 残りが low_water を下回ったカテゴリは、バックグラウンドで1回のリクエストでまとめて補充する
+    - キューの目標数は category_weights に比例させる（よく選ばれるカテゴリほど多く貯める）
+    - 取り出しはファイルをロックして読み直してから行う（Discord Bot と定期実行で同じ質問を使わない）
+    """
+
+    def __init__(
+        self,
+        generator: Optional[QuestionGenerator] = None,
+        pool_path: Optional[str] = None,
+        size: int = 12,
+        low_water: int = 2,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Args:
+            generator: 質問の生成に使う QuestionGenerator（省略時は作成）
+            pool_path: 保存先（省略時は プロジェクト/output/question_pool.json）
+            size: 全カテゴリ合計の目標数（category_weights で配分）
+            low_water: カテゴリの残りがこれを下回ったら補充する
+            enabled: Falseならプールを使わず毎回生成する（省略時は QUESTION_POOL=0 で無効）
+        """
+        self.generator = generator or QuestionGenerator()
+        if pool_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            pool_path = os.path.join(project_root, "output", "question_pool.json")
+        self.pool_path = pool_path
+        self.low_water = low_water
+        self.enabled = os.getenv("QUESTION_POOL", "1") != "0" if enabled is None else enabled
+
+        weights = {c["name"]: self.generator.category_weights.get(c["name"], 1) for c in self.generator.categories}
+        total = sum(weights.values())
+        self.targets = {
+            name: max(low_water + 1, math.ceil(size * weight / total))
+            for name, weight in weights.items()
+        }
+
+        self._lock = threading.Lock()
+        self._refilling: Dict[str, threading.Thread] = {}
+
+        # 統計
+        self.served = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.generated = 0
+
+    def generate_question(self, category: str = None) -> Dict:
+        """
+        プールから質問を1つ取り出す（QuestionGenerator.generate_question の代わり）
+
+        プールが空ならその場で生成する
+
+        Args:
+            category: カテゴリ名（省略時は重み付きランダム）
+
+        Returns:
+            質問データ
+        """
+        if not self.enabled:
+            return self.generator.generate_question(category)
+        if category not in self.targets:
+            category = self.generator._weighted_random_category()["name"]
+
+        with self._locked() as queues:
+            queue = queues.get(category, [])
+            question_data = None
+            while queue and question_data is None:
+                question_data = queue.pop(0)
+                # 作り置きした後に、別の実行で似たお題が使われていれば捨てる
+                if self.generator.similarity.find_duplicate(question_data):
+                    print(f"♻️ 使用済みのお題と類似のため破棄: {question_data['question']}")
+                    question_data = None
+            remaining = len(queue)
+
+        if remaining < self.low_water:
+            self.refill_async(category)
+
+        if question_data is None:
+            print(f"📦 お題プールが空です（{category}）。その場で生成します")
+            with self._lock:
+                self.misses += 1
+            return self.generator.generate_question(category)
+
+        with self._lock:
+            self.served += 1
+        # 使った時点で履歴と近似重複インデックスに残す（以降の生成で似たお題を避ける）
+        self.generator._record(question_data)
+        print(f"📦 お題プールから取得（{category}、残り{remaining}件）")
+        return question_data
+
+    def refill(self, category: str) -> int:
+        """
+        カテゴリのキューを目標数まで1回のリクエストで補充
+
+        Returns:
+            追加した数
+        """
+        with self._locked() as queues:
+            pooled = [q["question"] for q in queues.get(category, [])]
+        count = self.targets.get(category, 0) - len(pooled)
+        if count <= 0:
+            return 0
+
+        print(f"📦 お題プールを補充中: {category} × {count}")
+        questions = self.generator.generate_questions(category, count, avoid=pooled)
+        with self._lock:
+            self.api_calls += 1
+            self.generated += len(questions)
+        if not questions:
+            return 0
+
+        with self._locked() as queues:
+            queue = queues.setdefault(category, [])
+            known = {q["question"] for q in queue}
+            added = [q for q in questions if q["question"] not in known]
+            queue.extend(added)
+        print(f"📦 お題プールに{len(added)}件追加: {category}")
+        return len(added)
+
+    def refill_async(self, category: str) -> None:
+        """
+        バックグラウンドで補充（同じカテゴリの補充は同時に1つまで）
+
+        プロセス終了時は補充の完了を待つ（生成した質問を捨てない）
+        """
+        with self._lock:
+            thread = self._refilling.get(category)
+            if thread is not None and thread.is_alive():
+                return
+            thread = threading.Thread(target=self._refill_quietly, args=(category,), name=f"question-pool-{category}")
+            self._refilling[category] = thread
+        thread.start()
+
+    def fill(self) -> Dict[str, int]:
+        """全カテゴリを目標数まで補充（まとめて作り置きする場合）"""
+        return {category: self.refill(category) for category in self.targets}
+
+    def wait(self) -> None:
+        """実行中の補充の完了を待つ"""
+        with self._lock:
+            threads = list(self._refilling.values())
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> Dict:
+        """プールの残数とリクエストの統計"""
+        queues = self._load()
+        with self._lock:
+            return {
+                "pooled": {category: len(queues.get(category, [])) for category in self.targets},
+                "targets": dict(self.targets),
+                "served": self.served,
+                "misses": self.misses,
+                "api_calls": self.api_calls,
+                "generated": self.generated,
+            }
+
+    def _refill_quietly(self, category: str) -> None:
+        try:
+            self.refill(category)
+        except Exception as e:
+            print(f"⚠️ お題プールの補充エラー（{category}）: {e}")
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, List[Dict]]]:
+        """ファイルをロックして読み直したキューを渡し、抜けるときに保存する"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.pool_path), exist_ok=True)
+            lock_file = open(f"{self.pool_path}.lock", 'a')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                queues = self._load()
+                yield queues
+                self._save(queues)
+            finally:
+                lock_file.close()
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        if not os.path.exists(self.pool_path):
+            return {}
+        try:
+            with open(self.pool_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ お題プールの読み込みエラー: {e}")
+            return {}
+
+    def _save(self, queues: Dict[str, List[Dict]]) -> None:
+        tmp_path = f"{self.pool_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(queues, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.pool_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='お題プール')
+    parser.add_argument('--fill', action='store_true', help='全カテゴリを目標数まで補充する')
+    args = parser.parse_args()
+
+    pool = QuestionPool()
+    if args.fill:
+        added = pool.fill()
+        print(f"✅ 補充しました: {added}")
+    print(json.dumps(pool.stats(), ensure_ascii=False, indent=2))
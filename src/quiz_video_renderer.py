@@ -8,12 +8,20 @@ import json
 import os
 from typing import Dict, List, Optional
 
+from encoder_profiles import remotion_render_args
+
 
 class QuizVideoRenderer:
     """クイズ形式の動画レンダリングクラス（バイリンガル）"""
     
-    def __init__(self, remotion_dir: str = "remotion"):
+    def __init__(self, remotion_dir: str = "remotion", encoder_profile: Optional[Dict] = None):
+        """
+        Args:
+            remotion_dir: Remotionプロジェクトのディレクトリ
+            encoder_profile: エンコードプロファイル（省略時はRemotionの既定値）
+        """
         self.remotion_dir = remotion_dir
+        self.encoder_profile = encoder_profile
     
     def render_quiz_video(
         self,
@@ -63,6 +71,8 @@ class QuizVideoRenderer:
             "--props",
             json.dumps({"data": quiz_data}),
         ]
+        if self.encoder_profile:
+            cmd += remotion_render_args(self.encoder_profile)
         
         try:
             print("⏳ レンダリング中...")
@@ -0,0 +1,178 @@
+"""
+セクションパイプラインモジュール
+AI動画の生成を待つ間にオープニング・エンディングをエンコードし、選択肢の動画は届いた順に正規化・エンコードする
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from ffmpeg_renderer import choice_job, ending_job, opening_job
+from video_creator import QuestionVideoCreator, _encode_segment_worker
+
+
+class SectionPipeline:
+    """
+    生成と並行して進めるセクション単位のレンダリング
+
+    全選択肢の生成を待ってから全体をレンダリングするのではなく、
+    固定セクションは開始直後に、選択肢のセクションは動画が届いた時点でエンコードする。
+    最後に残るのはストリームコピーでの結合だけになる。
+
+    使い方:
+        pipeline = SectionPipeline(creator, question_data)
+        try:
+            generator.generate_multiple_videos(prompts, output_dir, on_video_ready=pipeline.submit_choice)
+            pipeline.finish(output_path)
+        finally:
+            pipeline.close()
+    """
+
+    def __init__(self, creator: QuestionVideoCreator, question_data: Dict, workers: Optional[int] = None):
+        """
+        Args:
+            creator: 設定・キャッシュを共有する QuestionVideoCreator
+            question_data: 質問データ
+            workers: 同時にエンコードするセクション数（省略時は creator の section_workers とセクション数の小さい方）
+        """
+        self.creator = creator
+        self.question_data = question_data
+        self.choices = {choice['number']: choice for choice in question_data.get('choices', [])}
+        self.workers = workers or max(1, min(creator.section_workers, len(self.choices) + 2))
+        # ワーカー間でCPUを分け合う
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        self.work_dir = tempfile.mkdtemp(prefix="pipeline_")
+        self._processes = ProcessPoolExecutor(max_workers=self.workers)
+        # 正規化・キャッシュ確認・エンコード待ちを行うスレッド（セクションごとに1つ）
+        self._threads = ThreadPoolExecutor(max_workers=len(self.choices) + 2)
+        self._lock = threading.Lock()
+        self._sections: Dict[str, Future] = {}
+        self._start = time.perf_counter()
+
+        print(f"🚰 パイプライン開始: {self.workers}プロセスでセクションを順次エンコード")
+        self._submit("opening", self._encode, opening_job(question_data))
+        self._submit("ending", self._encode, ending_job())
+
+    def submit_choice(self, number: int, video_path: Optional[str]) -> None:
+        """
+        選択肢の動画が届いたらそのセクションを始める（generate_multiple_videos の on_video_ready 用）
+
+        Args:
+            number: 選択肢番号
+            video_path: 動画のパス（生成に失敗した場合はNone → フォールバック）
+        """
+        choice = self.choices.get(number)
+        if choice is None:
+            return
+        self._submit(f"choice_{number}", self._encode_choice, choice, video_path)
+
+    def finish(self, output_path: str, bgm_path: Optional[str] = None) -> str:
+        """
+        残りのセクションを待って結合
+
+        動画が届かなかった選択肢はフォールバックにする
+
+        Args:
+            output_path: 出力ファイルパス
+            bgm_path: BGMファイルパス（オプション）
+
+        Returns:
+            生成された動画ファイルのパス
+        """
+        for number in self.choices:
+            if f"choice_{number}" not in self._sections:
+                self.submit_choice(number, None)
+
+        wait_start = time.perf_counter()
+        names = ["opening"] + [f"choice_{number}" for number in self.choices] + ["ending"]
+        timings = {name: self._sections[name].result() for name in names}
+        waited = time.perf_counter() - wait_start
+
+        print("🔗 セグメントを結合中...")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        concat_start = time.perf_counter()
+        stream_copy = self.creator._concat_segments(
+            [timings[name]['path'] for name in names], output_path, bgm_path
+        )
+        concat_seconds = time.perf_counter() - concat_start
+
+        self.creator.last_render_report = {
+            'output_path': output_path,
+            'engine': self.creator.engine,
+            'mode': 'pipelined',
+            'stream_copy': stream_copy,
+            'sections': {
+                name: {key: value for key, value in timing.items() if key != 'path'}
+                for name, timing in timings.items()
+            },
+            'wait_seconds': waited,
+            'concat_seconds': concat_seconds,
+            'total_seconds': time.perf_counter() - self._start
+        }
+
+        print(f"🔗 結合方式: {'ストリームコピー' if stream_copy else '再エンコード'}")
+        for name, timing in timings.items():
+            label = 'キャッシュ' if timing['cached'] else f"{timing['seconds']:.1f}秒"
+            print(f"   ⏱️ {name}: {label}（開始から{timing['ready_at']:.1f}秒で完了）")
+        print(f"   ⏱️ 生成完了後の待ち: {waited:.1f}秒 / 結合: {concat_seconds:.1f}秒")
+        self.creator._report_overlay_cache()
+        print(f"✅ 動画を生成しました: {output_path}")
+        return output_path
+
+    def close(self) -> None:
+        """ワーカーを止めて作業ディレクトリを削除"""
+        for future in self._sections.values():
+            future.cancel()
+        self._threads.shutdown(wait=True, cancel_futures=True)
+        self._processes.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def __enter__(self) -> "SectionPipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _submit(self, name: str, fn, *args) -> None:
+        """セクションの処理を1回だけ始める"""
+        with self._lock:
+            if name in self._sections:
+                return
+            self._sections[name] = self._threads.submit(fn, *args)
+
+    def _encode_choice(self, choice: Dict, video_path: Optional[str]) -> Dict:
+        """選択肢の動画を正規化してからエンコード"""
+        normalizer = self.creator.normalizer
+        if video_path and os.path.exists(video_path) and normalizer.enabled:
+            try:
+                video_path = normalizer.normalize(video_path, self.creator.durations['choice'])
+            except Exception as e:
+                print(f"⚠️ 選択肢{choice['number']}の正規化に失敗（元動画を使用）: {e}")
+        return self._encode(choice_job(choice, video_path))
+
+    def _encode(self, job: Dict) -> Dict:
+        """
+        1セクションをキャッシュから取得、またはワーカープロセスでエンコード
+
+        Returns:
+            {"path": ..., "seconds": ..., "cached": ..., "ready_at": 開始からの秒数}
+        """
+        cached, cache_key = self.creator._cached_segment(job)
+        if cached:
+            return {'path': cached, 'seconds': 0.0, 'cached': True, 'ready_at': time.perf_counter() - self._start}
+
+        path = os.path.join(self.work_dir, f"{job['name']}.mp4")
+        print(f"📹 セグメントをエンコード中: {job['name']}")
+        seconds = self._processes.submit(
+            _encode_segment_worker, self.creator.config, self.creator.engine, job, path, self.threads
+        ).result()
+        if cache_key:
+            path = self.creator.segment_cache.store(cache_key, path)
+        ready_at = time.perf_counter() - self._start
+        print(f"✅ セグメント完了: {job['name']}（{seconds:.1f}秒）")
+        return {'path': path, 'seconds': seconds, 'cached': False, 'ready_at': ready_at}
@@ -0,0 +1,113 @@
+"""
+セグメントキャッシュモジュール
+エンコード済みのセクション（エンディングなどの固定パート）を内容アドレス方式で保存・再利用する
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+# キャッシュするセクションの種類（質問ごとに内容が変わるオープニング・選択肢は毎回エンコードする）
+CACHEABLE_SECTION_KINDS = ("ending",)
+
+
+class SegmentCache:
+    """
+    エンコード済みセグメントのキャッシュ
+
+    合計サイズが上限を超えたら最後に使われた時刻（ファイルの更新時刻）が古いものから削除する。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 ** 2):
+        """
+        Args:
+            cache_dir: セグメントを保存するディレクトリ
+            max_bytes: キャッシュの合計サイズの上限
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, params: Dict) -> str:
+        """
+        セグメントの内容とエンコード設定からキーを生成
+
+        Args:
+            params: セグメントを一意に決めるパラメータ（テキスト・解像度・エンコード設定など）
+        """
+        payload = json.dumps(params, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        """キーに対応するセグメントファイルのパス"""
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュ済みセグメントを取得
+
+        Returns:
+            セグメントのパス（未キャッシュの場合はNone）
+        """
+        path = self.path_for(key)
+        with self._lock:
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                # 最後に使われた時刻として更新時刻を進める（LRU）
+                os.utime(path)
+                self.hits += 1
+                return path
+            self.misses += 1
+            return None
+
+    def store(self, key: str, rendered_path: str) -> str:
+        """
+        レンダリング済みセグメントをキャッシュに登録
+
+        Args:
+            key: キャッシュキー
+            rendered_path: レンダリング済みファイル
+
+        Returns:
+            キャッシュ内のパス
+        """
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.copyfile(rendered_path, tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        """合計サイズが上限を超えていれば古いものから削除（登録したばかりの keep は残す）"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp4"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
@@ -0,0 +1,175 @@
+"""
+類似お題インデックスのベンチマークモジュール
+テンプレート型の質問（「もしも…なら、どれを選ぶ？」など）を大量に登録し、検索・crowded() の時間と候補数を測る
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterator
+
+from generation_benchmark import percentile
+from similarity_index import SimilarityIndex
+
+# 実際の生成結果と同じく、言い回しの大部分がテンプレートで共通する質問
+_TEMPLATES = [
+    "{period}{place}で{verb}たら{money}！どの{thing}を選ぶ？",
+    "もしも{situation}なら、{place}に{thing}と{power}どれを選ぶ？",
+    "{money}もらえるなら、{place}で{rule}？それとも{power}を選ぶ？",
+    "一生{rule}なら{money}！{place}でどれを選ぶ？",
+    "もしも{power}が手に入ったら、{period}{place}で何をする？",
+    "{situation}とき、{place}から{thing}を1つだけ持ち出すならどれ？",
+]
+_WORDS = {
+    "verb": ["耐え", "過ごし", "住ん", "我慢し", "働い", "生活し", "暮らし", "泊まっ", "隠れ", "眠っ"],
+    "place": [
+        "部屋", "家", "無人島", "会社", "学校", "外国", "宇宙船", "職場", "ホテル", "地下室", "屋上", "森",
+        "砂漠", "雪山", "豪華客船", "お化け屋敷", "刑務所", "遊園地", "コンビニ", "図書館", "病院", "洞窟",
+    ],
+    "situation": [
+        "無人島に1つだけ持っていける", "人生をやり直せる", "1日だけ別人になれる", "宝くじが当たった",
+        "過去に戻れる", "ゾンビが現れた", "宇宙に住める", "魔法が使える", "恐竜時代に行ける",
+        "お金が無限にある", "明日世界が終わる", "好きな能力を1つもらえる", "動物になれる", "有名人と入れ替われる",
+        "目覚めたら100年後だった", "猫の言葉がわかる", "夢の中に住める", "透明な家に住む", "声が出なくなった",
+    ],
+    "power": [
+        "透明人間になる能力", "空を飛べる能力", "時間を止める能力", "心が読める能力", "瞬間移動",
+        "不老不死", "未来が見える力", "動物と話せる力", "記憶を消せる力", "世界一の頭脳", "超人的な力",
+        "天気を操る力", "分身の術", "どんな言語も話せる力", "壁をすり抜ける力", "若返りの薬",
+    ],
+    "rule": [
+        "同じ服を着る", "同じ曲を聴く", "寝ない", "スマホ禁止", "甘い物禁止", "外出禁止", "話せない", "笑えない",
+        "裸足で歩く", "敬語で話す", "毎朝4時に起きる", "階段しか使えない", "テレビ禁止", "お風呂禁止",
+    ],
+    "thing": [
+        "ナイフ", "毛布", "ラジオ", "漫画", "ギター", "懐中電灯", "枕", "カメラ", "釣り竿", "ゲーム機",
+        "寝袋", "鍋", "自転車", "望遠鏡", "ぬいぐるみ", "地図", "ライター", "日記帳", "傘", "双眼鏡",
+    ],
+}
+# 選択肢タイトルの部品（「{条件}{前半}{後半}」を4つ組み合わせる）
+_CHOICE_CONDITIONS = [
+    "", "毎日", "24時間", "夜だけ", "週末だけ", "真っ暗で", "一生", "雨の日は", "朝から", "無言の",
+    "全裸の", "巨大な", "100人の", "透明な", "怒った",
+]
+_CHOICE_HEADS = [
+    "おっさん", "美女", "力士", "サル", "アイドル", "ゴキブリ", "幽霊", "赤ちゃん", "ワニ", "忍者", "ロボット",
+    "芸人", "宇宙人", "ピエロ", "先生", "ヤンキー", "お坊さん", "執事", "シェフ", "プロレスラー", "魔女",
+]
+_CHOICE_TAILS = [
+    "だらけ", "と同居", "が毎晩歌う", "に監視される", "と毎食一緒", "が隣に寝る", "と会話禁止",
+    "が料理担当", "に追いかけられる", "と筋トレ", "が大家", "と相部屋",
+]
+
+
+def synthetic_questions(seed: int = 0) -> Iterator[Dict]:
+    """テンプレート型の質問データを限りなく作る"""
+    rng = random.Random(seed)
+    while True:
+        question = rng.choice(_TEMPLATES).format(
+            period=f"{rng.randint(1, 30)}{rng.choice(['日間', '週間', 'ヶ月', '年間'])}",
+            money=f"{rng.randint(1, 99)}{rng.choice(['万円', '億円'])}",
+            **{key: rng.choice(words) for key, words in _WORDS.items()}
+        )
+        yield {
+            "question": question,
+            "category": rng.choice(["究極の選択", "もしも", "耐久"]),
+            "choices": [
+                {"title": rng.choice(_CHOICE_CONDITIONS) + rng.choice(_CHOICE_HEADS) + rng.choice(_CHOICE_TAILS)} for _ in range(4)
+            ],
+        }
+
+
+def run_benchmark(entries: int = 10000, queries: int = 500, seed: int = 0) -> Dict:
+    """
+    質問を entries 個登録したインデックスで検索と crowded() を計測
+
+    インデックスは一時ディレクトリに作り、本番の output/question_index.jsonl には書き込まない
+
+    Args:
+        entries: 登録する質問の数（質問文と選択肢の2項目ずつ登録される。近似重複する質問は除外して作り直す）
+        queries: 計測する検索の回数
+        seed: 質問を作る乱数のシード
+
+    Returns:
+        計測結果の辞書
+    """
+    questions = synthetic_questions(seed)
+    work_dir = tempfile.mkdtemp(prefix="similarity_benchmark_")
+    try:
+        index_path = os.path.join(work_dir, "question_index.jsonl")
+        index = SimilarityIndex(index_path=index_path)
+
+        # 本番と同じく、過去のお題と近似重複する質問は登録しない（生成し直す）
+        added = rejected = 0
+        start = time.perf_counter()
+        while added < entries:
+            question_data = next(questions)
+            if index.find_duplicate(question_data) is not None:
+                rejected += 1
+                continue
+            index.add_question(question_data)
+            added += 1
+        add_seconds = time.perf_counter() - start
+
+        # 別のプロセスが起動したときの読み込み（署名はファイルから読む）
+        start = time.perf_counter()
+        index = SimilarityIndex(index_path=index_path)
+        load_seconds = time.perf_counter() - start
+
+        before = index.stats()
+        query_times = []
+        for _ in range(queries):
+            question_data = next(questions)
+            start = time.perf_counter()
+            index.find_duplicate(question_data)
+            query_times.append(time.perf_counter() - start)
+        after = index.stats()
+        lookups = 2 * queries
+
+        crowded_times = []
+        for _ in range(20):
+            start = time.perf_counter()
+            index.crowded("究極の選択")
+            crowded_times.append(time.perf_counter() - start)
+
+        return {
+            "entries": after["entries"],
+            "add_ms": add_seconds / entries * 1000,
+            "rejected": rejected,
+            "load_seconds": load_seconds,
+            "query_p50_ms": percentile(query_times, 0.5) * 1000,
+            "query_p95_ms": percentile(query_times, 0.95) * 1000,
+            "crowded_p50_ms": percentile(crowded_times, 0.5) * 1000,
+            "candidate_ratio": (after["candidates"] - before["candidates"]) / lookups / after["entries"],
+            "comparisons_per_query": (after["comparisons"] - before["comparisons"]) / lookups,
+            "recall_at_threshold": after["recall_at_threshold"],
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(result: Dict) -> None:
+    """計測結果を表示"""
+    print("\n📊 類似お題インデックスのベンチマーク結果")
+    print(f"登録項目数:            {result['entries']}")
+    print(f"登録（1質問あたり）:   {result['add_ms']:.2f}ms（重複で除外 {result['rejected']}件）")
+    print(f"起動時の読み込み:      {result['load_seconds']:.2f}s")
+    print(f"重複チェック p50/p95:  {result['query_p50_ms']:.3f}ms / {result['query_p95_ms']:.3f}ms")
+    print(f"crowded() p50:         {result['crowded_p50_ms']:.3f}ms")
+    print(f"候補の割合:            {result['candidate_ratio'] * 100:.2f}%")
+    print(f"正確な比較/検索:       {result['comparisons_per_query']:.1f}件")
+    print(f"閾値での候補の再現率:  {result['recall_at_threshold']:.3f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='類似お題インデックスのベンチマーク')
+    parser.add_argument('--entries', type=int, default=10000, help='登録する質問の数')
+    parser.add_argument('--queries', type=int, default=500, help='計測する検索の回数')
+    parser.add_argument('--seed', type=int, default=0, help='質問を作る乱数のシード')
+    args = parser.parse_args()
+
+    print_report(run_benchmark(entries=args.entries, queries=args.queries, seed=args.seed))
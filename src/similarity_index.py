@@ -0,0 +1,393 @@
+"""
+類似お題インデックスモジュール
+文字 n-gram の MinHash / LSH で過去の質問・選択肢との重複（言い回し違い・数字違い）を検出
+"""
+
+import json
+import math
+import os
+import threading
+import unicodedata
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間のロックを使わない（完全に同じ項目の重複は読み込み時に除く）
+    fcntl = None
+
+# MinHash の置換に使う素数（2^31 - 1。uint64 で a * h + b があふれない大きさ）
+_PRIME = (1 << 31) - 1
+# 候補がこれより多いときだけ署名の一致率で絞り込む（少なければ正確な Jaccard 係数を直接計算した方が速い）
+_ESTIMATE_MIN_CANDIDATES = 32
+
+
+def normalize_text(text: str) -> str:
+    """比較用に正規化（全角半角・大文字小文字をそろえ、空白・記号を除く）"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return "".join(
+        ch for ch in text
+        if not unicodedata.category(ch).startswith(("P", "Z", "S", "C"))
+    )
+
+
+def shingles(text: str, n: int = 3) -> Set[str]:
+    """文字 n-gram の集合（日本語は単語の区切りがないため文字単位）"""
+    text = normalize_text(text)
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Jaccard 係数"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityIndex:
+    """
+    過去のお題の近似重複インデックス
+
+    - 質問文と選択肢タイトル（4つを連結したもの）を別々の項目として登録する
+    - MinHash の署名を bands 個の帯に分けてハッシュし、同じ帯を持つ項目だけを候補にする（LSH）
+    - 候補は署名の一致率（Jaccard 係数の推定値）で絞り込んでから、元の文字列から正確な Jaccard 係数を計算して判定する
+    - 似ている項目の数（近傍数）は登録のたびに増やして持つ（crowded() で全項目を比較し直さない）
+    - 登録した項目は output/question_index.jsonl に追記して保存する（署名も保存し、起動時に再計算しない）
+    - 検索・登録のたびにファイルの増えた分だけを読み込む（同時に動く他のプロセスの登録も反映する）
+    - 同じ種類で文字列が完全に同じ項目は1つとして扱う（近傍数を水増ししない）
+    """
+
+    def __init__(
+        self,
+        index_path: Optional[str] = None,
+        num_perm: int = 192,
+        bands: int = 48,
+        ngram: int = 3,
+        threshold: float = 0.5
+    ):
+        """
+        Args:
+            index_path: 保存先（省略時は プロジェクト/output/question_index.jsonl）
+            num_perm: MinHash の置換の数
+            bands: LSH の帯の数（num_perm を割り切れる数。多いほど低い類似度まで候補に拾う。
+                   既定の 48帯×4行 は threshold の 0.5 の組を 95% 以上候補に入れつつ、
+                   テンプレートの言い回しだけが同じ類似度 0.1〜0.3 の組はほとんど候補に入れない）
+            ngram: 文字 n-gram の長さ
+            threshold: これ以上の Jaccard 係数を重複とみなす
+        """
+        if index_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            index_path = os.path.join(project_root, "output", "question_index.jsonl")
+        if num_perm % bands:
+            raise ValueError("num_perm は bands で割り切れる必要があります")
+        self.index_path = index_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.threshold = threshold
+
+        # threshold ちょうどの近似重複を取りこぼす帯の設定は使わない（候補の判定は正確な Jaccard 係数でするので、
+        # 候補が多めになっても誤検出は増えない）
+        recall = self.candidate_probability(threshold)
+        if recall < 0.95:
+            raise ValueError(
+                f"bands={bands}, rows={self.rows} では類似度 {threshold} の組が候補に入る確率が"
+                f" {recall:.2f} しかありません（bands を増やすか rows を減らしてください）"
+            )
+
+        # 署名の一致率がこれ未満の候補は正確な Jaccard 係数を計算しない
+        # （threshold ちょうどの組の推定値の標準偏差の4倍下まで残す）
+        self.estimate_floor = threshold - 4 * math.sqrt(threshold * (1 - threshold) / num_perm)
+
+        rng = np.random.RandomState(20240601)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: List[Dict] = []
+        # 帯ごとの {帯の値: 項目番号 または [項目番号, ...]}（ほとんどの帯の値は1項目だけなので、リストは2項目目から作る）
+        self._buckets: List[Dict[bytes, Union[int, List[int]]]] = [{} for _ in range(bands)]
+        # 全項目の署名（行が項目番号。容量を倍々に増やす）
+        self._sigs = np.empty((0, num_perm), dtype=np.uint32)
+        # 近傍が1つ以上ある項目の {項目番号: 近傍数}
+        self._neighbour_counts: Dict[int, int] = {}
+        # 登録済みの (種類, 文字列)
+        self._texts: Set[Tuple[str, str]] = set()
+        # 統計（LSH の候補数と、正確な Jaccard 係数を計算した数）
+        self.candidates = 0
+        self.comparisons = 0
+        # ファイルのどこまで読み込んだか
+        self._offset = 0
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._entries)
+
+    def candidate_probability(self, similarity: float) -> float:
+        """Jaccard 係数が similarity の組が LSH の候補に入る確率（1 - (1 - s^rows)^bands）"""
+        return 1.0 - (1.0 - similarity ** self.rows) ** self.bands
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash の署名"""
+        grams = shingles(text, self.ngram)
+        if not grams:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint32)
+        hashes = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64)
+        return ((hashes[:, None] * self._a + self._b) % _PRIME).min(axis=0).astype(np.uint32)
+
+    def add(self, text: str, kind: str = "question", category: Optional[str] = None) -> None:
+        """
+        項目を登録（ファイルに1行追記してから読み込む）
+
+        Args:
+            text: 質問文または選択肢タイトルを連結した文字列
+            kind: "question" / "choices"
+            category: カテゴリ名
+        """
+        if not normalize_text(text):
+            return
+        with self._locked():
+            self._append([self._record(text, kind, category)])
+            self._refresh()
+
+    def seed(self, items: Iterable[Tuple[str, str, Optional[str]]]) -> bool:
+        """
+        インデックスが空のときだけ項目をまとめて登録（既存の履歴の取り込み用）
+
+        ファイルをロックして空であることを確かめてから書くので、同時に起動した複数のプロセスが
+        同じ履歴を二重に登録しない
+
+        Args:
+            items: (文字列, 種類, カテゴリ名) の並び
+
+        Returns:
+            登録した場合True（すでに項目があれば何もしないでFalse）
+        """
+        with self._locked():
+            self._refresh()
+            if self._entries:
+                return False
+            self._append([
+                self._record(text, kind, category) for text, kind, category in items if normalize_text(text)
+            ])
+            self._refresh()
+            return True
+
+    def add_question(self, question_data: Dict) -> None:
+        """質問データ（質問文と選択肢タイトル）を登録"""
+        category = question_data.get("category")
+        self.add(question_data.get("question", ""), "question", category)
+        titles = choice_titles(question_data)
+        if titles:
+            self.add(titles, "choices", category)
+
+    def query(self, text: str, kind: Optional[str] = None, limit: int = 5) -> List[Tuple[float, Dict]]:
+        """
+        似ている項目を探す
+
+        Args:
+            text: 探す文字列
+            kind: 種類で絞り込む（省略時はすべて）
+            limit: 返す最大数
+
+        Returns:
+            [(Jaccard 係数, 項目)] の類似度の高い順（threshold 未満は含めない）
+        """
+        sig = self.signature(text)
+        grams = shingles(text, self.ngram)
+        with self._lock:
+            self._refresh()
+            neighbours = self._neighbours(sig, grams, kind)
+            matches = [(score, self._entries[i]) for score, i in neighbours]
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
+
+    def find_duplicate(self, question_data: Dict) -> Optional[Tuple[float, Dict]]:
+        """
+        過去の質問と近似重複していれば、最も似ている項目を返す
+
+        質問文どうし、または選択肢タイトルの組どうしが似ていれば重複とみなす
+        """
+        matches = self.query(question_data.get("question", ""), kind="question", limit=1)
+        titles = choice_titles(question_data)
+        if titles:
+            matches += self.query(titles, kind="choices", limit=1)
+        return max(matches, key=lambda match: match[0]) if matches else None
+
+    def crowded(self, category: Optional[str] = None, limit: int = 5) -> List[str]:
+        """
+        似たお題が多く出ている質問（近傍の多い順）
+
+        生成時に「これらと似た内容は避ける」に入れ、モデルが繰り返しがちなテーマを先に避けさせる
+        """
+        with self._lock:
+            self._refresh()
+            scores = [
+                (count, i) for i, count in self._neighbour_counts.items()
+                if self._entries[i]["kind"] == "question"
+                and (not category or self._entries[i]["category"] == category)
+            ]
+            scores.sort(reverse=True)
+            return [self._entries[i]["text"] for count, i in scores[:limit]]
+
+    def stats(self) -> Dict:
+        """登録数・帯ごとの最大の候補数・これまでの候補数と比較数"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "candidates": self.candidates,
+                "comparisons": self.comparisons,
+                "recall_at_threshold": self.candidate_probability(self.threshold),
+                "largest_bucket": max(
+                    (1 if isinstance(ids, int) else len(ids) for buckets in self._buckets for ids in buckets.values()),
+                    default=0
+                ),
+            }
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """ファイルをロックする（他のプロセスの登録と重ならないように）"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(f"{self.index_path}.lock", 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _record(self, text: str, kind: str, category: Optional[str]) -> str:
+        """ファイルに書く1行"""
+        return json.dumps(
+            {"kind": kind, "category": category, "text": text, "sig": self.signature(text).tobytes().hex()},
+            ensure_ascii=False
+        ) + "\n"
+
+    def _append(self, lines: List[str]) -> None:
+        """行を1回の追記で書く（ロックを持って呼ぶ）"""
+        if not lines:
+            return
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write("".join(lines))
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        raw = sig.tobytes()
+        step = len(raw) // self.bands
+        return [raw[offset:offset + step] for offset in range(0, len(raw), step)]
+
+    def _neighbours(
+        self,
+        sig: np.ndarray,
+        grams: Set[str],
+        kind: Optional[str] = None,
+        keys: Optional[List[bytes]] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        登録済みの項目のうち threshold 以上似ているもの（ロックを持って呼ぶ）
+
+        Returns:
+            [(Jaccard 係数, 項目番号)]
+        """
+        candidates = set()
+        for band, key in enumerate(keys or self._band_keys(sig)):
+            ids = self._buckets[band].get(key)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                candidates.add(ids)
+            else:
+                candidates.update(ids)
+        if not candidates:
+            return []
+        self.candidates += len(candidates)
+        if len(candidates) > _ESTIMATE_MIN_CANDIDATES:
+            # 署名の一致率で明らかに似ていない候補を先に外す
+            ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            estimates = (self._sigs[ids] == sig).mean(axis=1)
+            candidates = ids[estimates >= self.estimate_floor].tolist()
+        matches = []
+        for i in candidates:
+            entry = self._entries[i]
+            if kind and entry["kind"] != kind:
+                continue
+            self.comparisons += 1
+            score = jaccard(grams, entry["grams"])
+            if score >= self.threshold:
+                matches.append((score, i))
+        return matches
+
+    def _insert(self, entry: Dict) -> None:
+        """
+        項目を追加し、同じ種類の似ている項目と互いの近傍数を増やす（ロックを持って呼ぶ）
+
+        同じ種類で文字列が同じ項目がすでにあれば追加しない
+        """
+        text_key = (entry["kind"], entry["text"])
+        if text_key in self._texts:
+            return
+        self._texts.add(text_key)
+        index = len(self._entries)
+        keys = self._band_keys(entry["sig"])
+        neighbours = self._neighbours(entry["sig"], entry["grams"], entry["kind"], keys)
+        for _, i in neighbours:
+            self._neighbour_counts[i] = self._neighbour_counts.get(i, 0) + 1
+        if neighbours:
+            self._neighbour_counts[index] = len(neighbours)
+
+        self._entries.append(entry)
+        if index >= len(self._sigs):
+            grown = np.empty((max(1024, 2 * len(self._sigs)), self.num_perm), dtype=np.uint32)
+            grown[:index] = self._sigs[:index]
+            self._sigs = grown
+        self._sigs[index] = entry["sig"]
+        for band, key in enumerate(keys):
+            buckets = self._buckets[band]
+            ids = buckets.get(key)
+            if ids is None:
+                buckets[key] = index
+            elif isinstance(ids, int):
+                buckets[key] = [ids, index]
+            else:
+                ids.append(index)
+
+    def _refresh(self) -> None:
+        """ファイルの前回読み込んだ位置より後ろを読み込む（ロックを持って呼ぶ）"""
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) <= self._offset:
+            return
+        with open(self.index_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # 書き込み途中の最後の行は次回に読む
+        complete = data[:data.rfind(b"\n") + 1]
+        self._offset += len(complete)
+        for line in complete.decode("utf-8").splitlines():
+            try:
+                record = json.loads(line)
+                sig = np.frombuffer(bytes.fromhex(record["sig"]), dtype=np.uint32)
+            except (ValueError, KeyError):
+                # 壊れた行は読み飛ばす
+                continue
+            if len(sig) != self.num_perm:
+                # 設定が変わっていれば署名を計算し直す
+                sig = self.signature(record["text"])
+            record["sig"] = sig
+            # 候補の判定に使う n-gram はメモリにだけ持つ
+            record["grams"] = shingles(record["text"], self.ngram)
+            self._insert(record)
+
+
+def choice_titles(question_data: Dict) -> str:
+    """選択肢タイトルを連結した文字列（並び順が違うだけの組も同じになるよう整列）"""
+    titles = sorted(c.get("title", "") for c in question_data.get("choices", []))
+    return "／".join(titles)
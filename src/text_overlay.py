@@ -0,0 +1,230 @@
+"""
+テキストオーバーレイ描画モジュール
+Pillowでキャプションを RGBA 画像としてラスタライズし、内容アドレス方式でキャッシュする
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from font_registry import get_font_registry
+
+
+Color = Union[str, Sequence[int]]
+
+
+def to_rgba(color: Optional[Color]) -> Tuple[int, int, int, int]:
+    """色指定（#RRGGBB / 色名 / RGB(A)タプル）を RGBA タプルに変換"""
+    if color is None:
+        return (0, 0, 0, 0)
+    if isinstance(color, str):
+        return ImageColor.getcolor(color, "RGBA")
+    values = [int(v) for v in color]
+    if len(values) == 3:
+        values.append(255)
+    return tuple(values[:4])
+
+
+def _wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int) -> List[str]:
+    """
+    指定幅に収まるように折り返す
+
+    日本語は単語区切りがないため1文字単位で折り返す
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        current = ""
+        for char in paragraph:
+            candidate = current + char
+            if current and font.getlength(candidate) > max_width:
+                lines.append(current)
+                current = char
+            else:
+                current = candidate
+        lines.append(current)
+    return lines
+
+
+def render_text_overlay(
+    text: str,
+    font_path: str,
+    font_size: int,
+    color: Color,
+    box_width: Optional[int] = None,
+    bg_color: Optional[Color] = None,
+    text_align: str = "center",
+    interline: int = 4
+) -> Image.Image:
+    """
+    テキストを RGBA 画像として描画
+
+    MoviePy の TextClip と同じレイアウトになるようにする
+    （box_width 指定時は method='caption' 相当、未指定時は method='label' 相当）
+
+    Args:
+        text: 描画するテキスト
+        font_path: フォントファイルのパス
+        font_size: フォントサイズ
+        color: 文字色
+        box_width: 折り返し幅（Noneの場合は折り返さない）
+        bg_color: 背景色（Noneの場合は透明）
+        text_align: 行揃え（left / center / right）
+        interline: 行間（px）
+
+    Returns:
+        RGBA画像
+    """
+    font = get_font_registry().get_font(font_path, font_size)
+
+    if box_width:
+        lines = _wrap_text(text, font, box_width)
+    else:
+        lines = text.split("\n")
+
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    line_widths = [font.getlength(line) for line in lines]
+
+    width = box_width or max(1, math.ceil(max(line_widths)))
+    height = max(1, line_height * len(lines) + interline * (len(lines) - 1))
+
+    image = Image.new("RGBA", (width, height), to_rgba(bg_color))
+    draw = ImageDraw.Draw(image)
+    fill = to_rgba(color)
+
+    y = 0
+    for line, line_width in zip(lines, line_widths):
+        if text_align == "left":
+            x = 0
+        elif text_align == "right":
+            x = width - line_width
+        else:
+            x = (width - line_width) / 2
+        draw.text((x, y), line, font=font, fill=fill)
+        y += line_height + interline
+
+    return image
+
+
+class OverlayCache:
+    """
+    テキストオーバーレイのキャッシュ
+
+    テキスト・フォント・サイズ・色・折り返し幅をキーに、描画済みの RGBA PNG を
+    ディスクに保存し、プロセス内では LRU で画像を保持する。
+    同じテキスト（エンディング文言や番号バッジなど）は実行やバッチをまたいで
+    一度しかラスタライズされない。
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 128):
+        """
+        Args:
+            cache_dir: PNGを保存するディレクトリ
+            max_entries: プロセス内LRUに保持する最大件数
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[str, Image.Image]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # 統計
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_image(self, text: str, font_path: str, font_size: int, color: Color, **kwargs) -> Image.Image:
+        """描画済みの RGBA 画像を取得（引数は render_text_overlay と同じ）"""
+        return self._lookup(text, font_path, font_size, color, **kwargs)[1]
+
+    def get_path(self, text: str, font_path: str, font_size: int, color: Color, **kwargs) -> str:
+        """描画済みの PNG ファイルパスを取得（引数は render_text_overlay と同じ）"""
+        return self._lookup(text, font_path, font_size, color, **kwargs)[0]
+
+    def stats(self) -> Dict:
+        """ヒット／ミスの統計を返す"""
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0.0
+        }
+
+    def _key(
+        self,
+        text: str,
+        font_path: str,
+        font_size: int,
+        color: Color,
+        box_width: Optional[int] = None,
+        bg_color: Optional[Color] = None,
+        text_align: str = "center",
+        interline: int = 4
+    ) -> str:
+        """描画パラメータからキャッシュキーを生成"""
+        params = [
+            text, os.path.abspath(font_path), font_size, to_rgba(color),
+            box_width, to_rgba(bg_color), text_align, interline
+        ]
+        return hashlib.sha256(json.dumps(params, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _lookup(self, text: str, font_path: str, font_size: int, color: Color, **kwargs) -> Tuple[str, Image.Image]:
+        key = self._key(text, font_path, font_size, color, **kwargs)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        path = os.path.join(self.cache_dir, key[:2], f"{key}.png")
+        if os.path.exists(path):
+            image = Image.open(path)
+            image.load()
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            image = render_text_overlay(text, font_path, font_size, color, **kwargs)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 書き込み途中のファイルを読まれないように一時ファイル経由で保存
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.misses += 1
+
+        with self._lock:
+            self._memory[key] = (path, image)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+        return path, image
+
+
+_overlay_caches: Dict[str, OverlayCache] = {}
+
+
+def get_overlay_cache(cache_dir: Optional[str] = None) -> OverlayCache:
+    """
+    プロセス内で共有するオーバーレイキャッシュを取得
+
+    Args:
+        cache_dir: キャッシュディレクトリ（省略時は プロジェクト/cache/overlays）
+    """
+    if cache_dir is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        cache_dir = os.path.join(project_root, "cache", "overlays")
+    cache_dir = os.path.abspath(cache_dir)
+
+    if cache_dir not in _overlay_caches:
+        _overlay_caches[cache_dir] = OverlayCache(cache_dir)
+    return _overlay_caches[cache_dir]
@@ -0,0 +1,244 @@
+"""
+英訳モジュール
+レンダリング用に質問文と選択肢タイトルの英訳を用意する（生成時の英訳 → 翻訳メモリ → Gemini の順）
+"""
+
+import json
+import os
+import threading
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows ではプロセス間のロックを使わない
+    fcntl = None
+
+from question_generator import validate_bilingual
+
+# 翻訳メモリの正規化一致で無視する文末の句読点（NFKC 後の形）
+_TRAILING_PUNCTUATION = "。!?"
+
+
+def memory_key(text: str) -> str:
+    """
+    翻訳メモリの正規化一致に使うキー
+
+    全角半角・大文字小文字・空白の違いと文末の 。！？ だけを無視する。
+    符号・単位・通貨記号・スラッシュは訳が変わるので残す（-30℃ と 30℃、1/2 と 12、$100 と ¥100 を区別する）
+    """
+    text = " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+    return text.rstrip(_TRAILING_PUNCTUATION).rstrip()
+
+
+class Translator:
+    """
+    質問データの英訳
+
+    - QuestionGenerator が同じ応答で出力した英訳（question_en / title_en）があればそのまま使い、翻訳メモリにも登録する
+    - なければ原文ごとの翻訳メモリ（output/translation_cache.json）を引く
+      （完全一致 → 全角半角・大文字小文字・空白と文末の句読点の違いを無視した一致の順）
+    - メモリにない文字列だけを1回のリクエストでまとめて Gemini で翻訳し、メモリに追記する
+      （Discord Bot とローカル生成で共有。極寒の部屋 のように繰り返し出る選択肢は翻訳し直さない）
+    - 翻訳に失敗したら日本語をそのまま返す
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, model=None):
+        """
+        Args:
+            cache_path: 翻訳メモリの保存先（省略時は プロジェクト/output/translation_cache.json）
+            model: 翻訳に使う Gemini のモデル（省略時は最初の翻訳時に作成）
+        """
+        if cache_path is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache_path = os.path.join(project_root, "output", "translation_cache.json")
+        self.cache_path = cache_path
+        self.model = model
+        self._lock = threading.Lock()
+
+        # 統計（文字列単位）
+        self.from_generation = 0
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+        self.api_calls = 0
+
+    def translate(self, question_data: Dict) -> Dict:
+        """
+        質問と選択肢を英訳
+
+        Args:
+            question_data: 質問データ
+
+        Returns:
+            {"question": 英訳, "choices": {選択肢番号: 英訳}}
+        """
+        choices = question_data.get("choices", [])
+        sources = [question_data.get("question", "")] + [c["title"] for c in choices]
+        if validate_bilingual(question_data):
+            translations = dict(zip(sources, [question_data["question_en"]] + [c["title_en"] for c in choices]))
+            with self._lock:
+                self.from_generation += len(translations)
+            # 生成時の英訳もメモリに残す（作り置き・再開時や他の質問で同じ選択肢が出たときに使う）
+            self._remember(translations)
+            return self._result(question_data, translations)
+
+        return self._result(question_data, self.translate_texts(sources))
+
+    def translate_texts(self, texts: List[str]) -> Dict[str, str]:
+        """
+        文字列をまとめて英訳（メモリにないものだけを1回のリクエストで翻訳）
+
+        Args:
+            texts: 日本語の文字列
+
+        Returns:
+            {原文: 英訳}（翻訳に失敗した文字列は含めない）
+        """
+        memory = self._load()
+        normalized = {memory_key(source): target for source, target in memory.items()}
+
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        exact = fuzzy = 0
+        for text in dict.fromkeys(t for t in texts if t):
+            key = memory_key(text)
+            if text in memory:
+                found[text] = memory[text]
+                exact += 1
+            elif key and key in normalized:
+                found[text] = normalized[key]
+                fuzzy += 1
+            else:
+                missing.append(text)
+
+        with self._lock:
+            self.exact_hits += exact
+            self.normalized_hits += fuzzy
+            self.misses += len(missing)
+        print(f"  🧠 翻訳メモリ: {exact + fuzzy}/{exact + fuzzy + len(missing)}件ヒット（正規化一致 {fuzzy}件）")
+
+        if missing:
+            try:
+                translated = self._request(missing)
+            except Exception as e:
+                print(f"  ⚠️ 翻訳失敗: {e} → 日本語をそのまま使用")
+            else:
+                found.update(translated)
+                self._remember(translated)
+        return found
+
+    def stats(self) -> Dict:
+        """英訳の入手元ごとの件数と翻訳メモリのヒット率"""
+        with self._lock:
+            lookups = self.exact_hits + self.normalized_hits + self.misses
+            return {
+                "from_generation": self.from_generation,
+                "exact_hits": self.exact_hits,
+                "normalized_hits": self.normalized_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.normalized_hits) / lookups if lookups else 0.0,
+                "api_calls": self.api_calls,
+                "memory_size": len(self._load()),
+            }
+
+    def _result(self, question_data: Dict, translations: Dict[str, str]) -> Dict:
+        """原文→英訳の対応から結果を組み立てる（ないものは日本語のまま）"""
+        question = question_data.get("question", "")
+        return {
+            "question": translations.get(question, question),
+            "choices": {
+                c["number"]: translations.get(c["title"], c["title"])
+                for c in question_data.get("choices", [])
+            },
+        }
+
+    def _request(self, texts: List[str]) -> Dict[str, str]:
+        """Geminiで文字列をまとめて英訳し、原文→英訳の対応を返す"""
+        if self.model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+            self.model = genai.GenerativeModel("models/gemini-2.5-flash")
+
+        prompt = f"""Translate each Japanese string in the following JSON array into natural English.
+They are questions and short choice titles from a quiz video, so keep the titles short.
+Return JSON only: an array of English strings in the same order and of the same length.
+
+{json.dumps(texts, ensure_ascii=False)}"""
+
+        with self._lock:
+            self.api_calls += 1
+        response = self.model.generate_content(prompt)
+        content = response.text.strip()
+        if content.startswith("```"):
+            content = content.split("```")[1]
+            if content.startswith("json"):
+                content = content[4:]
+        data = json.loads(content.strip())
+        if not isinstance(data, list) or len(data) != len(texts):
+            raise ValueError(f"翻訳の件数が一致しません（{len(texts)}件中 {len(data) if isinstance(data, list) else 0}件）")
+        return {
+            source: target.strip()
+            for source, target in zip(texts, data)
+            if isinstance(target, str) and target.strip()
+        }
+
+    def _remember(self, translations: Dict[str, str]) -> None:
+        """翻訳メモリに追記（すでに同じ内容なら書き込まない）"""
+        if all(self._load().get(source) == target for source, target in translations.items()):
+            return
+        with self._locked() as memory:
+            memory.update(translations)
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, str]]:
+        """ファイルをロックして読み直した翻訳メモリを渡し、抜けるときに保存する"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            lock_file = open(f"{self.cache_path}.lock", 'a')
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                memory = self._load()
+                yield memory
+                self._save(memory)
+            finally:
+                lock_file.close()
+
+    def _load(self) -> Dict[str, str]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 翻訳メモリの読み込みエラー: {e}")
+            return {}
+
+    def _save(self, memory: Dict[str, str]) -> None:
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(memory, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+
+_translator: Optional[Translator] = None
+
+
+def get_translator() -> Translator:
+    """プロセス内で共有する Translator を取得"""
+    global _translator
+    if _translator is None:
+        _translator = Translator()
+    return _translator
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 使い方: python src/translation.py 極寒の部屋 完全暗闇 ...
+    translator = get_translator()
+    for source, target in translator.translate_texts(sys.argv[1:]).items():
+        print(f"{source} → {target}")
+    print(json.dumps(translator.stats(), ensure_ascii=False, indent=2))
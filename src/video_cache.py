@@ -0,0 +1,140 @@
+"""
+生成動画キャッシュモジュール
+AI生成動画を正規化したプロンプトと生成パラメータをキーに保存し、同じ生成を再利用する
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import unicodedata
+from typing import Dict, Optional
+
+
+def normalize_prompt(prompt: str) -> str:
+    """表記ゆれ（全角半角・大文字小文字・空白）を吸収したプロンプト"""
+    prompt = unicodedata.normalize("NFKC", prompt)
+    return re.sub(r"\s+", " ", prompt).strip().lower()
+
+
+class GeneratedVideoCache:
+    """
+    AI生成動画のキャッシュ
+
+    正規化したプロンプト・アスペクト比・長さ・モデルをキーに動画を保存する。
+    合計サイズが上限を超えたら最後に使われた時刻（ファイルの更新時刻）が古いものから削除する。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3):
+        """
+        Args:
+            cache_dir: 動画を保存するディレクトリ（省略時は プロジェクト/cache/ai_videos）
+            max_bytes: キャッシュの合計サイズの上限
+        """
+        if cache_dir is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache_dir = os.path.join(project_root, "cache", "ai_videos")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        # 統計
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, prompt: str, aspect_ratio: str, duration: int, model: Optional[str]) -> str:
+        """生成パラメータからキーを生成"""
+        params = {
+            "prompt": normalize_prompt(prompt),
+            "aspect_ratio": aspect_ratio,
+            "duration": duration,
+            "model": model or "default",
+        }
+        payload = json.dumps(params, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        """キーに対応する動画ファイルのパス"""
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def get(self, key: str, output_path: str) -> Optional[str]:
+        """
+        キャッシュ済みの動画を output_path にコピー
+
+        Returns:
+            output_path（未キャッシュの場合はNone）
+        """
+        path = self.path_for(key)
+        with self._lock:
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                self.misses += 1
+                return None
+            # 最後に使われた時刻として更新時刻を進める（LRU）
+            os.utime(path)
+            self.hits += 1
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        shutil.copyfile(path, output_path)
+        return output_path
+
+    def store(self, key: str, video_path: str, metadata: Optional[Dict] = None) -> str:
+        """
+        生成した動画をキャッシュに登録
+
+        Args:
+            key: キャッシュキー
+            video_path: ダウンロード済みの動画
+            metadata: 一緒に保存する情報（プロンプトなど、確認用）
+
+        Returns:
+            キャッシュ内のパス
+        """
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(video_path, tmp_path)
+        os.replace(tmp_path, path)
+        if metadata:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+        with self._lock:
+            self._evict()
+        return path
+
+    def stats(self) -> Dict:
+        """ヒット／ミスの統計を返す"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば古いものから削除"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp4"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for victim in (path, f"{path[:-len('.mp4')]}.json"):
+                if os.path.exists(victim):
+                    os.remove(victim)
+            total -= size
+            self.evictions += 1
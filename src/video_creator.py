@@ -1,32 +1,59 @@
 """
 動画生成モジュール（選択式質問動画用）
-MoviePyを使用して縦型の選択式質問動画を生成
+MoviePy（または ffmpeg filter_complex）を使用して縦型の選択式質問動画を生成
 """
 
 import os
-from typing import Dict, List, Optional
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 from moviepy import (
-    VideoFileClip, ImageClip, AudioFileClip,
-    TextClip, CompositeVideoClip, concatenate_videoclips,
+    VideoClip, VideoFileClip, ImageClip, AudioArrayClip, AudioClip,
+    CompositeVideoClip, concatenate_videoclips,
     ColorClip
 )
 from moviepy import vfx
+import numpy as np
 import yaml
 
+from bgm_mixer import get_bgm_mixer
+from ffmpeg_renderer import (
+    FFmpegQuestionRenderer, FFMPEG_BINARY, AUDIO_SAMPLE_RATE,
+    bgm_filters, concat_segments, run_ffmpeg, section_jobs
+)
+from clip_normalizer import ClipNormalizer
+from encoder_profiles import ffmpeg_video_args, get_encoder_profile, moviepy_write_kwargs, profile_names
+from font_registry import get_font_registry
+from frame_compositor import LayoutCompositor
+from segment_cache import CACHEABLE_SECTION_KINDS, SegmentCache
+from text_overlay import get_overlay_cache
+
 
 class QuestionVideoCreator:
     """選択式質問動画生成クラス"""
     
-    def __init__(self, config_path: str = "config/video_config.yaml"):
+    def __init__(
+        self,
+        config_path: str = "config/video_config.yaml",
+        config: Optional[Dict] = None,
+        profile: Optional[str] = None
+    ):
         """
         Args:
             config_path: 設定ファイルのパス
+            config: 読み込み済みの設定（指定時は config_path を読まない）
+            profile: エンコードプロファイル名（省略時は設定ファイルの encoding.profile）
         """
         # プロジェクトルートディレクトリ
         self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
         # 設定ファイルが存在しない場合はデフォルト設定を使用
-        if os.path.exists(config_path):
+        if config is not None:
+            self.config = config
+        elif os.path.exists(config_path):
             with open(config_path, 'r', encoding='utf-8') as f:
                 self.config = yaml.safe_load(f)
             # フォントパスを絶対パスに解決し、存在しなければ自動検索
@@ -37,6 +64,10 @@ class QuestionVideoCreator:
                 if not os.path.exists(font_path):
                     font_path = self._find_japanese_font()
                 self.config['text_overlay']['font'] = font_path
+                # オーバーレイキャッシュのディレクトリも絶対パスに解決
+                cache_dir = self.config['text_overlay'].get('cache_dir')
+                if cache_dir and not os.path.isabs(cache_dir):
+                    self.config['text_overlay']['cache_dir'] = os.path.join(self.project_root, cache_dir)
         else:
             self.config = self._get_default_config()
         
@@ -45,26 +76,57 @@ class QuestionVideoCreator:
         self.height = self.video_config['resolution'][1]
         self.fps = self.video_config['fps']
         self.durations = self.video_config['duration']
+        # レンダリングエンジン（moviepy / ffmpeg）
+        self.engine = self.video_config.get('engine', 'moviepy')
+        # MoviePyエンジンのフレーム合成（moviepy: CompositeVideoClip / numpy: LayoutCompositor）
+        self.compositor = self.video_config.get('compositor', 'moviepy')
         
         self.text_config = self.config['text_overlay']
         self.audio_config = self.config['audio']
+        
+        # エンコードプロファイル（ワーカープロセスにも設定ごと渡るように config に書き戻す）
+        if profile:
+            self.config.setdefault('encoding', {})['profile'] = profile
+        self.encoder_profile = get_encoder_profile(config=self.config)
+        
+        # 描画済みテキストのキャッシュ（プロセス内で共有）
+        self.overlay_cache = get_overlay_cache(self.text_config.get('cache_dir'))
+        
+        # デコード済みBGMのキャッシュ（プロセス内で共有）
+        bgm_cache_dir = self.audio_config.get('bgm_cache_dir', 'cache/bgm')
+        if not os.path.isabs(bgm_cache_dir):
+            bgm_cache_dir = os.path.join(self.project_root, bgm_cache_dir)
+        self.bgm_mixer = get_bgm_mixer(bgm_cache_dir)
+        
+        # セクション単位のエンコード（固定セクションはキャッシュし、ストリームコピーで結合）
+        segment_config = self.video_config.get('segments', {})
+        self.segmented = segment_config.get('enabled', False)
+        segment_cache_dir = segment_config.get('cache_dir', 'cache/segments')
+        if not os.path.isabs(segment_cache_dir):
+            segment_cache_dir = os.path.join(self.project_root, segment_cache_dir)
+        self.segment_cache = SegmentCache(
+            segment_cache_dir, max_bytes=segment_config.get('cache_max_mb', 256) * 1024 * 1024
+        )
+        # セクションを別プロセスで並列エンコード（workers: 0 でCPUコア数）
+        self.parallel_sections = segment_config.get('parallel', False)
+        self.section_workers = segment_config.get('workers', 0) or (os.cpu_count() or 1)
+        # AI動画の生成と並行してセクションをエンコードする（main.py の SectionPipeline で使用）
+        self.pipelined = segment_config.get('pipelined', False)
+        
+        # メモリ上限付きのストリーミングレンダリング（compose / streaming / auto）
+        streaming_config = self.video_config.get('streaming', {})
+        self.render_mode = streaming_config.get('mode', 'compose')
+        self.memory_ceiling_mb = streaming_config.get('memory_ceiling_mb', 1536)
+        
+        # 選択肢動画の正規化（解像度・fps・尺を事前に揃えてキャッシュ）
+        self.normalizer = ClipNormalizer(config=self.config)
+        
+        # 直近のレンダリング結果（セクションごとの所要時間など）
+        self.last_render_report: Dict = {}
     
     def _find_japanese_font(self) -> str:
-        """日本語対応フォントのパスを返す"""
-        candidates = [
-            # プロジェクト内フォント（最優先）
-            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts", "NotoSansCJKjp-Bold.otf"),
-            # システムフォント
-            "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
-            "/usr/share/fonts/noto-cjk/NotoSansCJKjp-Bold.otf",
-            "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
-            "/usr/share/fonts/truetype/vlgothic/VL-Gothic-Regular.ttf",
-        ]
-        for path in candidates:
-            if os.path.exists(path):
-                return path
-        # フォールバック（英語のみ）
-        return "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+        """日本語対応フォントのパスを返す（検索はプロセスごとに1回だけ）"""
+        return get_font_registry().resolve()
 
     def _get_default_config(self) -> Dict:
         """デフォルト設定を返す"""
@@ -72,14 +134,35 @@ class QuestionVideoCreator:
             'video': {
                 'resolution': [1080, 1920],  # 縦型
                 'fps': 30,
+                'engine': 'moviepy',
+                'compositor': 'moviepy',
                 'duration': {
                     'opening': 6,
                     'choice': 8,
                     'ending': 5
+                },
+                'segments': {
+                    'enabled': False,
+                    'cache_dir': 'cache/segments',
+                    'cache_max_mb': 256,
+                    'parallel': False,
+                    'workers': 0,
+                    'pipelined': False
+                },
+                'streaming': {
+                    'mode': 'auto',
+                    'memory_ceiling_mb': 1536
                 }
             },
+            'normalization': {
+                'enabled': True,
+                'cache_dir': 'cache/normalized',
+                'cache_max_mb': 1024,
+                'protect_seconds': 3600
+            },
             'text_overlay': {
                 'font': self._find_japanese_font(),
+                'cache_dir': os.path.join(self.project_root, 'cache', 'overlays'),
                 'colors': {
                     'primary': '#FFFFFF',
                     'accent': '#FFD700',
@@ -88,6 +171,14 @@ class QuestionVideoCreator:
             },
             'audio': {
                 'bgm_volume': 0.3,
+                'bgm_cache_dir': 'cache/bgm',
+                'bgm_ducking': {
+                    'enabled': True,
+                    'threshold': 0.05,
+                    'ratio': 8,
+                    'attack': 20,
+                    'release': 400
+                },
                 'narration_volume': 0.8,
                 'sfx_volume': 0.5
             }
@@ -112,14 +203,31 @@ class QuestionVideoCreator:
         Returns:
             生成された動画ファイルのパス
         """
-        print("🎬 選択式質問動画を生成中...")
+        print(f"🎬 選択式質問動画を生成中...（エンジン: {self.engine} / プロファイル: {self.encoder_profile['name']}）")
         
         # 出力ディレクトリを作成
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        # 選択肢動画を正規化（ダウンロード時に変換済みならキャッシュから即座に返る）
+        choice_videos = self._normalize_choice_videos(choice_videos)
+        
+        # 今回描画する文字のグリフを先に読み込んでおく
+        if self.text_config.get('warm_up', True):
+            self._warm_up_fonts(question_data)
+        
+        if self.segmented:
+            return self._create_segmented(question_data, choice_videos, output_path, bgm_path)
+        
+        if self.engine == 'ffmpeg':
+            return self._create_with_ffmpeg(question_data, choice_videos, output_path, bgm_path)
+        
+        if self._use_streaming():
+            return self._create_streaming(question_data, choice_videos, output_path, bgm_path)
+        
         # 各パートを生成
         opening_clip = self._create_opening(question_data)
-        choice_clips = self._create_choice_sections(question_data, choice_videos)
+        sources = []
+        choice_clips = self._create_choice_sections(question_data, choice_videos, sources)
         ending_clip = self._create_ending()
         
         # すべてのクリップを結合
@@ -127,43 +235,508 @@ class QuestionVideoCreator:
         final_video = concatenate_videoclips(all_clips, method="compose")
         
         # BGMを追加（オプション）
+        # デコード済みPCMをループ・ダッキングしてミックスし、1本の音声配列として付け直す
         if bgm_path and os.path.exists(bgm_path):
-            bgm = AudioFileClip(bgm_path)
-            bgm = bgm.with_effects([vfx.VolumeX(self.audio_config['bgm_volume'])])
-            # ループしてビデオの長さに合わせる
-            if bgm.duration < final_video.duration:
-                n_loops = int(final_video.duration / bgm.duration) + 1
-                bgm = concatenate_audioclips([bgm] * n_loops)
-            bgm = bgm.subclip(0, final_video.duration)
-            
-            # 既存の音声とミックス
-            if final_video.audio:
-                from moviepy import CompositeAudioClip
-                final_audio = CompositeAudioClip([final_video.audio, bgm])
-                final_video = final_video.with_audio(final_audio)
-            else:
-                final_video = final_video.with_audio(bgm)
+            voice = None
+            if final_video.audio is not None:
+                voice = final_video.audio.to_soundarray(fps=AUDIO_SAMPLE_RATE)
+            mixed = self.bgm_mixer.mix(
+                voice,
+                bgm_path,
+                self.audio_config['bgm_volume'],
+                final_video.duration,
+                self.audio_config.get('bgm_ducking')
+            )
+            final_video = final_video.with_audio(AudioArrayClip(mixed, fps=AUDIO_SAMPLE_RATE))
         
         # 動画を書き出し
         print("📹 動画を書き出し中...")
-        final_video.write_videofile(
-            output_path,
-            fps=self.fps,
-            codec='libx264',
-            audio_codec='aac',
-            preset='medium',
-            threads=4,
-            logger=None  # ログを抑制
-        )
+        final_video.write_videofile(output_path, **moviepy_write_kwargs(self.encoder_profile, self.fps))
         
         # クリーンアップ
         final_video.close()
         for clip in all_clips:
             clip.close()
+        _close_all(sources)
         
+        self.last_render_report = {
+            'output_path': output_path,
+            'engine': self.engine,
+            'mode': 'compose',
+            'peak_rss_mb': _peak_rss_mb()
+        }
+        self._report_overlay_cache()
+        print(f"✅ 動画を生成しました: {output_path}")
+        return output_path
+    
+    def _create_with_ffmpeg(
+        self,
+        question_data: Dict,
+        choice_videos: Dict[int, str],
+        output_path: str,
+        bgm_path: Optional[str] = None
+    ) -> str:
+        """ffmpeg filter_complex で動画を生成（フレームをPythonに通さない）"""
+        print("📹 ffmpegでレンダリング中...")
+        self._ffmpeg_renderer().render(question_data, choice_videos, output_path, bgm_path)
+        self._report_overlay_cache()
         print(f"✅ 動画を生成しました: {output_path}")
         return output_path
     
+    def _use_streaming(self) -> bool:
+        """
+        ストリーミングレンダリングを使うか判定
+        
+        auto の場合、利用可能メモリが memory_ceiling_mb を下回るときに
+        全クリップを同時に開く compose ではなくストリーミングに切り替える
+        """
+        if self.render_mode == 'streaming':
+            return True
+        if self.render_mode != 'auto':
+            return False
+        
+        available_mb = _available_memory_mb()
+        if available_mb is not None and available_mb < self.memory_ceiling_mb:
+            print(
+                f"🧠 利用可能メモリ {available_mb:.0f}MB < 上限 {self.memory_ceiling_mb}MB "
+                f"→ ストリーミングレンダリングに切り替えます"
+            )
+            return True
+        return False
+    
+    def _create_streaming(
+        self,
+        question_data: Dict,
+        choice_videos: Dict[int, str],
+        output_path: str,
+        bgm_path: Optional[str] = None
+    ) -> str:
+        """
+        セクションを1つずつ開いてエンコーダーのパイプに直接書き込む
+        
+        同時に開くソース動画は常に1本だけなので、compose で全クリップを
+        開いたままにする場合よりピークメモリが小さい
+        """
+        jobs = section_jobs(question_data, choice_videos)
+        start = time.perf_counter()
+        peak_rss = _current_rss_mb()
+        
+        with tempfile.TemporaryDirectory(prefix="streaming_") as work_dir:
+            # 1. セクションを1つずつ開き、音声は WAV に追記し、フレームは rawvideo としてエンコーダーに流し込む
+            #    （同じクリップから音声と映像を取り出し、ソース動画を開き直したりテキストを描き直したりしない）
+            print("📹 映像と音声をストリーミング書き出し中...")
+            audio_path = os.path.join(work_dir, "audio.wav")
+            video_path = os.path.join(work_dir, "video.mp4")
+            total_duration = 0.0
+            cmd = [
+                FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+                "-f", "rawvideo", "-pix_fmt", "rgb24",
+                "-s", f"{self.width}x{self.height}", "-r", f"{self.fps}",
+                "-i", "-",
+                *ffmpeg_video_args(self.encoder_profile, self.fps),
+                "-an",
+                video_path
+            ]
+            process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                with wave.open(audio_path, 'wb') as wav:
+                    wav.setnchannels(2)
+                    wav.setsampwidth(2)
+                    wav.setframerate(AUDIO_SAMPLE_RATE)
+                    for job in jobs:
+                        clip, sources = self._build_section_clip(job)
+                        try:
+                            self._append_audio(wav, clip)
+                            total_duration += clip.duration
+                            if tuple(clip.size) != (self.width, self.height):
+                                clip = CompositeVideoClip(
+                                    [clip.with_position('center')], size=(self.width, self.height)
+                                )
+                            for i, frame in enumerate(clip.iter_frames(fps=self.fps, dtype='uint8')):
+                                process.stdin.write(np.ascontiguousarray(frame[:, :, :3]).tobytes())
+                                if i % self.fps == 0:
+                                    peak_rss = max(peak_rss, _current_rss_mb())
+                        finally:
+                            # 合成クリップの close() は子クリップを閉じないので、ソース動画のリーダーをここで閉じる
+                            clip.close()
+                            _close_all(sources)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            stderr = process.stderr.read().decode('utf-8', errors='replace')
+            if process.wait() != 0:
+                raise RuntimeError(f"ffmpeg 実行エラー: {stderr[-2000:]}")
+            
+            # 2. 音声（とBGM）を付ける（映像はコピー）
+            cmd = [
+                FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+                "-i", video_path,
+                "-i", audio_path,
+            ]
+            if bgm_path and os.path.exists(bgm_path):
+                cmd += [
+                    "-i", bgm_path,
+                    "-filter_complex", ";".join(bgm_filters(
+                        "[1:a]", 2, self.audio_config['bgm_volume'], total_duration,
+                        self.audio_config.get('bgm_ducking')
+                    )),
+                    "-map", "0:v", "-map", "[aout]",
+                ]
+            else:
+                cmd += ["-map", "0:v", "-map", "1:a"]
+            run_ffmpeg(cmd + [
+                "-c:v", "copy", "-c:a", "aac", "-b:a", self.encoder_profile['audio_bitrate'],
+                "-movflags", "+faststart",
+                output_path
+            ])
+        
+        self.last_render_report = {
+            'output_path': output_path,
+            'engine': self.engine,
+            'mode': 'streaming',
+            'peak_rss_mb': peak_rss,
+            'total_seconds': time.perf_counter() - start
+        }
+        print(f"🧠 ピークRSS: {peak_rss:.0f}MB")
+        self._report_overlay_cache()
+        print(f"✅ 動画を生成しました: {output_path}")
+        return output_path
+    
+    def _append_audio(self, wav: wave.Wave_write, clip) -> None:
+        """クリップの音声を 16bit ステレオで WAV に追記（音声がなければ無音）"""
+        total_frames = int(round(clip.duration * AUDIO_SAMPLE_RATE))
+        written = 0
+        
+        if clip.audio is not None:
+            for chunk in clip.audio.iter_chunks(
+                chunksize=AUDIO_SAMPLE_RATE, fps=AUDIO_SAMPLE_RATE, quantize=True, nbytes=2
+            ):
+                chunk = np.asarray(chunk, dtype=np.int16)
+                if chunk.ndim == 1:
+                    chunk = chunk[:, None]
+                if chunk.shape[1] == 1:
+                    chunk = np.repeat(chunk, 2, axis=1)
+                chunk = chunk[:total_frames - written, :2]
+                wav.writeframes(np.ascontiguousarray(chunk).tobytes())
+                written += len(chunk)
+                if written >= total_frames:
+                    break
+        
+        if written < total_frames:
+            wav.writeframes(bytes((total_frames - written) * 4))
+    
+    def _normalize_choice_videos(self, choice_videos: Dict[int, str]) -> Dict[int, str]:
+        """正規化が有効なら選択肢動画を正規化済みのパスに置き換える"""
+        if not self.normalizer.enabled:
+            return choice_videos
+        
+        normalized = dict(choice_videos)
+        for number, video_path in choice_videos.items():
+            if not video_path or not os.path.exists(video_path):
+                continue
+            try:
+                normalized[number] = self.normalizer.normalize(video_path, self.durations['choice'])
+            except Exception as e:
+                print(f"⚠️ 選択肢{number}の正規化に失敗（元動画を使用）: {e}")
+        print(f"🔧 正規化キャッシュ: ヒット {self.normalizer.hits} / ミス {self.normalizer.misses}")
+        return normalized
+    
+    def _warm_up_fonts(self, question_data: Dict) -> None:
+        """質問文・選択肢の文字でフォントをウォームアップ"""
+        texts = [question_data.get('question', ''), question_data.get('context', '')]
+        for choice in question_data.get('choices', []):
+            texts += [f"{choice['number']}", choice.get('title', ''), choice.get('description', '')]
+        
+        registry = get_font_registry()
+        elapsed = registry.warm_up(texts, font_path=self.text_config['font'])
+        print(f"🔤 フォントウォームアップ: {elapsed * 1000:.0f}ms（累計 {registry.warmed_characters}文字）")
+    
+    def _ffmpeg_renderer(self) -> FFmpegQuestionRenderer:
+        """この設定・キャッシュを共有する ffmpeg レンダラー"""
+        return FFmpegQuestionRenderer(self.config, overlay_cache=self.overlay_cache)
+    
+    def _create_segmented(
+        self,
+        question_data: Dict,
+        choice_videos: Dict[int, str],
+        output_path: str,
+        bgm_path: Optional[str] = None
+    ) -> str:
+        """
+        セクションごとに中間ファイルへエンコードし、ストリームコピーで結合
+        
+        エンディングなど毎回同じ内容のセクションはキャッシュから再利用し、
+        質問ごとに変わるセクション（オープニング・選択肢）だけをエンコードする。
+        parallel が有効な場合は各セクションを別プロセスで同時にエンコードする。
+        """
+        jobs = section_jobs(question_data, choice_videos)
+        total_start = time.perf_counter()
+        timings = {}
+        
+        with tempfile.TemporaryDirectory(prefix="segments_") as work_dir:
+            segment_paths = {}
+            pending = []  # (ジョブ, 出力パス, キャッシュキー)
+            
+            for job in jobs:
+                cached, cache_key = self._cached_segment(job)
+                if cached:
+                    segment_paths[job['name']] = cached
+                    timings[job['name']] = {'seconds': 0.0, 'cached': True}
+                    continue
+                pending.append((job, os.path.join(work_dir, f"{job['name']}.mp4"), cache_key))
+            
+            if self.parallel_sections and len(pending) > 1:
+                elapsed = self._encode_segments_parallel(pending)
+            else:
+                elapsed = {}
+                for job, path, _ in pending:
+                    print(f"📹 セグメントをエンコード中: {job['name']}")
+                    start = time.perf_counter()
+                    self._encode_segment(job, path)
+                    elapsed[job['name']] = time.perf_counter() - start
+            
+            for job, path, cache_key in pending:
+                timings[job['name']] = {'seconds': elapsed[job['name']], 'cached': False}
+                segment_paths[job['name']] = (
+                    self.segment_cache.store(cache_key, path) if cache_key else path
+                )
+            
+            print("🔗 セグメントを結合中...")
+            concat_start = time.perf_counter()
+            stream_copy = self._concat_segments(
+                [segment_paths[job['name']] for job in jobs], output_path, bgm_path
+            )
+            concat_seconds = time.perf_counter() - concat_start
+        
+        self.last_render_report = {
+            'output_path': output_path,
+            'engine': self.engine,
+            'mode': 'parallel' if self.parallel_sections else 'segmented',
+            'stream_copy': stream_copy,
+            'sections': timings,
+            'concat_seconds': concat_seconds,
+            'total_seconds': time.perf_counter() - total_start
+        }
+        
+        print(f"🔗 結合方式: {'ストリームコピー' if stream_copy else '再エンコード'}")
+        for name, timing in timings.items():
+            label = 'キャッシュ' if timing['cached'] else f"{timing['seconds']:.1f}秒"
+            print(f"   ⏱️ {name}: {label}")
+        print(f"   ⏱️ 結合: {concat_seconds:.1f}秒 / 合計: {self.last_render_report['total_seconds']:.1f}秒")
+        print(f"♻️ セグメントキャッシュ: ヒット {self.segment_cache.hits} / ミス {self.segment_cache.misses}")
+        self._report_overlay_cache()
+        print(f"✅ 動画を生成しました: {output_path}")
+        return output_path
+    
+    def _cached_segment(self, job: Dict) -> Tuple[Optional[str], Optional[str]]:
+        """
+        キャッシュ済みのセグメントを探す
+        
+        Returns:
+            (キャッシュ済みのパス（なければNone）, キャッシュキー（キャッシュできないセクションはNone）)
+        """
+        # 内容が毎回同じセクションだけキャッシュする（オープニング・選択肢は質問ごとに変わるので
+        # キャッシュしても再利用されず、ディレクトリが増え続けるだけになる）
+        if job['kind'] not in CACHEABLE_SECTION_KINDS:
+            return None, None
+        cache_key = self.segment_cache.key(self._segment_cache_params(job))
+        cached = self.segment_cache.get(cache_key)
+        if cached:
+            print(f"♻️ キャッシュ済みセグメントを再利用: {job['name']}")
+        return cached, cache_key
+    
+    def _concat_segments(self, segment_paths: List[str], output_path: str, bgm_path: Optional[str]) -> bool:
+        """
+        セグメントを結合（BGMがあればミックス）
+        
+        Returns:
+            ストリームコピーで結合できた場合True
+        """
+        return concat_segments(
+            segment_paths,
+            output_path,
+            bgm_path=bgm_path,
+            bgm_volume=self.audio_config['bgm_volume'],
+            bgm_ducking=self.audio_config.get('bgm_ducking'),
+            video_encoder_args=ffmpeg_video_args(self.encoder_profile, self.fps),
+            audio_bitrate=self.encoder_profile['audio_bitrate']
+        )
+    
+    def _encode_segments_parallel(self, pending: List) -> Dict[str, float]:
+        """
+        セクションを別プロセスで並列エンコード
+        
+        Returns:
+            {セクション名: エンコード秒数}
+        """
+        workers = min(len(pending), self.section_workers)
+        # ワーカー間でCPUを分け合う（エンコード設定自体は全セクション共通）
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"⚡ {len(pending)}セクションを{workers}プロセスで並列エンコード（各{threads}スレッド）")
+        
+        elapsed = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            future_to_name = {
+                executor.submit(_encode_segment_worker, self.config, self.engine, job, path, threads): job['name']
+                for job, path, _ in pending
+            }
+            for future in as_completed(future_to_name):
+                name = future_to_name[future]
+                elapsed[name] = future.result()
+                print(f"✅ セグメント完了: {name}（{elapsed[name]:.1f}秒）")
+        
+        return elapsed
+    
+    def _encode_segment(self, job: Dict, output_path: str, threads: Optional[int] = None) -> str:
+        """1セクションを結合用の共通エンコード設定で書き出す"""
+        if self.engine == 'ffmpeg':
+            renderer = self._ffmpeg_renderer()
+            return renderer.render_section(renderer.build_section(job), output_path, threads=threads)
+        
+        clip, sources = self._build_section_clip(job)
+        try:
+            # 全セグメントの音声形式を揃えるため、音声がなければ無音を付ける
+            if clip.audio is None:
+                clip = clip.with_audio(self._silence(clip.duration))
+            write_kwargs = self._segment_write_kwargs()
+            if threads:
+                write_kwargs['threads'] = threads
+            clip.write_videofile(output_path, **write_kwargs)
+        finally:
+            clip.close()
+            _close_all(sources)
+        return output_path
+    
+    def _build_section_clip(self, job: Dict) -> tuple:
+        """
+        セクションジョブから MoviePy のクリップを作成
+        
+        Returns:
+            (クリップ, 開いたソース動画のリスト) のタプル。ソース動画は呼び出し元が使い終わったら閉じる
+        """
+        kind = job['kind']
+        sources = []
+        if kind == 'opening':
+            clip = self._create_opening(job['question_data'])
+        elif kind == 'choice':
+            clip = self._create_single_choice(job['choice'], job['video_path'], sources)
+        elif kind == 'fallback':
+            clip = self._create_fallback_choice(job['choice'])
+        else:
+            clip = self._create_ending()
+        return clip, sources
+    
+    def _segment_cache_params(self, job: Dict) -> Dict:
+        """セグメントキャッシュのキーに使うパラメータ"""
+        return {
+            "job": {k: v for k, v in job.items() if k != 'name'},
+            "engine": self.engine,
+            "resolution": [self.width, self.height],
+            "fps": self.fps,
+            "durations": self.durations,
+            "text": self.text_config,
+            "encoder": (
+                self._segment_write_kwargs() if self.engine == 'moviepy'
+                else self._ffmpeg_renderer().segment_encoder_args()
+            )
+        }
+    
+    def _segment_write_kwargs(self) -> Dict:
+        """結合用中間ファイルの write_videofile 引数（ffmpegエンジンの segment_encoder_args と同じ設定）"""
+        write_kwargs = moviepy_write_kwargs(self.encoder_profile, self.fps)
+        write_kwargs['audio_fps'] = AUDIO_SAMPLE_RATE
+        write_kwargs['ffmpeg_params'] += [
+            '-keyint_min', f"{self.fps}",
+            '-sc_threshold', '0'
+        ]
+        return write_kwargs
+    
+    def _silence(self, duration: float) -> AudioClip:
+        """無音のステレオ音声クリップ"""
+        def frame_function(t):
+            if isinstance(t, np.ndarray):
+                return np.zeros((len(t), 2))
+            return np.zeros(2)
+        return AudioClip(frame_function, duration=duration, fps=AUDIO_SAMPLE_RATE)
+    
+    def _text_clip(
+        self,
+        text: str,
+        font_size: int,
+        color,
+        box_width: Optional[int] = None,
+        bg_color=None
+    ) -> ImageClip:
+        """キャッシュ済みのテキスト画像から ImageClip を作成"""
+        image = self.overlay_cache.get_image(
+            text=text,
+            font_path=self.text_config['font'],
+            font_size=font_size,
+            color=color,
+            box_width=box_width,
+            bg_color=bg_color
+        )
+        return ImageClip(np.array(image))
+    
+    def _composite(self, layers: List, fade_in: float = 0.0, fade_out: float = 0.0):
+        """
+        背景クリップの上にテキストクリップを重ねる（フェード付き）
+        
+        compositor が numpy の場合は LayoutCompositor をフレーム関数として使い、
+        オーバーレイの前計算と ROI のみのブレンドで合成する
+        """
+        background, overlays = layers[0], layers[1:]
+        
+        if self.compositor != 'numpy':
+            composite = CompositeVideoClip(layers)
+            effects = []
+            if fade_in:
+                effects.append(vfx.FadeIn(fade_in))
+            if fade_out:
+                effects.append(vfx.FadeOut(fade_out))
+            return composite.with_effects(effects) if effects else composite
+        
+        overlay_specs = []
+        for clip in overlays:
+            rgb = clip.get_frame(0)
+            alpha = clip.mask.get_frame(0) * 255 if clip.mask is not None else np.full(rgb.shape[:2], 255)
+            rgba = np.dstack([rgb, alpha]).astype(np.uint8)
+            overlay_specs.append((rgba, self._resolve_position(clip.pos(0), clip.size)))
+        
+        is_color = isinstance(background, ColorClip)
+        compositor = LayoutCompositor(
+            size=(self.width, self.height),
+            duration=background.duration,
+            overlays=overlay_specs,
+            background=None if is_color else background.get_frame,
+            background_color=tuple(int(v) for v in background.get_frame(0)[0, 0]) if is_color else (0, 0, 0),
+            fade_in=fade_in,
+            fade_out=fade_out
+        )
+        clip = VideoClip(compositor.frame, duration=background.duration)
+        if background.audio is not None:
+            clip = clip.with_audio(background.audio)
+        return clip
+    
+    def _resolve_position(self, position, size) -> tuple:
+        """MoviePy形式の位置指定（'center' または (x, y)）をピクセル座標に変換"""
+        if isinstance(position, str):
+            position = (position, position)
+        w, h = size
+        x, y = position
+        x = (self.width - w) / 2 if x == 'center' else x
+        y = (self.height - h) / 2 if y == 'center' else y
+        return (int(x), int(y))
+    
+    def _report_overlay_cache(self) -> None:
+        """オーバーレイキャッシュの統計を表示"""
+        stats = self.overlay_cache.stats()
+        print(
+            f"🔤 オーバーレイキャッシュ: メモリ {stats['memory_hits']} / "
+            f"ディスク {stats['disk_hits']} / ミス {stats['misses']} "
+            f"(ヒット率 {stats['hit_rate']:.0%})"
+        )
+    
     def _create_opening(self, question_data: Dict) -> VideoFileClip:
         """オープニングパートを作成"""
         duration = self.durations['opening']
@@ -181,38 +754,29 @@ class QuestionVideoCreator:
         
         # 質問用のテキストクリップ
         try:
-            question_clip = TextClip(
-                font=self.text_config['font'],
+            question_clip = self._text_clip(
                 text=question_text,
                 font_size=80,
                 color=self.text_config['colors']['accent'],
-                size=(self.width - 100, None),
-                method='caption',
-                text_align='center'
+                box_width=self.width - 100
             )
             question_clip = question_clip.with_position(('center', self.height * 0.35))
             question_clip = question_clip.with_duration(duration)
             
             # コンテキスト用のテキストクリップ
             if context_text:
-                context_clip = TextClip(
-                    font=self.text_config['font'],
+                context_clip = self._text_clip(
                     text=context_text,
                     font_size=50,
                     color=self.text_config['colors']['primary'],
-                    size=(self.width - 100, None),
-                    method='caption',
-                    text_align='center'
+                    box_width=self.width - 100
                 )
                 context_clip = context_clip.with_position(('center', self.height * 0.55))
                 context_clip = context_clip.with_duration(duration)
                 
-                composite = CompositeVideoClip([background, question_clip, context_clip])
+                composite = self._composite([background, question_clip, context_clip], fade_in=0.5)
             else:
-                composite = CompositeVideoClip([background, question_clip])
-            
-            # フェードイン
-            composite = composite.with_effects([vfx.FadeIn(0.5)])
+                composite = self._composite([background, question_clip], fade_in=0.5)
             
             return composite
             
@@ -223,7 +787,8 @@ class QuestionVideoCreator:
     def _create_choice_sections(
         self,
         question_data: Dict,
-        choice_videos: Dict[int, str]
+        choice_videos: Dict[int, str],
+        sources: Optional[List] = None
     ) -> List[VideoFileClip]:
         """選択肢セクションを作成"""
         choice_clips = []
@@ -234,7 +799,7 @@ class QuestionVideoCreator:
             video_path = choice_videos.get(number)
             
             if video_path and os.path.exists(video_path):
-                clip = self._create_single_choice(choice, video_path)
+                clip = self._create_single_choice(choice, video_path, sources)
                 choice_clips.append(clip)
             else:
                 print(f"⚠️ 選択肢{number}の動画が見つかりません: {video_path}")
@@ -244,28 +809,43 @@ class QuestionVideoCreator:
         
         return choice_clips
     
-    def _create_single_choice(self, choice: Dict, video_path: str) -> VideoFileClip:
-        """1つの選択肢クリップを作成"""
+    def _create_single_choice(
+        self,
+        choice: Dict,
+        video_path: str,
+        sources: Optional[List] = None
+    ) -> VideoFileClip:
+        """
+        1つの選択肢クリップを作成
+        
+        sources を渡すと、開いたソース動画（ffmpeg のリーダープロセスを持つ）をそこに追加する
+        """
         duration = self.durations['choice']
         
         # AI生成動画を読み込み
         try:
             video = VideoFileClip(video_path)
+            if sources is not None:
+                sources.append(video)
             
-            # 長さを調整
-            if video.duration < duration:
-                video = video.with_effects([vfx.Loop(duration=duration)])
+            if self.normalizer.is_normalized(video_path):
+                # 正規化済み（解像度・fps・尺が揃っている）なのでそのまま使う
+                video = video.with_duration(min(video.duration, duration))
             else:
-                video = video.with_subclip(0, duration)
-            
-            # 縦型にリサイズ
-            video = video.with_effects([vfx.Resize(height=self.height)])
-            
-            # 中央でクロップ
-            if video.w > self.width:
-                x_center = video.w / 2
-                x1 = x_center - self.width / 2
-                video = video.with_effects([vfx.Crop(x1=x1, width=self.width)])
+                # 長さを調整
+                if video.duration < duration:
+                    video = video.with_effects([vfx.Loop(duration=duration)])
+                else:
+                    video = video.subclipped(0, duration)
+                
+                # 縦型にリサイズ
+                video = video.with_effects([vfx.Resize(height=self.height)])
+                
+                # 中央でクロップ
+                if video.w > self.width:
+                    x_center = video.w / 2
+                    x1 = x_center - self.width / 2
+                    video = video.with_effects([vfx.Crop(x1=x1, width=self.width)])
             
         except Exception as e:
             print(f"⚠️ 動画読み込みエラー: {e}")
@@ -282,8 +862,7 @@ class QuestionVideoCreator:
         
         # 番号バッジ
         try:
-            number_text = TextClip(
-                font=self.text_config['font'],
+            number_text = self._text_clip(
                 text=f"{number}",
                 font_size=100,
                 color=self.text_config['colors']['accent']
@@ -292,14 +871,11 @@ class QuestionVideoCreator:
             number_text = number_text.with_duration(duration)
             
             # タイトル
-            title_text = TextClip(
-                font=self.text_config['font'],
+            title_text = self._text_clip(
                 text=title,
                 font_size=70,
                 color=self.text_config['colors']['primary'],
-                size=(self.width - 200, None),
-                method='caption',
-                text_align='center',
+                box_width=self.width - 200,
                 bg_color=self.text_config['colors']['background']
             )
             title_text = title_text.with_position(('center', self.height * 0.75))
@@ -307,22 +883,19 @@ class QuestionVideoCreator:
             
             # 説明文
             if description:
-                desc_text = TextClip(
-                    font=self.text_config['font'],
+                desc_text = self._text_clip(
                     text=description,
                     font_size=45,
                     color=self.text_config['colors']['primary'],
-                    size=(self.width - 200, None),
-                    method='caption',
-                    text_align='center',
+                    box_width=self.width - 200,
                     bg_color=self.text_config['colors']['background']
                 )
                 desc_text = desc_text.with_position(('center', self.height * 0.85))
                 desc_text = desc_text.with_duration(duration)
                 
-                composite = CompositeVideoClip([video, number_text, title_text, desc_text])
+                composite = self._composite([video, number_text, title_text, desc_text])
             else:
-                composite = CompositeVideoClip([video, number_text, title_text])
+                composite = self._composite([video, number_text, title_text])
             
             return composite
             
@@ -343,19 +916,16 @@ class QuestionVideoCreator:
         text = f"❶{choice['number']}\n{choice['title']}"
         
         try:
-            text_clip = TextClip(
-                font=self.text_config['font'],
+            text_clip = self._text_clip(
                 text=text,
                 font_size=80,
                 color='white',
-                size=(self.width - 100, None),
-                method='caption',
-                text_align='center'
+                box_width=self.width - 100
             )
             text_clip = text_clip.with_position('center')
             text_clip = text_clip.with_duration(duration)
             
-            return CompositeVideoClip([background, text_clip])
+            return self._composite([background, text_clip])
         except:
             return background
     
@@ -374,22 +944,17 @@ class QuestionVideoCreator:
         ending_text = "あなたはどれを選んだ？\n\nコメント欄で教えて！"
         
         try:
-            text_clip = TextClip(
-                font=self.text_config['font'],
+            text_clip = self._text_clip(
                 text=ending_text,
                 font_size=70,
                 color=self.text_config['colors']['accent'],
-                size=(self.width - 100, None),
-                method='caption',
-                text_align='center'
+                box_width=self.width - 100
             )
             text_clip = text_clip.with_position('center')
             text_clip = text_clip.with_duration(duration)
             
-            composite = CompositeVideoClip([background, text_clip])
-            
             # フェードアウト
-            composite = composite.with_effects([vfx.FadeOut(0.5)])
+            composite = self._composite([background, text_clip], fade_out=0.5)
             
             return composite
             
@@ -398,8 +963,112 @@ class QuestionVideoCreator:
             return background
 
 
+def _close_all(clips: List) -> None:
+    """ソース動画を閉じる（ffmpeg のリーダープロセスを終了させる）"""
+    for clip in clips:
+        try:
+            clip.close()
+        except Exception as e:
+            print(f"⚠️ ソース動画のクローズに失敗: {e}")
+
+
+def _current_rss_mb() -> float:
+    """現在のプロセスの RSS（MB）"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    """プロセス開始以降のピーク RSS（MB）"""
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _available_memory_mb() -> Optional[float]:
+    """
+    利用可能なメモリ（MB）
+    
+    cgroup の上限（LXC / Docker）と /proc/meminfo の MemAvailable の小さい方を返す
+    """
+    candidates = []
+    
+    cgroup_files = [
+        ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),  # cgroup v2
+        ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes'),  # v1
+    ]
+    for limit_file, usage_file in cgroup_files:
+        try:
+            with open(limit_file, 'r') as f:
+                limit = f.read().strip()
+            with open(usage_file, 'r') as f:
+                usage = int(f.read().strip())
+            if limit.isdigit() and int(limit) < 1 << 60:
+                candidates.append((int(limit) - usage) / 1024 / 1024)
+            break
+        except OSError:
+            continue
+    
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) / 1024)
+                    break
+    except OSError:
+        pass
+    
+    return min(candidates) if candidates else None
+
+
+def _encode_segment_worker(config: Dict, engine: str, job: Dict, output_path: str, threads: int) -> float:
+    """
+    ワーカープロセスで1セクションをエンコード（ProcessPoolExecutor 用）
+    
+    Returns:
+        エンコードにかかった秒数
+    """
+    creator = QuestionVideoCreator(config=config)
+    creator.engine = engine
+    start = time.perf_counter()
+    creator._encode_segment(job, output_path, threads=threads)
+    return time.perf_counter() - start
+
+
 if __name__ == "__main__":
     # テスト実行
+    import argparse
+
+    parser = argparse.ArgumentParser(description='QuestionVideoCreator テストモード')
+    parser.add_argument(
+        '--engine',
+        choices=['moviepy', 'ffmpeg'],
+        default=None,
+        help='レンダリングエンジン（省略時は設定ファイルの値）'
+    )
+    parser.add_argument(
+        '--profile',
+        choices=profile_names(),
+        default=None,
+        help='エンコードプロファイル（省略時は設定ファイルの値）'
+    )
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help='moviepy と ffmpeg の両エンジンでレンダリングして比較'
+    )
+    parser.add_argument(
+        '--benchmark-profiles',
+        action='store_true',
+        help='すべてのエンコードプロファイルでレンダリングして比較'
+    )
+    args = parser.parse_args()
+
     print("QuestionVideoCreator テストモード")
     
     # テストデータ
@@ -422,12 +1091,48 @@ if __name__ == "__main__":
         4: "output/choice_4.mp4"
     }
     
-    creator = QuestionVideoCreator()
+    creator = QuestionVideoCreator(profile=args.profile)
+    if args.engine:
+        creator.engine = args.engine
     
     # 動画が存在する場合のみテスト実行
-    if any(os.path.exists(path) for path in test_videos.values()):
-        output = "output/test_question_video.mp4"
-        creator.create_question_video(test_question, test_videos, output)
-    else:
+    if not any(os.path.exists(path) for path in test_videos.values()):
         print("⚠️ テスト動画が見つかりません")
         print("各選択肢の動画を output/choice_1.mp4 〜 choice_4.mp4 に配置してください")
+    elif args.benchmark:
+        results = []
+        for engine in ['moviepy', 'ffmpeg']:
+            creator.engine = engine
+            output = f"output/test_question_video_{engine}.mp4"
+            start = time.perf_counter()
+            creator.create_question_video(test_question, test_videos, output)
+            elapsed = time.perf_counter() - start
+            results.append((engine, elapsed, os.path.getsize(output)))
+        
+        print("\n=== ベンチマーク結果 ===")
+        for engine, elapsed, size in results:
+            print(f"{engine:>8}: {elapsed:7.2f}秒  {size / 1024 / 1024:6.2f}MB")
+    elif args.benchmark_profiles:
+        # 動画全体の長さ（ビットレート計算用）
+        total_duration = (
+            creator.durations['opening']
+            + creator.durations['choice'] * len(test_question['choices'])
+            + creator.durations['ending']
+        )
+        results = []
+        for name in profile_names(creator.config):
+            profiled = QuestionVideoCreator(config=creator.config, profile=name)
+            profiled.engine = creator.engine
+            output = f"output/test_question_video_{name}.mp4"
+            start = time.perf_counter()
+            profiled.create_question_video(test_question, test_videos, output)
+            elapsed = time.perf_counter() - start
+            results.append((name, elapsed, os.path.getsize(output)))
+        
+        print(f"\n=== プロファイル別ベンチマーク結果（エンジン: {creator.engine}） ===")
+        for name, elapsed, size in results:
+            bitrate_kbps = size * 8 / total_duration / 1000
+            print(f"{name:>8}: {elapsed:7.2f}秒  {size / 1024 / 1024:6.2f}MB  {bitrate_kbps:8.0f}kbps")
+    else:
+        output = "output/test_question_video.mp4"
+        creator.create_question_video(test_question, test_videos, output)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# src/ のモジュールは互いにトップレベルで import しあうので、src/ をパスに加える
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,44 @@
+import os
+import time
+
+from clip_normalizer import ClipNormalizer
+
+
+def _normalizer(tmp_path):
+    return ClipNormalizer(config={
+        "normalization": {
+            "cache_dir": str(tmp_path / "normalized"),
+            "cache_max_mb": 1,
+            "protect_seconds": 600,
+        }
+    })
+
+
+def _clip(normalizer, name, size, age):
+    path = os.path.join(normalizer.cache_dir, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def test_evicts_oldest_clips_over_the_limit(tmp_path):
+    normalizer = _normalizer(tmp_path)
+    oldest = _clip(normalizer, "a.mp4", 512 * 1024, age=3000)
+    older = _clip(normalizer, "b.mp4", 512 * 1024, age=2000)
+    recent = _clip(normalizer, "c.mp4", 512 * 1024, age=1000)
+
+    normalizer._evict()
+
+    assert not os.path.exists(oldest)
+    assert os.path.exists(older) and os.path.exists(recent)
+    assert normalizer.evictions == 1
+
+
+def test_recently_used_clips_are_protected(tmp_path):
+    normalizer = _normalizer(tmp_path)
+    in_use = [_clip(normalizer, f"{i}.mp4", 512 * 1024, age=60) for i in range(3)]
+
+    normalizer._evict()
+
+    assert all(os.path.exists(path) for path in in_use)
@@ -0,0 +1,35 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import hedging
+from hedging import HedgeBudget
+
+
+def test_budget_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "hedge_budget.json")
+    src_dir = os.path.dirname(hedging.__file__)
+    # 4プロセスが同時に予算を使っても、合計は1日の上限を超えない
+    workers = [
+        subprocess.Popen([sys.executable, "-c", textwrap.dedent(f"""
+            import sys
+            sys.path.insert(0, {src_dir!r})
+            from hedging import HedgeBudget
+            budget = HedgeBudget(state_path={path!r}, daily_limit=30)
+            acquired = sum(budget.try_acquire() for _ in range(20))
+            for _ in range(acquired):
+                budget.record_result(True, 1.0)
+            print(acquired)
+        """)], stdout=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    acquired = sum(int(worker.communicate()[0]) for worker in workers)
+
+    assert acquired == 30
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    assert state["used"] == state["launched"] == state["wins"] == 30
+    assert state["saved_seconds"] == 30.0
+    assert HedgeBudget(state_path=path, daily_limit=30).remaining() == 0
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import job_journal
+from job_journal import JobJournal
+
+QUESTION = {"category": "耐久", "question": "1週間耐えたら1億円！どの部屋を選ぶ？", "choices": []}
+
+
+def test_run_of_live_owner_is_not_resumed(tmp_path):
+    path = str(tmp_path / "job_journal.jsonl")
+    owner = JobJournal(path)
+    owner.start_run("20260101_000000", "main", QUESTION)
+
+    # 重なって起動した別の実行は、まだ動いている実行を再開しない
+    assert JobJournal(path).unfinished_run("main") is None
+    assert owner.unfinished_run("main") is None
+
+    owner.finish_run("20260101_000000", success=True)
+    assert JobJournal(path).unfinished_run("main") is None
+
+
+def test_run_of_dead_owner_is_resumed(tmp_path):
+    path = str(tmp_path / "job_journal.jsonl")
+    src_dir = os.path.dirname(job_journal.__file__)
+    # 実行を始めたまま終了を記録せずにプロセスが終わる
+    subprocess.run([sys.executable, "-c", textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {src_dir!r})
+        from job_journal import JobJournal
+        JobJournal({path!r}).start_run("20260101_000000", "main", {QUESTION!r})
+    """)], check=True)
+
+    journal = JobJournal(path)
+    run = journal.unfinished_run("main")
+    assert run is not None
+    assert run["run_id"] == "20260101_000000"
+    assert run["question_data"] == QUESTION
+
+    # 再開した実行も、動いている間は他から再開されない
+    assert JobJournal(path).unfinished_run("main") is None
+
+
+def test_compact_keeps_events_appended_by_other_processes(tmp_path):
+    path = str(tmp_path / "job_journal.jsonl")
+    src_dir = os.path.dirname(job_journal.__file__)
+    # 別のプロセスが送信を記録し続けている間に、こちらは実行の終了（書き直し）を繰り返す
+    writer = subprocess.Popen([sys.executable, "-c", textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {src_dir!r})
+        from job_journal import JobJournal
+        journal = JobJournal({path!r})
+        for i in range(200):
+            journal.record_submitted(f"choice_{{i}}.mp4", "prompt", 5, f"gen-{{i}}")
+    """)])
+    journal = JobJournal(path)
+    i = 0
+    while writer.poll() is None:
+        journal.start_run(f"run_{i}", "main", QUESTION)
+        journal.finish_run(f"run_{i}", success=True)
+        i += 1
+    assert writer.returncode == 0
+
+    reloaded = JobJournal(path)
+    assert all(
+        reloaded.pending_generation(f"choice_{i}.mp4", "prompt") is not None for i in range(200)
+    )
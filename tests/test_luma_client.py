@@ -0,0 +1,80 @@
+import asyncio
+import os
+import time
+
+from downloader import DownloadError, ResumableDownloader
+from fake_luma_server import FakeLumaServer
+from generation_poller import AdaptivePoller
+from generation_scheduler import GenerationScheduler
+from hedging import HedgeBudget
+from luma_client import AsyncLumaClient
+
+
+class ScriptedLatencyServer(FakeLumaServer):
+    """受け付けた順に決まった生成時間を返す疑似サーバー"""
+
+    def __init__(self, latencies, **kwargs):
+        super().__init__(**kwargs)
+        self._latencies = list(latencies)
+
+    def sample_latency(self) -> float:
+        return self._latencies.pop(0) if self._latencies else 0.1
+
+
+class FailFirstDownloader(ResumableDownloader):
+    """最初のダウンロードだけ、元の生成の確認が終わるまで待ってから失敗する"""
+
+    def __init__(self, client_box, **kwargs):
+        super().__init__(**kwargs)
+        self.client_box = client_box
+        self.failed = False
+
+    def download(self, url, output_path, headers=None):
+        if not self.failed:
+            self.failed = True
+            client = self.client_box[0]
+            deadline = time.monotonic() + 10
+            # ヘッジの勝ちで影になった元の生成がジョブから外れるのを待つ
+            while time.monotonic() < deadline and any(job["shadow"] for job in client._jobs):
+                time.sleep(0.05)
+            time.sleep(0.2)
+            raise DownloadError("forced failure")
+        return super().download(url, output_path, headers)
+
+
+def test_hedge_download_failure_after_shadow_finished_uses_primary_video(tmp_path):
+    # 元の生成は遅く（1.5秒）、ヘッジは速い（0.1秒）
+    with ScriptedLatencyServer([1.5, 0.1], asset_bytes=4096) as server:
+        poller = AdaptivePoller(
+            state_path=str(tmp_path / "generation_times.json"), base_interval=0.1, min_interval=0.05
+        )
+        key = AdaptivePoller.key(None, 5)
+        for _ in range(3):
+            poller.record(key, 0.1)
+        client_box = []
+        client = AsyncLumaClient(
+            "fake-key",
+            base_url=server.base_url,
+            poller=poller,
+            downloader=FailFirstDownloader(client_box),
+            hedge_budget=HedgeBudget(state_path=str(tmp_path / "hedge_budget.json"), daily_limit=5),
+            scheduler=GenerationScheduler(max_concurrent=4, rate_per_minute=0),
+            retry_delay=0.1,
+            generation_timeout=10,
+        )
+        client_box.append(client)
+        output_path = str(tmp_path / "choice_1.mp4")
+
+        async def run():
+            async with client:
+                return await asyncio.wait_for(client.generate("hedged prompt", output_path), timeout=20)
+
+        result = asyncio.run(run())
+
+    assert result == output_path
+    assert os.path.getsize(output_path) == 4096
+    assert client.hedges == 1
+    assert client.hedge_wins == 0
+    # 完了済みの元の生成の動画をダウンロードし、生成し直さない
+    assert client.submits == 2
+    assert client.downloads == 1
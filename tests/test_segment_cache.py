@@ -0,0 +1,33 @@
+import os
+import time
+
+from segment_cache import SegmentCache
+
+
+def _segment(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    cache = SegmentCache(str(tmp_path / "segments"), max_bytes=2500)
+    old = cache.store("old", _segment(tmp_path, "a.mp4", 1000))
+    used = cache.store("used", _segment(tmp_path, "b.mp4", 1000))
+    os.utime(old, (time.time() - 60, time.time() - 60))
+    os.utime(used, (time.time() - 30, time.time() - 30))
+    assert cache.get("used") == used
+
+    new = cache.store("new", _segment(tmp_path, "c.mp4", 1000))
+
+    assert not os.path.exists(old)
+    assert os.path.exists(used) and os.path.exists(new)
+    assert cache.evictions == 1
+
+
+def test_oversized_segment_is_kept_until_replaced(tmp_path):
+    cache = SegmentCache(str(tmp_path / "segments"), max_bytes=500)
+
+    path = cache.store("ending", _segment(tmp_path, "ending.mp4", 1000))
+
+    assert cache.get("ending") == path
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import similarity_index
+from similarity_benchmark import run_benchmark
+from similarity_index import SimilarityIndex
+
+HISTORY = [
+    ("1週間耐えたら1億円！どの部屋を選ぶ？", "question", "耐久"),
+    ("1週間耐えたら5億円！どの部屋を選ぶ？", "question", "耐久"),
+    ("もしも透明人間になれたら、どこへ行く？", "question", "もしも"),
+]
+
+
+def test_number_variant_is_duplicate(tmp_path):
+    index = SimilarityIndex(index_path=str(tmp_path / "question_index.jsonl"))
+    index.add_question({"question": "1週間耐えたら1億円！どの部屋を選ぶ？", "choices": []})
+
+    duplicate = index.find_duplicate({"question": "1週間耐えたら5億円！どの部屋を選ぶ？", "choices": []})
+
+    assert duplicate is not None
+    assert duplicate[1]["text"] == "1週間耐えたら1億円！どの部屋を選ぶ？"
+
+
+def test_crowded_counts_neighbours_incrementally(tmp_path):
+    index_path = str(tmp_path / "question_index.jsonl")
+    index = SimilarityIndex(index_path=index_path)
+    for question in [
+        "1週間耐えたら1億円！どの部屋を選ぶ？",
+        "1週間耐えたら5億円！どの部屋を選ぶ？",
+        "1週間耐えたら3億円！どの部屋を選ぶ？",
+        "2週間耐えたら3億円！どの部屋を選ぶ？",
+        "もしも透明人間になれたら、どこへ行く？",
+    ]:
+        index.add(question, "question", "耐久")
+
+    crowded = index.crowded("耐久", limit=10)
+    assert set(crowded) == {
+        "1週間耐えたら1億円！どの部屋を選ぶ？",
+        "1週間耐えたら5億円！どの部屋を選ぶ？",
+        "1週間耐えたら3億円！どの部屋を選ぶ？",
+        "2週間耐えたら3億円！どの部屋を選ぶ？",
+    }
+    assert index.crowded("もしも") == []
+
+    # 別のプロセスで読み込んでも同じ近傍数になる
+    reloaded = SimilarityIndex(index_path=index_path)
+    assert reloaded.crowded("耐久", limit=10) == crowded
+
+
+def test_history_is_seeded_once_by_concurrent_processes(tmp_path):
+    index_path = str(tmp_path / "question_index.jsonl")
+    src_dir = os.path.dirname(similarity_index.__file__)
+    # 同時に起動したプロセスがどれも空のインデックスを見て履歴を取り込もうとする
+    workers = [
+        subprocess.Popen([sys.executable, "-c", textwrap.dedent(f"""
+            import sys
+            sys.path.insert(0, {src_dir!r})
+            from similarity_index import SimilarityIndex
+            print(SimilarityIndex(index_path={index_path!r}).seed({HISTORY!r}))
+        """)], stdout=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    seeded = [worker.communicate()[0].strip() for worker in workers]
+
+    assert seeded.count("True") == 1
+    with open(index_path, "r", encoding="utf-8") as f:
+        assert len(f.readlines()) == len(HISTORY)
+
+
+def test_exact_duplicates_do_not_inflate_neighbour_counts(tmp_path):
+    index_path = str(tmp_path / "question_index.jsonl")
+    first = SimilarityIndex(index_path=index_path)
+    second = SimilarityIndex(index_path=index_path)
+    # ロックなしで二重に取り込まれた履歴
+    for text, kind, category in HISTORY:
+        first.add(text, kind, category)
+        second.add(text, kind, category)
+    first.add("1週間耐えたら1億円！どの部屋を選ぶ？", "choices", "耐久")
+
+    reloaded = SimilarityIndex(index_path=index_path)
+    assert len(reloaded) == len(HISTORY) + 1
+    assert reloaded._neighbour_counts == first._neighbour_counts
+    assert sorted(reloaded._neighbour_counts.values()) == [1, 1]
+
+
+def test_template_questions_rarely_become_candidates():
+    result = run_benchmark(entries=1000, queries=100)
+
+    assert result["candidate_ratio"] < 0.02
+    assert result["recall_at_threshold"] >= 0.95
@@ -0,0 +1,37 @@
+import pytest
+
+from translation import Translator, memory_key
+
+
+@pytest.mark.parametrize("a, b", [
+    ("-30℃の部屋", "30℃の部屋"),
+    ("1/2の確率", "12の確率"),
+    ("$100", "¥100"),
+    ("+100万円", "100万円"),
+])
+def test_memory_key_keeps_signs_units_and_slashes(a, b):
+    assert memory_key(a) != memory_key(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("極寒の部屋", "極寒の部屋。"),
+    ("どれを選ぶ？", "どれを選ぶ?"),
+    ("ＡＢＣ　部屋", "abc 部屋"),
+])
+def test_memory_key_ignores_width_case_spacing_and_trailing_punctuation(a, b):
+    assert memory_key(a) == memory_key(b)
+
+
+class FailingModel:
+    def generate_content(self, prompt):
+        raise RuntimeError("offline")
+
+
+def test_numeric_titles_do_not_share_translations(tmp_path):
+    translator = Translator(cache_path=str(tmp_path / "translation_cache.json"), model=FailingModel())
+    translator._remember({"30℃の部屋": "A 30°C room", "12の確率": "12 chances", "100万円": "1 million yen"})
+
+    found = translator.translate_texts(["-30℃の部屋", "1/2の確率", "+100万円", "30℃の部屋 "])
+
+    assert found == {"30℃の部屋 ": "A 30°C room"}
+    assert translator.stats()["normalized_hits"] == 1
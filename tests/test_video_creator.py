@@ -0,0 +1,100 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from ffmpeg_renderer import FFMPEG_BINARY
+from font_registry import get_font_registry
+from video_creator import QuestionVideoCreator
+
+pytestmark = pytest.mark.skipif(
+    not os.path.isdir("/proc") or shutil.which(FFMPEG_BINARY) is None,
+    reason="ffmpeg と /proc が必要"
+)
+
+
+def _reader_processes(video_path):
+    """video_path を読んでいるこのプロセスの子 ffmpeg の PID"""
+    pids = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                args = f.read().decode("utf-8", errors="replace").split("\0")
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == os.getpid() and video_path in args:
+            pids.append(int(pid))
+    return pids
+
+
+def _source_video(path):
+    # セクションより長くして、読み切って終了する前のリーダーが残るようにする
+    subprocess.run(
+        [
+            FFMPEG_BINARY, "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=320x240:rate=10:duration=5",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=5",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+            path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def _creator(tmp_path):
+    return QuestionVideoCreator(config={
+        "video": {
+            "resolution": [360, 640],
+            "fps": 10,
+            "duration": {"opening": 1, "choice": 1, "ending": 1},
+            "segments": {"cache_dir": str(tmp_path / "segments")},
+            "streaming": {"mode": "streaming"},
+        },
+        "normalization": {"enabled": False, "cache_dir": str(tmp_path / "normalized")},
+        "text_overlay": {
+            "font": get_font_registry().resolve(),
+            "cache_dir": str(tmp_path / "overlays"),
+            "warm_up": False,
+            "colors": {"primary": "#FFFFFF", "accent": "#FFD700", "background": (0, 0, 0, 178)},
+        },
+        "audio": {"bgm_volume": 0.3, "bgm_cache_dir": str(tmp_path / "bgm")},
+    })
+
+
+def test_streaming_closes_source_readers_after_each_section(tmp_path):
+    creator = _creator(tmp_path)
+    source = _source_video(str(tmp_path / "choice.mp4"))
+    question_data = {
+        "question": "どれを選ぶ？",
+        "choices": [
+            {"number": 1, "title": "A"},
+            {"number": 2, "title": "B"},
+        ],
+    }
+
+    # 次のセクションを作る時点で、前のセクションのリーダーが残っていないこと
+    # （作ったクリップへの参照を持ち続け、GC ではなく明示的に閉じられることを確かめる）
+    leftovers = []
+    built = []
+    build = creator._build_section_clip
+
+    def build_and_check(job):
+        leftovers.append(_reader_processes(source))
+        built.append(build(job))
+        return built[-1]
+
+    creator._build_section_clip = build_and_check
+    output = creator.create_question_video(
+        question_data, {1: source, 2: source}, str(tmp_path / "out" / "video.mp4")
+    )
+
+    assert os.path.getsize(output) > 0
+    assert len(leftovers) == 4
+    assert leftovers == [[]] * 4
+    assert _reader_processes(source) == []